@@ -0,0 +1,164 @@
+"""
+Cache of decoded baseline screenshots.
+
+Baselines rarely change, but every check used to decode each baseline PNG again for every
+subpage. The first comparison against a baseline stores its decoded RGB array as a
+'<baseline>.decoded.npy' file next to it; later comparisons memory-map that file instead of
+decoding the PNG. Recently used arrays are also kept in an in-process LRU with a byte budget.
+Entries are invalidated when a new baseline is written for the same path.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from src.config_loader import get_config
+from src.logger_setup import setup_logging
+
+logger = setup_logging()
+
+DECODED_SUFFIX = ".decoded.npy"
+DEFAULT_MAX_MEMORY_MB = 512
+
+def get_decoded_cache_path(image_path: str) -> str:
+    """Returns the path of the decoded array of a baseline, e.g. 'baseline_home.png' -> 'baseline_home.png.decoded.npy'."""
+    return f"{image_path}{DECODED_SUFFIX}"
+
+class BaselineArrayCache:
+    """
+    LRU of decoded baseline arrays, keyed by path and the baseline file's size and mtime.
+
+    Usage:
+        cache = BaselineArrayCache(max_bytes=512 * 1024 * 1024)
+        array = cache.get(baseline_path)    # (height, width, 3) uint8, read-only
+        cache.invalidate(baseline_path)     # after the baseline is rewritten
+    """
+
+    def __init__(self, max_bytes: int, write_decoded_files: bool = True):
+        self.max_bytes = max_bytes
+        self.write_decoded_files = write_decoded_files
+        self._entries = OrderedDict()  # path -> (source key, array)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _source_key(image_path: str) -> tuple[int, int]:
+        stat = os.stat(image_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(self, image_path: str) -> np.ndarray:
+        """Returns the decoded RGB array of a baseline, decoding the PNG only if nothing is cached."""
+        path = os.path.abspath(image_path)
+        source_key = self._source_key(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == source_key:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+
+        self.misses += 1
+        array = self._load_decoded_file(path)
+        if array is None:
+            with Image.open(path) as img:
+                array = np.asarray(img.convert('RGB'))
+            if self.write_decoded_files:
+                array = self._write_decoded_file(path, array)
+        array.flags.writeable = False
+
+        with self._lock:
+            self._remove_entry(path)
+            if array.nbytes <= self.max_bytes:
+                self._entries[path] = (source_key, array)
+                self._bytes += array.nbytes
+                while self._bytes > self.max_bytes:
+                    self._remove_entry(next(iter(self._entries)))
+        return array
+
+    def invalidate(self, image_path: str):
+        """Drops a baseline from memory and deletes its decoded file."""
+        path = os.path.abspath(image_path)
+        with self._lock:
+            self._remove_entry(path)
+        decoded_path = get_decoded_cache_path(path)
+        try:
+            if os.path.exists(decoded_path):
+                os.remove(decoded_path)
+        except OSError as e:
+            logger.warning(f"Could not remove decoded baseline {decoded_path}: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove_entry(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry:
+            self._bytes -= entry[1].nbytes
+
+    @staticmethod
+    def _load_decoded_file(path: str) -> np.ndarray | None:
+        decoded_path = get_decoded_cache_path(path)
+        try:
+            # A decoded file older than its PNG belongs to an earlier baseline at the same path
+            if not os.path.exists(decoded_path) or os.stat(decoded_path).st_mtime_ns < os.stat(path).st_mtime_ns:
+                return None
+            return np.load(decoded_path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable decoded baseline {decoded_path}: {e}")
+            return None
+
+    @staticmethod
+    def _write_decoded_file(path: str, array: np.ndarray) -> np.ndarray:
+        """Stores the decoded array next to the baseline and returns a memory map of it."""
+        decoded_path = get_decoded_cache_path(path)
+        temp_path = f"{decoded_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                np.save(f, array)
+            os.replace(temp_path, decoded_path)
+            return np.load(decoded_path, mmap_mode='r')
+        except OSError as e:
+            logger.warning(f"Could not store decoded baseline {decoded_path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return array
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def _get_cache() -> BaselineArrayCache | None:
+    global _cache
+    cache_config = get_config().get('baseline_cache', {}) or {}
+    if not cache_config.get('enabled', True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = BaselineArrayCache(
+                max_bytes=int(cache_config.get('max_memory_mb', DEFAULT_MAX_MEMORY_MB) * 1024 * 1024),
+                write_decoded_files=cache_config.get('write_decoded_files', True)
+            )
+    return _cache
+
+def load_baseline_array(image_path: str) -> np.ndarray:
+    """Returns the decoded RGB array of a baseline screenshot, from the cache when enabled."""
+    cache = _get_cache()
+    if cache is None:
+        with Image.open(image_path) as img:
+            return np.asarray(img.convert('RGB'))
+    return cache.get(image_path)
+
+def invalidate_baseline(image_path: str):
+    """Forgets the decoded array of a baseline that has been (or is about to be) replaced."""
+    if _cache is not None:
+        _cache.invalidate(image_path)
+    else:
+        decoded_path = get_decoded_cache_path(image_path)
+        if os.path.exists(decoded_path):
+            os.remove(decoded_path)
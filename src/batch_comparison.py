@@ -0,0 +1,152 @@
+"""
+Batch comparison of the screenshots of a visual check.
+
+Comparisons used to run inline right after each capture, one page at a time on the capture
+thread. The crawler now collects every (baseline, latest) pair of a check and compares them
+together in a process pool, so multi-page checks use every core for the CPU-bound image work.
+Decoded baselines are handed to the workers through shared memory blocks rather than pickled;
+workers decode the latest screenshots themselves and send back only the small result dicts of
+compare_screenshots_detailed.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from src.baseline_cache import load_baseline_array
+from src.comparators import compare_screenshots_detailed
+from src.config_loader import get_config
+from src.logger_setup import setup_logging
+from src.tile_hashing import load_tile_hashes, find_changed_tiles
+from src.tiled_screenshot import is_tiled_snapshot
+
+logger = setup_logging()
+
+# Fewer comparisons than this run inline; starting the pool would cost more than it saves
+DEFAULT_MIN_PAIRS = 2
+# Comparisons in flight per worker; bounds how many baselines sit in shared memory at once
+_JOBS_PER_WORKER = 2
+
+def get_batch_options() -> dict:
+    """The batch_comparison config section, with defaults."""
+    batch_config = get_config().get('batch_comparison', {}) or {}
+    return {
+        'enabled': batch_config.get('enabled', True),
+        'max_workers': batch_config.get('max_workers') or os.cpu_count() or 1,
+        'min_pairs': batch_config.get('min_pairs', DEFAULT_MIN_PAIRS)
+    }
+
+def _comparison_kwargs(job: dict) -> dict:
+    return {
+        'ignore_regions': job.get('ignore_regions'),
+        'compute_ssim': job.get('compute_ssim', False),
+        'decision_threshold': job.get('decision_threshold')
+    }
+
+def _error_result() -> dict:
+    # Same as compare_screenshots_detailed on an unexpected error: treated as a major difference
+    return {'percent': 100.0, 'diff_image_path': None, 'bbox': None, 'regions': [], 'shifted_regions': [], 'ssim': None}
+
+def _needs_decoded_baseline(job: dict) -> bool:
+    """False when the comparison never decodes the whole baseline: tiled snapshots or unchanged tile hashes."""
+    baseline_path, snapshot_path = job['baseline_path'], job['snapshot_path']
+    if not (os.path.exists(baseline_path) and os.path.exists(snapshot_path)):
+        return False
+    if is_tiled_snapshot(baseline_path) or is_tiled_snapshot(snapshot_path):
+        return False
+    hashes1, hashes2 = load_tile_hashes(baseline_path), load_tile_hashes(snapshot_path)
+    if hashes1 and hashes2:
+        tile_hash_config = get_config().get('tile_hashing', {}) or {}
+        if find_changed_tiles(hashes1, hashes2, tile_hash_config.get('perceptual_threshold')) == []:
+            return False
+    return True
+
+def _share_array(array: np.ndarray) -> tuple[shared_memory.SharedMemory, dict]:
+    """Copies an array into a new shared memory block; returns the block and what a worker needs to attach to it."""
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return block, {'name': block.name, 'shape': array.shape, 'dtype': array.dtype.str}
+
+def _compare_in_worker(baseline_path: str, snapshot_path: str, shared_baseline: dict | None, kwargs: dict) -> dict:
+    """Runs one comparison in a pool worker, reading the decoded baseline from shared memory."""
+    if shared_baseline is None:
+        return compare_screenshots_detailed(baseline_path, snapshot_path, **kwargs)
+
+    block = shared_memory.SharedMemory(name=shared_baseline['name'])
+    try:
+        base_array = np.ndarray(shared_baseline['shape'], dtype=shared_baseline['dtype'], buffer=block.buf)
+        base_array.flags.writeable = False
+        result = compare_screenshots_detailed(baseline_path, snapshot_path, base_array=base_array, **kwargs)
+        # The block can only be closed once no array refers to its buffer
+        del base_array
+        return result
+    finally:
+        block.close()
+
+def compare_screenshot_pairs(jobs: list[dict], max_workers: int | None = None, min_pairs: int = DEFAULT_MIN_PAIRS) -> list[dict]:
+    """
+    Compares many (baseline, latest) screenshot pairs, in a process pool when there are enough of them.
+
+    Args:
+        jobs (list[dict]): One dict per pair with 'baseline_path' and 'snapshot_path', plus the
+            optional compare_screenshots_detailed arguments 'ignore_regions', 'compute_ssim' and
+            'decision_threshold'.
+        max_workers (int, optional): Pool size; defaults to the number of CPUs.
+        min_pairs (int): Fewer jobs than this are compared inline.
+
+    Returns:
+        list[dict]: The compare_screenshots_detailed result of every job, in job order.
+    """
+    if not jobs:
+        return []
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if len(jobs) < min_pairs or workers <= 1:
+        return [compare_screenshots_detailed(job['baseline_path'], job['snapshot_path'], **_comparison_kwargs(job))
+                for job in jobs]
+
+    logger.info(f"Comparing {len(jobs)} screenshot pairs in {workers} worker processes")
+    results = [None] * len(jobs)
+    in_flight = {}  # future -> (job index, shared memory block or None)
+
+    def collect(done):
+        for future in done:
+            index, block = in_flight.pop(future)
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                logger.error(f"Comparison of {jobs[index]['snapshot_path']} against {jobs[index]['baseline_path']} "
+                             f"failed in worker: {e}", exc_info=True)
+                results[index] = _error_result()
+            finally:
+                if block is not None:
+                    block.close()
+                    block.unlink()
+
+    # 'spawn' avoids forking the crawler's threads and locks into the workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        try:
+            for index, job in enumerate(jobs):
+                while len(in_flight) >= workers * _JOBS_PER_WORKER:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+                block = shared_baseline = None
+                if _needs_decoded_baseline(job):
+                    try:
+                        block, shared_baseline = _share_array(load_baseline_array(job['baseline_path']))
+                    except Exception as e:
+                        # The worker decodes the baseline itself
+                        logger.warning(f"Could not share decoded baseline {job['baseline_path']}: {e}")
+                future = executor.submit(_compare_in_worker, job['baseline_path'], job['snapshot_path'],
+                                         shared_baseline, _comparison_kwargs(job))
+                in_flight[future] = (index, block)
+            collect(wait(in_flight).done)
+        finally:
+            # Release the blocks of comparisons abandoned by an error above
+            for _, block in in_flight.values():
+                if block is not None:
+                    block.close()
+                    block.unlink()
+    return results
@@ -10,15 +10,34 @@ from urllib.parse import urljoin, urlparse
 from PIL import Image
 from io import BytesIO
 import time
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 import multiprocessing
 
 from src.logger_setup import setup_logging
 from src.config_loader import get_config
 from src.path_utils import get_database_path, get_snapshots_directory, ensure_directory_exists
+from src.image_downloader import ImageDownloader
+from src.image_probe import (DEFAULT_PROBE_BYTES, is_svg, read_image_header, total_size_from_headers,
+                             probe_skip_reason)
 
 logger = setup_logging()
 
+# imdecode flags by reduction factor; JPEG is decoded at the reduced size directly
+_REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+# A reduced decode must stay at least this many times larger than the resize target. Decoding
+# closer to the target loses fine detail: at 2x the Laplacian scores of JPEG photos drop by up to
+# 14%, at 3x they stay within about 5% of a full decode. At the default 1280x720 target only very
+# large images (at least 7680 px wide or 4320 px tall) are decoded at a reduced size; the common
+# 2000-4000 px photos would land at 1.5-3x and are decoded in full.
+_MIN_DECODE_OVERSAMPLING = 3
+
 class BlurDetector:
     def __init__(self, config_path=None):
         self.logger = logger
@@ -30,12 +49,45 @@ class BlurDetector:
         self.min_image_size = self.config.get('blur_detection_min_image_size', 100)
         self.resize_dimensions = tuple(self.config.get('blur_detection_resize_dimensions', [1280, 720]))
         self.cleanup_days = self.config.get('blur_detection_cleanup_days', 30)
+        # Reuse analysis results of image bytes analyzed before, revalidating with ETag/Last-Modified
+        self.analysis_cache_enabled = self.config.get('blur_detection_analysis_cache', True)
+        # Read the header of new images first and skip SVGs, tracking pixels and small images without downloading them
+        self.probe_enabled = self.config.get('blur_detection_probe_enabled', True)
+        self.probe_bytes = self.config.get('blur_detection_probe_bytes', DEFAULT_PROBE_BYTES)
+        # Largest side of the thumbnails saved for blurry images
+        self.thumbnail_size = self.config.get('blur_detection_thumbnail_size', 640)
+        # Pooled, per-host rate-limited downloader of the current blur run (see _download_session)
+        self._downloader = None
         
         # Initialize the database table
         self._init_blur_detection_tables()
         
         self.logger.info(f"BlurDetector initialized with threshold: {self.threshold}, resize: {self.resize_dimensions}")
     
+    @contextmanager
+    def _download_session(self):
+        """
+        Opens one pooled downloader for a blur run and closes its connections when the run ends.
+        Nested runs share the outer run's downloader.
+        """
+        if self._downloader is not None:
+            yield self._downloader
+            return
+        self._downloader = ImageDownloader.from_config(self.config)
+        self.logger.debug(f"Downloading images with up to {self._downloader.max_connections} connections "
+                          f"({self._downloader.max_connections_per_host} per host)")
+        try:
+            yield self._downloader
+        finally:
+            self._downloader.close()
+            self._downloader = None
+
+    def __getstate__(self):
+        # Analysis worker processes get a copy of the detector; they do not download
+        state = self.__dict__.copy()
+        state['_downloader'] = None
+        return state
+    
     def _get_db_connection(self):
         """Get database connection for storing blur detection results."""
         db_path = get_database_path()
@@ -74,10 +126,16 @@ class BlurDetector:
                     image_height INTEGER,
                     file_size INTEGER,
                     timestamp TEXT NOT NULL,
+                    skip_reason TEXT,
                     FOREIGN KEY (crawl_id) REFERENCES crawl_results (id)
                 )
             ''')
             
+            cursor.execute("PRAGMA table_info(blur_detection_results)")
+            if 'skip_reason' not in [col[1] for col in cursor.fetchall()]:
+                self.logger.info("Adding 'skip_reason' column to blur_detection_results table.")
+                cursor.execute("ALTER TABLE blur_detection_results ADD COLUMN skip_reason TEXT")
+            
             # Create image_registry table for duplicate detection
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS image_registry (
@@ -93,10 +151,35 @@ class BlurDetector:
                     file_size INTEGER,
                     image_width INTEGER,
                     image_height INTEGER,
+                    etag TEXT,
+                    last_modified TEXT,
                     UNIQUE(website_id, image_url)
                 )
             ''')
             
+            # Validators for conditional requests, added after the table was first released
+            cursor.execute("PRAGMA table_info(image_registry)")
+            registry_columns = [col[1] for col in cursor.fetchall()]
+            for column in ('etag', 'last_modified'):
+                if column not in registry_columns:
+                    self.logger.info(f"Adding '{column}' column to image_registry table.")
+                    cursor.execute(f"ALTER TABLE image_registry ADD COLUMN {column} TEXT")
+            
+            # Analysis results by image content, so unchanged bytes are not analyzed again
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS image_analysis_cache (
+                    image_hash TEXT NOT NULL,
+                    resize_dimensions TEXT NOT NULL,
+                    laplacian_score REAL,
+                    blur_percentage REAL,
+                    image_width INTEGER,
+                    image_height INTEGER,
+                    file_size INTEGER,
+                    analyzed_timestamp TEXT NOT NULL,
+                    PRIMARY KEY (image_hash, resize_dimensions)
+                )
+            ''')
+            
             # Create indexes for better performance
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_image_registry_website_url ON image_registry(website_id, image_url)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_image_registry_hash ON image_registry(image_hash)')
@@ -140,8 +223,11 @@ class BlurDetector:
             return f"{parsed.netloc.replace('.', '_').replace(':', '_')}"
         return str(site_id).replace('/', '_').replace('\\', '_').replace(':', '_')
     
-    def cleanup_blur_data_for_website(self, website_id):
-        """Clean up old blur detection data for a specific website."""
+    def cleanup_blur_data_for_website(self, website_id, keep_images=False):
+        """
+        Clean up old blur detection data for a specific website.
+        With keep_images the saved image files stay, so cached analysis results can still point to them.
+        """
         try:
             # Clean up database records
             conn = self._get_db_connection()
@@ -157,6 +243,9 @@ class BlurDetector:
             finally:
                 conn.close()
             
+            if keep_images:
+                return
+            
             # Clean up image files
             blur_dir = self._create_blur_images_directory(website_id)
             if os.path.exists(blur_dir):
@@ -224,8 +313,14 @@ class BlurDetector:
             self.logger.error(f"Error normalizing URL {image_url}: {e}")
             return None
 
-    def _download_image(self, image_url, page_url, max_retries=3):
-        """Download an image from a URL with retry mechanism and return the image data."""
+    def _download_image(self, image_url, page_url, max_retries=3, validators=None, response_info=None):
+        """
+        Download an image from a URL with retry mechanism and return the image data.
+        
+        validators ({'etag', 'last_modified'}) make the request conditional; a 304 response returns
+        None and sets response_info['not_modified']. response_info also receives the ETag and
+        Last-Modified headers of the response.
+        """
         try:
             # Normalize the image URL first
             normalized_url = self._normalize_image_url(image_url, page_url)
@@ -253,70 +348,71 @@ class BlurDetector:
                 'DNT': '1',
                 'Sec-GPC': '1'
             }
+            if validators:
+                if validators.get('etag'):
+                    headers['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'):
+                    headers['If-Modified-Since'] = validators['last_modified']
             
             # Get timeout from config or use default (increased for slow connections)
             timeout = self.config.get('blur_detection_timeout', 60)  # Increased from 30 to 60
             
             for attempt in range(max_retries):
                 try:
-                    # Create session for connection pooling
-                    with requests.Session() as session:
-                        session.headers.update(headers)
-                        
-                        # Configure session for better performance and reliability
-                        adapter = requests.adapters.HTTPAdapter(
-                            pool_connections=5,  # Reduced from 10
-                            pool_maxsize=10,     # Reduced from 20
-                            max_retries=0        # We handle retries manually
-                        )
-                        session.mount('https://', adapter)
-                        session.mount('http://', adapter)
-                        
-                        # Add delay between retries to avoid overwhelming servers
-                        if attempt > 0:
-                            time.sleep(2)  # 2 second delay between retries
-                        
-                        response = session.get(
-                            image_url, 
-                            timeout=(timeout, timeout),  # Connect and read timeout
-                            stream=True,
-                            allow_redirects=True
-                        )
-                        response.raise_for_status()
-                        
-                        # Get final URL after redirects
-                        final_url = response.url
-                        if final_url != image_url:
-                            self.logger.debug(f"Image URL redirected from {image_url} to {final_url}")
-                        
-                        # Check if it's actually an image
-                        content_type = response.headers.get('content-type', '').lower()
-                        if not content_type.startswith('image/'):
-                            self.logger.warning(f"URL {final_url} does not appear to be an image (content-type: {content_type})")
-                            return None
-                        
-                        # Read the image data
-                        image_data = response.content
-                        
-                        # Validate minimum size
-                        if len(image_data) < 1024:  # Less than 1KB - probably not a real image
-                            self.logger.debug(f"Image too small ({len(image_data)} bytes), skipping: {final_url}")
-                            return None
-                        
-                        # Validate maximum size (prevent memory issues)
-                        max_size = 10 * 1024 * 1024  # 10MB limit
-                        if len(image_data) > max_size:
-                            self.logger.warning(f"Image too large ({len(image_data)} bytes), skipping: {final_url}")
-                            return None
-                        
-                        # Validate image format by checking file signature
-                        if not self._is_valid_image_data(image_data):
-                            self.logger.warning(f"Invalid image format detected for {final_url}")
-                            return None
-                        
-                        self.logger.debug(f"Successfully downloaded image from {image_url} ({len(image_data)} bytes)")
-                        return image_data
-                        
+                    # Add delay between retries to avoid overwhelming servers
+                    if attempt > 0:
+                        time.sleep(2)  # 2 second delay between retries
+                    
+                    response = self._downloader.get(
+                        image_url, 
+                        headers=headers,
+                        timeout=(timeout, timeout),  # Connect and read timeout
+                        allow_redirects=True
+                    )
+                    response.raise_for_status()
+                    
+                    if response.status_code == 304:
+                        self.logger.debug(f"Image not modified since last check: {image_url}")
+                        if response_info is not None:
+                            response_info['not_modified'] = True
+                        return None
+                    if response_info is not None:
+                        response_info['etag'] = response.headers.get('ETag')
+                        response_info['last_modified'] = response.headers.get('Last-Modified')
+                    
+                    # Get final URL after redirects
+                    final_url = response.url
+                    if final_url != image_url:
+                        self.logger.debug(f"Image URL redirected from {image_url} to {final_url}")
+                    
+                    # Check if it's actually an image
+                    content_type = response.headers.get('content-type', '').lower()
+                    if not content_type.startswith('image/'):
+                        self.logger.warning(f"URL {final_url} does not appear to be an image (content-type: {content_type})")
+                        return None
+                    
+                    # Read the image data
+                    image_data = response.content
+                    
+                    # Validate minimum size
+                    if len(image_data) < 1024:  # Less than 1KB - probably not a real image
+                        self.logger.debug(f"Image too small ({len(image_data)} bytes), skipping: {final_url}")
+                        return None
+                    
+                    # Validate maximum size (prevent memory issues)
+                    max_size = 10 * 1024 * 1024  # 10MB limit
+                    if len(image_data) > max_size:
+                        self.logger.warning(f"Image too large ({len(image_data)} bytes), skipping: {final_url}")
+                        return None
+                    
+                    # Validate image format by checking file signature
+                    if not self._is_valid_image_data(image_data):
+                        self.logger.warning(f"Invalid image format detected for {final_url}")
+                        return None
+                    
+                    self.logger.debug(f"Successfully downloaded image from {image_url} ({len(image_data)} bytes)")
+                    return image_data
+                    
                 except requests.exceptions.Timeout:
                     if attempt < max_retries - 1:
                         wait_time = (2 ** attempt) * 2  # Exponential backoff: 2s, 4s, 8s
@@ -348,14 +444,16 @@ class BlurDetector:
                                 'Referer': page_url
                             }
                             try:
-                                response = session.get(
+                                response = self._downloader.get(
                                     image_url, 
                                     timeout=(timeout, timeout),
-                                    stream=True,
                                     allow_redirects=True,
                                     headers=minimal_headers
                                 )
                                 response.raise_for_status()
+                                if response_info is not None:
+                                    response_info['etag'] = response.headers.get('ETag')
+                                    response_info['last_modified'] = response.headers.get('Last-Modified')
                                 # If successful, process the response
                                 content_type = response.headers.get('content-type', '').lower()
                                 if not content_type.startswith('image/'):
@@ -421,6 +519,67 @@ class BlurDetector:
             self.logger.error(f"Error in _download_image for {image_url}: {e}")
             return None
 
+    def _probe_image(self, image_url, page_url):
+        """
+        Reads the format and dimensions of an image with a ranged GET of its first bytes.
+        
+        Returns a dict with 'skip_reason' (None when the image should be analyzed), 'image_width',
+        'image_height' and 'file_size'; 'image_data', 'etag' and 'last_modified' are added when the
+        server ignored the range and sent a complete, usable image. None when the probe failed, in
+        which case the image is downloaded in full as before.
+        """
+        normalized_url = self._normalize_image_url(image_url, page_url)
+        if not normalized_url:
+            return None
+        
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+            'Accept': 'image/webp,image/png,image/jpeg,image/gif,image/*,*/*;q=0.8',
+            'Accept-Encoding': 'identity',  # Ranges of the image itself, not of a compressed body
+            'Referer': page_url,
+            'Range': f'bytes=0-{self.probe_bytes - 1}'
+        }
+        timeout = self.config.get('blur_detection_timeout', 60)
+        try:
+            response = self._downloader.get(normalized_url, headers=headers, timeout=(timeout, timeout), allow_redirects=True)
+        except requests.exceptions.RequestException as e:
+            self.logger.debug(f"Header probe failed for {normalized_url}: {e}")
+            return None
+        if response.status_code not in (200, 206):
+            return None
+        
+        data = response.content
+        content_type = response.headers.get('content-type', '').lower()
+        svg = is_svg(data, content_type)
+        header = None if svg else read_image_header(data)
+        width, height = (header[1], header[2]) if header else (None, None)
+        probe = {
+            'skip_reason': probe_skip_reason(width, height, self.min_image_size, svg),
+            'image_width': width,
+            'image_height': height,
+            'file_size': total_size_from_headers(response.headers, response.status_code, len(data))
+        }
+        if (response.status_code == 200 and not probe['skip_reason'] and content_type.startswith('image/') and
+                1024 <= len(data) <= 10 * 1024 * 1024 and self._is_valid_image_data(data)):
+            probe.update(image_data=data, etag=response.headers.get('ETag'),
+                         last_modified=response.headers.get('Last-Modified'))
+        return probe
+
+    def _probe_skip_result(self, image_url, probe):
+        """A skipped analysis result for an image the header probe ruled out."""
+        return {
+            "image_url": image_url,
+            "image_local_path": None,
+            "is_blurry": False,
+            "laplacian_score": None,
+            "blur_percentage": None,
+            "image_width": probe['image_width'],
+            "image_height": probe['image_height'],
+            "file_size": probe['file_size'],
+            "skipped": True,
+            "skip_reason": probe['skip_reason']
+        }
+
     def _is_valid_image_data(self, image_data):
         """Validate image data by checking file signatures."""
         if not image_data or len(image_data) < 4:
@@ -456,11 +615,13 @@ class BlurDetector:
     def _download_and_save_image(self, args):
         """Helper function for parallel image downloading and saving."""
         i, image_data, page_url, blur_dir = args
+        prefetched_data = None
         
         try:
             # Handle both string URLs and dict objects from crawler
             if isinstance(image_data, dict):
                 image_url = image_data.get('src') or image_data.get('url')
+                prefetched_data = image_data.get('image_bytes')
             else:
                 image_url = str(image_data)
             
@@ -482,8 +643,11 @@ class BlurDetector:
             
             local_path = os.path.join(blur_dir, filename)
             
-            # Download image
-            image_data = self._download_image(image_url, page_url)
+            # Use the bytes captured during rendering when they look like a real image, otherwise download
+            if prefetched_data and self._is_valid_image_data(prefetched_data):
+                image_data = prefetched_data
+            else:
+                image_data = self._download_image(image_url, page_url)
             if image_data:
                 # Save image data to file
                 try:
@@ -501,68 +665,154 @@ class BlurDetector:
             return None
 
     def _analyze_single_image(self, image_path, image_url):
-        """Analyze a single image for blur using Variance of Laplacian method."""
+        """
+        Analyze a saved image for blur using Variance of Laplacian method. The file is decoded like
+        downloaded bytes (see _analyze_image_data), so both paths measure the same scores.
+        """
         try:
-            # Load image
-            img = cv2.imread(image_path)
+            with open(image_path, 'rb') as f:
+                image_data = f.read()
+        except OSError as e:
+            self.logger.warning(f"Could not load image {image_path}: {e}")
+            return None
+
+        result = self._analyze_image_data(image_data, image_url)
+        if result:
+            result['image_local_path'] = image_path
+        return result
+
+    def _analyze_image_array(self, img, image_url, image_path, original_width, original_height, file_size):
+        """
+        Blur analysis of a decoded BGR image. img may be decoded at reduced size; the size checks
+        use the original dimensions.
+        """
+        # Skip very small images to avoid false positives
+        if original_width < self.min_image_size or original_height < self.min_image_size:
+            self.logger.debug(f"Skipping small image {image_url}: {original_width}x{original_height}")
+            return self._small_image_result(image_url, image_path, original_width, original_height, file_size)
+        
+        # Resize image preserving aspect ratio
+        img_resized = self._resize_image_preserve_aspect(img, self.resize_dimensions)
+        
+        # Convert to grayscale
+        gray = cv2.cvtColor(img_resized, cv2.COLOR_BGR2GRAY)
+        
+        # Method 1: Laplacian Variance
+        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
+        
+        # Method 2: Spatial Blur Detection (simplified version)
+        blur_percentage = self._calculate_blur_percentage(gray)
+        
+        # Combined decision logic
+        is_blurry = laplacian_var < self.threshold or blur_percentage > self.blur_percentage_threshold
+        
+        result = {
+            "image_url": image_url,
+            "image_local_path": image_path,
+            "is_blurry": is_blurry,
+            "laplacian_score": round(laplacian_var, 2),
+            "blur_percentage": round(blur_percentage, 1),
+            "image_width": original_width,
+            "image_height": original_height,
+            "file_size": file_size,
+            "threshold": self.threshold,
+            "skipped": False
+        }
+        
+        self.logger.debug(f"Analyzed {image_url}: Laplacian={laplacian_var:.2f}, Blur%={blur_percentage:.1f}, Blurry={is_blurry}")
+        return result
+
+    def _small_image_result(self, image_url, image_path, width, height, file_size):
+        return {
+            "image_url": image_url,
+            "image_local_path": image_path,
+            "is_blurry": False,
+            "laplacian_score": None,
+            "blur_percentage": None,
+            "image_width": width,
+            "image_height": height,
+            "file_size": file_size,
+            "skipped": True,
+            "skip_reason": "Image too small"
+        }
+
+    def _reduction_factor(self, width, height):
+        """
+        Largest of 1, 2, 4 and 8 that still decodes the image at least _MIN_DECODE_OVERSAMPLING
+        times as large as resize_dimensions. Factor 2 needs an image 2 * _MIN_DECODE_OVERSAMPLING
+        times the target (7680x4320 at the default 1280x720); smaller images get 1, a full decode.
+        """
+        target_width, target_height = self.resize_dimensions
+        scale = min(target_width / width, target_height / height)
+        factor = 1
+        while factor < 8 and scale * factor * 2 * _MIN_DECODE_OVERSAMPLING <= 1:
+            factor *= 2
+        return factor
+
+    def _decode_image(self, image_data, width=None, height=None):
+        """
+        Decodes image bytes into a BGR array without touching disk. With known dimensions, images
+        far larger than the resize target are decoded at a reduced size (JPEG decoders scale while
+        decoding) that is still well above the target (see _reduction_factor). Formats OpenCV cannot decode, such as GIF, are read with Pillow.
+        """
+        factor = self._reduction_factor(width, height) if width and height else 1
+        buffer = np.frombuffer(image_data, dtype=np.uint8)
+        img = cv2.imdecode(buffer, _REDUCED_DECODE_FLAGS[factor])
+        if img is not None:
+            return img
+        try:
+            with Image.open(BytesIO(image_data)) as pil_image:
+                if factor > 1:
+                    # JPEG draft mode decodes at 1/2, 1/4 or 1/8 scale
+                    pil_image.draft('RGB', (pil_image.width // factor, pil_image.height // factor))
+                rgb = np.asarray(pil_image.convert('RGB'))
+            return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR)
+        except Exception as e:
+            self.logger.debug(f"Could not decode image data: {e}")
+            return None
+
+    def _analyze_image_data(self, image_data, image_url):
+        """Blur analysis straight from downloaded bytes (very large images decoded at reduced size); no file is written."""
+        try:
+            header = read_image_header(image_data)
+            width, height = (header[1], header[2]) if header else (None, None)
+            if width and height and (width < self.min_image_size or height < self.min_image_size):
+                self.logger.debug(f"Skipping small image {image_url}: {width}x{height}")
+                return self._small_image_result(image_url, None, width, height, len(image_data))
+            
+            img = self._decode_image(image_data, width, height)
             if img is None:
-                self.logger.warning(f"Could not load image: {image_path}")
+                self.logger.warning(f"Could not decode image: {image_url}")
                 return None
-            
-            # Get original dimensions
-            original_height, original_width = img.shape[:2]
-            file_size = os.path.getsize(image_path)
-            
-            # Skip very small images to avoid false positives
-            if original_width < self.min_image_size or original_height < self.min_image_size:
-                self.logger.debug(f"Skipping small image {image_url}: {original_width}x{original_height}")
-                return {
-                    "image_url": image_url,
-                    "image_local_path": image_path,
-                    "is_blurry": False,
-                    "laplacian_score": None,
-                    "blur_percentage": None,
-                    "image_width": original_width,
-                    "image_height": original_height,
-                    "file_size": file_size,
-                    "skipped": True,
-                    "skip_reason": "Image too small"
-                }
-            
-            # Resize image preserving aspect ratio
-            img_resized = self._resize_image_preserve_aspect(img, self.resize_dimensions)
-            
-            # Convert to grayscale
-            gray = cv2.cvtColor(img_resized, cv2.COLOR_BGR2GRAY)
-            
-            # Method 1: Laplacian Variance
-            laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-            
-            # Method 2: Spatial Blur Detection (simplified version)
-            blur_percentage = self._calculate_blur_percentage(gray)
-            
-            # Combined decision logic
-            is_blurry = laplacian_var < self.threshold or blur_percentage > self.blur_percentage_threshold
-            
-            result = {
-                "image_url": image_url,
-                "image_local_path": image_path,
-                "is_blurry": is_blurry,
-                "laplacian_score": round(laplacian_var, 2),
-                "blur_percentage": round(blur_percentage, 1),
-                "image_width": original_width,
-                "image_height": original_height,
-                "file_size": file_size,
-                "threshold": self.threshold,
-                "skipped": False
-            }
-            
-            self.logger.debug(f"Analyzed {image_url}: Laplacian={laplacian_var:.2f}, Blur%={blur_percentage:.1f}, Blurry={is_blurry}")
-            return result
-            
+            if not (width and height):
+                height, width = img.shape[:2]
+            return self._analyze_image_array(img, image_url, None, width, height, len(image_data))
         except Exception as e:
-            self.logger.error(f"Error analyzing image {image_path}: {e}", exc_info=True)
+            self.logger.error(f"Error analyzing image {image_url}: {e}", exc_info=True)
+            return None
+
+    def _save_thumbnail(self, image_data, image_url, blur_dir, name_prefix):
+        """
+        Saves a JPEG thumbnail of a blurry image for the dashboard and returns its path. Thumbnails
+        are named by prefix and source file name, so an existing one is reused.
+        """
+        base_name = os.path.splitext(os.path.basename(urlparse(image_url).path) or 'image')[0] or 'image'
+        thumbnail_path = os.path.join(blur_dir, f"{name_prefix}_{base_name}.jpg")
+        if os.path.exists(thumbnail_path):
+            return thumbnail_path
+        header = read_image_header(image_data)
+        img = self._decode_image(image_data, *(header[1:] if header else (None, None)))
+        if img is None:
             return None
+        size = self.thumbnail_size
+        height, width = img.shape[:2]
+        scale = min(1.0, size / max(width, height))
+        if scale < 1.0:
+            img = cv2.resize(img, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_AREA)
+        if not cv2.imwrite(thumbnail_path, img, [cv2.IMWRITE_JPEG_QUALITY, 85]):
+            self.logger.error(f"Error saving thumbnail to {thumbnail_path}")
+            return None
+        return thumbnail_path
 
     def _analyze_image_parallel(self, args):
         """Helper function for parallel image analysis."""
@@ -644,8 +894,12 @@ class BlurDetector:
         finally:
             conn.close()
 
-    def _add_image_to_registry(self, website_id, image_url, image_local_path, page_url, file_size, image_width, image_height):
-        """Add a new image to the registry or update existing entry."""
+    def _add_image_to_registry(self, website_id, image_url, image_local_path, page_url, file_size, image_width, image_height,
+                               image_hash=None, etag=None, last_modified=None):
+        """
+        Add a new image to the registry or update existing entry.
+        When image_hash is given, the stored content hash, path and validators are refreshed too.
+        """
         conn = self._get_db_connection()
         try:
             cursor = conn.cursor()
@@ -659,7 +913,15 @@ class BlurDetector:
             
             existing = cursor.fetchone()
             
-            if existing:
+            if existing and image_hash:
+                cursor.execute('''
+                    UPDATE image_registry 
+                    SET last_seen_timestamp = ?, usage_count = usage_count + 1, image_hash = ?, image_local_path = ?,
+                        file_size = ?, image_width = ?, image_height = ?, etag = ?, last_modified = ?
+                    WHERE id = ?
+                ''', (now, image_hash, image_local_path, file_size, image_width, image_height, etag, last_modified, existing[0]))
+                self.logger.debug(f"Updated image registry entry for {image_url} (usage count: {existing[1] + 1})")
+            elif existing:
                 # Update existing entry
                 cursor.execute('''
                     UPDATE image_registry 
@@ -672,9 +934,10 @@ class BlurDetector:
                 cursor.execute('''
                     INSERT INTO image_registry 
                     (website_id, image_url, image_local_path, first_seen_page, first_seen_timestamp, 
-                     last_seen_timestamp, file_size, image_width, image_height)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (website_id, image_url, image_local_path, page_url, now, now, file_size, image_width, image_height))
+                     last_seen_timestamp, file_size, image_width, image_height, image_hash, etag, last_modified)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (website_id, image_url, image_local_path, page_url, now, now, file_size, image_width, image_height,
+                      image_hash, etag, last_modified))
                 self.logger.debug(f"Added new image to registry: {image_url}")
             
             conn.commit()
@@ -687,6 +950,120 @@ class BlurDetector:
         finally:
             conn.close()
 
+    def _load_image_registry(self, website_id):
+        """Registry entries of a website's images by URL, with the content hash and validators of their last download."""
+        conn = self._get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT image_url, image_hash, image_local_path, etag, last_modified
+                FROM image_registry 
+                WHERE website_id = ?
+            ''', (website_id,))
+            return {
+                row[0]: {'image_hash': row[1], 'image_local_path': row[2], 'etag': row[3], 'last_modified': row[4]}
+                for row in cursor.fetchall()
+            }
+        except Exception as e:
+            self.logger.error(f"Error loading image registry for website {website_id}: {e}")
+            return {}
+        finally:
+            conn.close()
+
+    def _get_cached_analysis(self, image_hash):
+        """Stored measurements of earlier analyzed image bytes at the current resize dimensions, or None."""
+        conn = self._get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT laplacian_score, blur_percentage, image_width, image_height, file_size
+                FROM image_analysis_cache 
+                WHERE image_hash = ? AND resize_dimensions = ?
+            ''', (image_hash, self._resize_key()))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return {
+                'laplacian_score': row[0],
+                'blur_percentage': row[1],
+                'image_width': row[2],
+                'image_height': row[3],
+                'file_size': row[4]
+            }
+        except Exception as e:
+            self.logger.error(f"Error reading image analysis cache: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def _store_cached_analysis(self, image_hash, analysis_result):
+        """Stores the measurements of an analysis result under the image's content hash."""
+        conn = self._get_db_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO image_analysis_cache 
+                (image_hash, resize_dimensions, laplacian_score, blur_percentage, image_width, image_height,
+                 file_size, analyzed_timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (image_hash, self._resize_key(), analysis_result.get('laplacian_score'),
+                  analysis_result.get('blur_percentage'), analysis_result.get('image_width'),
+                  analysis_result.get('image_height'), analysis_result.get('file_size'),
+                  datetime.now(timezone.utc).isoformat()))
+            conn.commit()
+        except Exception as e:
+            self.logger.error(f"Error storing image analysis cache entry: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
+
+    def _resize_key(self):
+        """
+        The measurements depend on the resize dimensions and on how far images are decoded before
+        resizing, so cache entries are kept per dimensions and decode mode.
+        """
+        return f"{self.resize_dimensions[0]}x{self.resize_dimensions[1]}@decode{_MIN_DECODE_OVERSAMPLING}x"
+
+    def _result_from_cached_analysis(self, cached, image_path, image_url):
+        """
+        An analysis result as _analyze_single_image returns it, built from cached measurements with
+        the current thresholds. None when the image was too small to be measured before but no longer is.
+        """
+        width, height = cached['image_width'], cached['image_height']
+        result = {
+            "image_url": image_url,
+            "image_local_path": image_path,
+            "image_width": width,
+            "image_height": height,
+            "file_size": cached['file_size'],
+            "from_cache": True
+        }
+        if width < self.min_image_size or height < self.min_image_size:
+            result.update({"is_blurry": False, "laplacian_score": None, "blur_percentage": None,
+                           "skipped": True, "skip_reason": "Image too small"})
+            return result
+        if cached['laplacian_score'] is None or cached['blur_percentage'] is None:
+            return None
+        result.update({
+            "is_blurry": cached['laplacian_score'] < self.threshold or cached['blur_percentage'] > self.blur_percentage_threshold,
+            "laplacian_score": cached['laplacian_score'],
+            "blur_percentage": cached['blur_percentage'],
+            "threshold": self.threshold,
+            "skipped": False
+        })
+        return result
+
+    def _remove_unreferenced_images(self, blur_dir, kept_paths):
+        """Deletes saved images of a website that no result of the current run refers to."""
+        kept = {os.path.abspath(path) for path in kept_paths}
+        try:
+            for name in os.listdir(blur_dir):
+                path = os.path.join(blur_dir, name)
+                if os.path.isfile(path) and os.path.abspath(path) not in kept:
+                    os.remove(path)
+        except Exception as e:
+            self.logger.error(f"Error removing unreferenced blur images from {blur_dir}: {e}")
+
     def _deduplicate_images(self, website_id, all_images_data):
         """Remove duplicate images from the dataset based on URL."""
         if not all_images_data:
@@ -739,14 +1116,13 @@ class BlurDetector:
             self.logger.warning(f"Error during image deduplication: {e}")
         
         try:
-            # Single cleanup operation for the entire website
-            self.cleanup_blur_data_for_website(website_id)
+            # Single cleanup operation for the entire website; cached analysis results keep their thumbnails
+            self.cleanup_blur_data_for_website(website_id, keep_images=self.analysis_cache_enabled)
             
             # Create blur images directory
             blur_dir = self._create_blur_images_directory(website_id)
             
             processed_count = 0
-            max_workers = 2  # Reduced from 5 to avoid overwhelming servers
             
             # Group images by page for better logging
             pages_with_images = {}
@@ -759,15 +1135,15 @@ class BlurDetector:
             total_pages = len(pages_with_images)
             total_images = len(all_images_data)
             
-            self.logger.info(f"Starting parallel blur analysis for {total_images} unique images from {total_pages} pages of website {website_id} using {max_workers} workers")
+            self.logger.info(f"Starting parallel blur analysis for {total_images} unique images from {total_pages} pages of website {website_id}")
             
-            # Process all images (cache system removed for always getting latest data)
+            # Every image is revalidated; unchanged ones reuse their stored analysis below
             images_to_process = all_images_data
-            self.logger.info(f"Processing all {len(images_to_process)} images (cache system disabled for latest data)")
+            registry_entries = self._load_image_registry(website_id) if self.analysis_cache_enabled else {}
             
             # Step 2: Process all images
             if images_to_process:
-                # Parallel downloading and saving of new images
+                # Parallel downloading and in-memory analysis of images
                 download_args = []
                 for i, img_data in enumerate(images_to_process):
                     page_url = img_data['page_url']
@@ -776,53 +1152,57 @@ class BlurDetector:
                     # Generate page-specific index for filename
                     page_index = list(pages_with_images.keys()).index(page_url) + 1
                     
-                    download_args.append((i, image_url, page_url, blur_dir, page_index))
-            
-            downloaded_images = []
-            
-            with ThreadPoolExecutor(max_workers=max_workers) as download_executor:
-                download_results = download_executor.map(self._download_and_save_image_batch, download_args)
-                
-                for i, result in enumerate(download_results):
-                    if result and result[3]:  # If download was successful
-                        downloaded_images.append((result[0], result[1], result[2]))  # (local_path, image_url, page_url)
-                    elif result and not result[3]:  # If download failed
-                        self.logger.warning(f"Failed to download image: {result[1]}")
-            
-                    # Add small delay every few downloads to be respectful to servers
-                    if (i + 1) % 3 == 0:
-                        time.sleep(0.5)  # 0.5 second delay every 3 downloads
+                    download_args.append((i, image_url, page_url, blur_dir, page_index, img_data.get('image_bytes'),
+                                          registry_entries.get(image_url)))
+            
+            processed_images = []  # (image_url, page_url, cache_info, analysis_result)
+            
+            # Each image is downloaded and analyzed in memory by the pooled downloader's workers; its
+            # per-host limits keep this polite to each server, and its bounded queue keeps only a few
+            # images in memory at a time
+            with self._download_session() as downloader:
+                for result in downloader.map(self._download_and_analyze_image, download_args):
+                    processed_images.append(result)
+            
+            probe_skipped = sum(1 for _, _, cache_info, _ in processed_images if cache_info.get('probe_skipped'))
+            from_cache = sum(1 for _, _, _, analysis_result in processed_images
+                             if analysis_result and analysis_result.get('from_cache'))
+            if probe_skipped:
+                self.logger.info(f"Skipped {probe_skipped} images after reading their headers (SVGs, tracking pixels, small images)")
+            if from_cache:
+                self.logger.info(f"Reusing cached blur analysis for {from_cache} unchanged images")
+            
+            kept_paths = []
+            for image_url, page_url, cache_info, analysis_result in processed_images:
+                if not analysis_result:
+                    continue
+                local_path = analysis_result.get('image_local_path')
+                # Convert absolute path to relative path for web serving; only blurry images have one
+                relative_path = os.path.relpath(local_path, 'data') if local_path else None
+                analysis_result['image_local_path'] = relative_path
+                analysis_result['page_url'] = page_url
+                analysis_result['website_id'] = website_id
+                analysis_result['crawl_id'] = crawl_id
+                analysis_result['timestamp'] = datetime.now(timezone.utc).isoformat()
                 
-                self.logger.info(f"Downloaded {len(downloaded_images)} out of {len(images_to_process)} new images successfully")
+                # Add to image registry; images ruled out by their header are recorded with their skip reason only
+                if not cache_info.get('probe_skipped'):
+                    self._add_image_to_registry(
+                        website_id, image_url, relative_path, page_url,
+                        analysis_result['file_size'], analysis_result['image_width'], analysis_result['image_height'],
+                        image_hash=cache_info.get('image_hash'), etag=cache_info.get('etag'),
+                        last_modified=cache_info.get('last_modified')
+                    )
                 
-                # Step 3: Parallel analysis of downloaded images
-            if downloaded_images:
-                with ProcessPoolExecutor(max_workers=min(max_workers, multiprocessing.cpu_count())) as analysis_executor:
-                    analysis_results = analysis_executor.map(self._analyze_image_parallel_batch, downloaded_images)
-                    
-                    for (local_path, image_url, page_url), analysis_result in zip(downloaded_images, analysis_results):
-                        if analysis_result:
-                            # Convert absolute path to relative path for web serving
-                            relative_path = os.path.relpath(local_path, 'data')
-                            analysis_result['image_local_path'] = relative_path
-                            analysis_result['page_url'] = page_url
-                            analysis_result['website_id'] = website_id
-                            analysis_result['crawl_id'] = crawl_id
-                            analysis_result['timestamp'] = datetime.now(timezone.utc).isoformat()
-                            
-                            # Add to image registry
-                            if 'file_size' in analysis_result and 'image_width' in analysis_result and 'image_height' in analysis_result:
-                                self._add_image_to_registry(
-                                    website_id, image_url, relative_path, page_url,
-                                    analysis_result['file_size'], analysis_result['image_width'], analysis_result['image_height']
-                                )
-                            
-                            results.append(analysis_result)
-                            processed_count += 1
-                        else:
-                            # Clean up failed analysis
-                            if os.path.exists(local_path):
-                                os.remove(local_path)
+                results.append(analysis_result)
+                if local_path:
+                    kept_paths.append(local_path)
+                if not cache_info.get('probe_skipped'):
+                    processed_count += 1
+            
+            if self.analysis_cache_enabled:
+                # Thumbnails kept from earlier checks of images that are gone or no longer blurry
+                self._remove_unreferenced_images(blur_dir, kept_paths)
             
             # Log detailed results by page
             for page_url, expected_count in pages_with_images.items():
@@ -845,50 +1225,84 @@ class BlurDetector:
                 return results
             return []
     
-    def _download_and_save_image_batch(self, args):
-        """Helper function for parallel batch image downloading and saving."""
-        i, image_url, page_url, blur_dir, page_index = args
+    def _download_and_analyze_image(self, args):
+        """
+        Helper function for the pooled batch download and analysis of one image.
+        An optional sixth element holds image bytes already fetched by the browser, which skips the download.
+        An optional seventh element is the image's registry entry; with the analysis cache enabled the
+        download is then revalidated, and an unchanged image reuses its stored analysis.
+        
+        The image is analyzed in memory; only blurry images are saved, as thumbnails.
+        Returns (image_url, page_url, cache_info, analysis_result); analysis_result is None when the
+        image could not be downloaded or analyzed.
+        """
+        i, image_url, page_url, blur_dir, page_index = args[:5]
+        prefetched_data = args[5] if len(args) > 5 else None
+        registry_entry = args[6] if len(args) > 6 else None
+        cache_info = {}
         
         try:
-            # Generate local filename with page information
-            parsed_url = urlparse(image_url)
-            filename = f"page_{page_index}_{os.path.basename(parsed_url.path) or 'image'}"
-            if not filename.lower().endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp')):
-                filename += '.jpg'  # Default extension
-            
-            local_path = os.path.join(blur_dir, filename)
-            
-            # Download image
-            image_data = self._download_image(image_url, page_url)
-            if image_data:
-                # Save image data to file
-                try:
-                    with open(local_path, 'wb') as f:
-                        f.write(image_data)
-                    return (local_path, image_url, page_url, True)
-                except Exception as e:
-                    self.logger.error(f"Error saving image data to {local_path}: {e}")
-                    return (local_path, image_url, page_url, False)
+            # Use the bytes captured during rendering when they look like a real image, otherwise download
+            response_info = {}
+            if prefetched_data and self._is_valid_image_data(prefetched_data):
+                image_data = prefetched_data
             else:
-                return (local_path, image_url, page_url, False)
+                revalidate = self.analysis_cache_enabled and registry_entry and registry_entry.get('image_hash')
+                image_data = None
+                if self.probe_enabled and not revalidate:
+                    # New images are probed first; known ones are revalidated instead
+                    probe = self._probe_image(image_url, page_url)
+                    if probe and probe['skip_reason']:
+                        self.logger.debug(f"Skipping {image_url} after header probe: {probe['skip_reason']}")
+                        return (image_url, page_url, {'probe_skipped': True}, self._probe_skip_result(image_url, probe))
+                    if probe and probe.get('image_data'):
+                        image_data = probe['image_data']
+                        response_info = {'etag': probe.get('etag'), 'last_modified': probe.get('last_modified')}
+                if image_data is None:
+                    image_data = self._download_image(image_url, page_url, validators=registry_entry if revalidate else None,
+                                                      response_info=response_info)
+                if response_info.get('not_modified'):
+                    cache_info = {'image_hash': registry_entry['image_hash'], 'etag': registry_entry.get('etag'),
+                                  'last_modified': registry_entry.get('last_modified')}
+                    cached = self._get_cached_analysis(registry_entry['image_hash'])
+                    analysis_result = self._result_from_cached_analysis(cached, None, image_url) if cached else None
+                    saved_path = registry_entry.get('image_local_path')
+                    saved_path = os.path.join('data', saved_path) if saved_path else None
+                    if analysis_result and not analysis_result['is_blurry']:
+                        return (image_url, page_url, cache_info, analysis_result)
+                    if analysis_result and saved_path and os.path.exists(saved_path):
+                        analysis_result['image_local_path'] = saved_path
+                        return (image_url, page_url, cache_info, analysis_result)
+                    # No stored analysis or thumbnail, so fetch the image again
+                    response_info = {}
+                    image_data = self._download_image(image_url, page_url, response_info=response_info)
+            if not image_data:
+                self.logger.warning(f"Failed to download image: {image_url}")
+                return (image_url, page_url, cache_info, None)
+            
+            analysis_result = None
+            name_prefix = f"page_{page_index}_{i + 1}"
+            if self.analysis_cache_enabled:
+                image_hash = hashlib.sha256(image_data).hexdigest()
+                cache_info = {'image_hash': image_hash, 'etag': response_info.get('etag'),
+                              'last_modified': response_info.get('last_modified')}
+                # Thumbnails are named by content, so the same bytes keep their file from check to check
+                name_prefix = image_hash[:16]
+                cached = self._get_cached_analysis(image_hash)
+                analysis_result = self._result_from_cached_analysis(cached, None, image_url) if cached else None
+            if analysis_result is None:
+                analysis_result = self._analyze_image_data(image_data, image_url)
+                if analysis_result and cache_info.get('image_hash'):
+                    self._store_cached_analysis(cache_info['image_hash'], analysis_result)
+            
+            if analysis_result and analysis_result['is_blurry']:
+                analysis_result['image_local_path'] = self._save_thumbnail(image_data, image_url, blur_dir, name_prefix)
+            return (image_url, page_url, cache_info, analysis_result)
                 
         except Exception as e:
-            self.logger.error(f"Error downloading image {i+1} from {page_url}: {e}", exc_info=True)
-            return None
+            self.logger.error(f"Error processing image {i+1} from {page_url}: {e}", exc_info=True)
+            return (image_url, page_url, cache_info, None)
     
-    def _analyze_image_parallel_batch(self, args):
-        """Helper function for parallel batch image analysis."""
-        local_path, image_url, page_url = args
-        
-        try:
-            if os.path.exists(local_path):
-                return self._analyze_single_image(local_path, image_url)
-            else:
-                return None
-        except Exception as e:
-            self.logger.error(f"Error analyzing image {local_path}: {e}", exc_info=True)
-            return None
-
     def analyze_page_images(self, website_id, page_url, images_list, crawl_id=None):
         """Analyze all images from a page for blur detection using multiprocessing."""
         if not images_list:
@@ -912,10 +1326,8 @@ class BlurDetector:
             download_args = [(i, img_data, page_url, blur_dir) for i, img_data in enumerate(images_list)]
             downloaded_images = []
             
-            with ThreadPoolExecutor(max_workers=max_workers) as download_executor:
-                download_results = download_executor.map(self._download_and_save_image, download_args)
-                
-                for result in download_results:
+            with self._download_session() as downloader:
+                for result in downloader.map(self._download_and_save_image, download_args):
                     if result and result[2]:  # If download was successful
                         downloaded_images.append((result[0], result[1]))  # (local_path, image_url)
                     elif result and not result[2]:  # If download failed
@@ -975,8 +1387,8 @@ class BlurDetector:
                     INSERT INTO blur_detection_results 
                     (crawl_id, website_id, page_url, image_url, image_local_path, 
                      laplacian_score, blur_percentage, is_blurry, image_width, 
-                     image_height, file_size, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     image_height, file_size, timestamp, skip_reason)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     crawl_id,
                     result['website_id'],
@@ -989,7 +1401,8 @@ class BlurDetector:
                     result['image_width'],
                     result['image_height'],
                     result['file_size'],
-                    result['timestamp']
+                    result['timestamp'],
+                    result.get('skip_reason')
                 ))
             
             conn.commit()
@@ -0,0 +1,237 @@
+"""
+Runs Playwright captures in an isolated worker process.
+
+Chromium leaks memory over long runs and a runaway page can hang a capture indefinitely.
+A CaptureWorker moves the browser into a separate process that receives capture tasks over
+a queue. The worker is recycled after a number of pages or when the resident memory of its
+process group (the worker plus its Playwright driver and Chromium processes) crosses a
+threshold, and a capture that exceeds the hard timeout gets the whole process group killed
+instead of stalling the check.
+"""
+import os
+import queue
+import signal
+import time
+import multiprocessing
+from itertools import count
+
+from src.config_loader import get_config
+from src.logger_setup import setup_logging
+
+logger = setup_logging()
+
+DEFAULT_MAX_PAGES_PER_WORKER = 50
+DEFAULT_MAX_RSS_MB = 1500
+DEFAULT_CAPTURE_TIMEOUT_SECONDS = 180
+
+def get_process_group_rss_mb(pgid: int) -> float | None:
+    """
+    Returns the combined resident memory (MB) of all processes in a process group,
+    or None where /proc is not available.
+    """
+    if not os.path.isdir('/proc'):
+        return None
+
+    page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+    total_pages = 0
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue  # Process exited while scanning
+        # Fields after the command name, which is wrapped in parentheses and may contain spaces
+        fields = stat[stat.rfind(')') + 2:].split()
+        # fields[2] is the process group, fields[21] the resident set size in pages
+        if len(fields) > 21 and int(fields[2]) == pgid:
+            total_pages += int(fields[21])
+    return total_pages * page_size / (1024 * 1024)
+
+def _run_capture_task(task: dict, sessions: dict):
+    """Executes one capture task inside the worker process."""
+    from src.snapshot_tool import SiteCaptureSession, capture_page_artifacts, save_visual_snapshot
+
+    site_id = task['site_id']
+    session = sessions.get(site_id)
+    if session is None and task.get('reuse_context', True):
+        # Only one site's context is kept open per worker
+        for other_session in sessions.values():
+            other_session.close()
+        sessions.clear()
+        session = SiteCaptureSession(site_id, task['site_url'])
+        session.start()
+        sessions[site_id] = session
+
+    options = dict(site_id=site_id, url=task['url'], is_baseline=task['is_baseline'], url_path=task.get('url_path'),
+                   session=session, ignore_selectors=task.get('ignore_selectors'))
+    if task['kind'] == 'artifacts':
+        return capture_page_artifacts(capture_images=task.get('capture_images', True), **options)
+    return save_visual_snapshot(**options)
+
+def _worker_main(task_queue, result_queue):
+    """Entry point of the worker process: executes capture tasks until it receives None."""
+    # Own process group, so the parent can kill the worker together with its browser processes
+    if hasattr(os, 'setsid'):
+        os.setsid()
+
+    sessions = {}
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            try:
+                result_queue.put((task['task_id'], _run_capture_task(task, sessions), None))
+            except Exception as e:
+                result_queue.put((task['task_id'], None, str(e)))
+    finally:
+        for session in sessions.values():
+            session.close()
+
+class CaptureWorker:
+    """
+    Parent-side handle for an isolated capture process.
+
+    The methods mirror the snapshot_tool capture functions, so callers can swap a
+    CaptureWorker in for a SiteCaptureSession:
+        worker = CaptureWorker(site_id, site_url)
+        artifacts = worker.capture_page_artifacts(site_id, url, is_baseline=False, url_path='home')
+        worker.close()
+    """
+
+    def __init__(self, site_id: str, site_url: str, config_path: str | None = None):
+        config = get_config(config_path=config_path)
+        worker_config = config.get('capture_workers', {}) or {}
+        reuse_config = config.get('browser_context_reuse', {}) or {}
+        self.site_id = site_id
+        self.site_url = site_url
+        self.max_pages_per_worker = worker_config.get('max_pages_per_worker', DEFAULT_MAX_PAGES_PER_WORKER)
+        self.max_rss_mb = worker_config.get('max_rss_mb', DEFAULT_MAX_RSS_MB)
+        self.capture_timeout = worker_config.get('capture_timeout_seconds', DEFAULT_CAPTURE_TIMEOUT_SECONDS)
+        self.reuse_context = reuse_config.get('enabled', True)
+
+        # 'spawn' avoids forking the scheduler's threads and locks into the worker
+        self._mp_context = multiprocessing.get_context('spawn')
+        self._process = None
+        self._task_queue = None
+        self._result_queue = None
+        self._task_ids = count(1)
+        self.pages_on_worker = 0
+        self.workers_started = 0
+
+    def start(self):
+        """Starts a fresh worker process."""
+        self._task_queue = self._mp_context.Queue()
+        self._result_queue = self._mp_context.Queue()
+        self._process = self._mp_context.Process(
+            target=_worker_main,
+            args=(self._task_queue, self._result_queue),
+            name=f"capture-worker-{self.site_id}",
+            daemon=True
+        )
+        self._process.start()
+        self.pages_on_worker = 0
+        self.workers_started += 1
+        logger.info(f"Started capture worker process {self._process.pid} for site ID {self.site_id}")
+        return self
+
+    def close(self):
+        """Stops the worker process, waiting briefly for its browser to shut down cleanly."""
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            try:
+                self._task_queue.put(None)
+            except Exception:
+                pass
+            self._process.join(10)
+        if self._process.is_alive():
+            self._kill()
+        else:
+            logger.info(f"Capture worker process {self._process.pid} for site ID {self.site_id} stopped")
+        self._process = None
+
+    def _kill(self):
+        """Kills the worker and every process in its group (Playwright driver and Chromium)."""
+        pid = self._process.pid
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(pid, signal.SIGKILL)
+            else:
+                self._process.kill()
+        except (ProcessLookupError, PermissionError):
+            self._process.kill()
+        self._process.join(5)
+        logger.warning(f"Killed capture worker process {pid} for site ID {self.site_id}")
+
+    def _recycle_if_needed(self):
+        """Replaces the worker once it has captured too many pages or grown too large."""
+        reason = None
+        if self.pages_on_worker >= self.max_pages_per_worker:
+            reason = f"{self.pages_on_worker} pages captured"
+        else:
+            rss_mb = get_process_group_rss_mb(self._process.pid)
+            if rss_mb is not None and rss_mb > self.max_rss_mb:
+                reason = f"RSS {rss_mb:.0f}MB exceeds {self.max_rss_mb}MB"
+
+        if reason:
+            logger.info(f"Recycling capture worker for site ID {self.site_id}: {reason}")
+            self.close()
+
+    def _submit(self, kind: str, site_id: str, url: str, is_baseline: bool, url_path: str | None,
+                ignore_selectors: list[str] | None = None, capture_images: bool = True):
+        if self._process is None or not self._process.is_alive():
+            self.start()
+
+        task_id = next(self._task_ids)
+        self._task_queue.put({
+            'task_id': task_id,
+            'kind': kind,
+            'site_id': site_id,
+            'site_url': self.site_url,
+            'url': url,
+            'is_baseline': is_baseline,
+            'url_path': url_path,
+            'ignore_selectors': ignore_selectors,
+            'capture_images': capture_images,
+            'reuse_context': self.reuse_context
+        })
+
+        deadline = time.monotonic() + self.capture_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error(f"Capture of {url} exceeded {self.capture_timeout}s; killing worker for site ID {self.site_id}")
+                self._kill()
+                self._process = None
+                return None
+            try:
+                result_id, result, error = self._result_queue.get(timeout=min(remaining, 5))
+            except queue.Empty:
+                if not self._process.is_alive():
+                    logger.error(f"Capture worker for site ID {self.site_id} died while capturing {url} "
+                                 f"(exit code {self._process.exitcode})")
+                    self._process = None
+                    return None
+                continue
+            if result_id == task_id:
+                break
+            # A late result from a task that was abandoned earlier; discard it
+
+        self.pages_on_worker += 1
+        if error:
+            logger.error(f"Capture worker failed to capture {url}: {error}")
+        self._recycle_if_needed()
+        return result
+
+    def capture_page_artifacts(self, site_id: str, url: str, is_baseline: bool = False, url_path: str = None,
+                               ignore_selectors: list[str] | None = None, capture_images: bool = True) -> dict | None:
+        """Runs snapshot_tool.capture_page_artifacts in the worker process."""
+        return self._submit('artifacts', site_id, url, is_baseline, url_path, ignore_selectors, capture_images)
+
+    def save_visual_snapshot(self, site_id: str, url: str, is_baseline: bool = False, url_path: str = None,
+                             ignore_selectors: list[str] | None = None) -> str | None:
+        """Runs snapshot_tool.save_visual_snapshot in the worker process."""
+        return self._submit('screenshot', site_id, url, is_baseline, url_path, ignore_selectors)
@@ -0,0 +1,72 @@
+"""
+Change gate for visual captures.
+
+Scheduled checks used to screenshot every page even when nothing on it had changed. The crawler
+already downloads each page's HTML, so it now also records a gate value per page: a hash of the
+canonical DOM (see content_normalizer.py) plus the URLs of the stylesheets, scripts and images it
+references. The raw asset URLs are kept, so a new cache-busting version of a stylesheet opens the
+gate. A latest snapshot is only captured when the gate value differs from the one confirmed by the
+baseline or by the last capture that matched the baseline; a capture that still shows a change
+confirms nothing, so the page keeps being captured. After force_capture_every - 1 skips in a row the
+page is captured anyway.
+
+The gate state is kept on the page's all_baselines entry: 'gate_value' (at baseline creation),
+'confirmed_gate_value' (at the last capture without a change) and 'gate_skipped_checks'.
+"""
+import hashlib
+
+from src.config_loader import get_config
+from src.content_normalizer import canonical_hash
+from src.logger_setup import setup_logging
+from src.parsed_page import get_parsed_page
+
+logger = setup_logging()
+
+# Every this many checks an unchanged page is captured anyway (0 or None: never forced)
+DEFAULT_FORCE_CAPTURE_EVERY = 10
+
+def get_gate_options(config: dict | None = None) -> dict:
+    """The change_gate config section, with defaults."""
+    gate_config = (config if config is not None else get_config()).get('change_gate', {}) or {}
+    return {
+        'enabled': gate_config.get('enabled', True),
+        'force_capture_every': gate_config.get('force_capture_every', DEFAULT_FORCE_CAPTURE_EVERY)
+    }
+
+def referenced_asset_urls(soup) -> list[str]:
+    """Sorted URLs of the stylesheets, scripts and images a page references."""
+    urls = set()
+    for link in soup.find_all('link', href=True):
+        rel = link.get('rel') or []
+        if 'stylesheet' in [value.lower() for value in (rel if isinstance(rel, list) else [rel])]:
+            urls.add(link['href'].strip())
+    for tag in soup.find_all(['script', 'img', 'source', 'iframe'], src=True):
+        urls.add(tag['src'].strip())
+    for tag in soup.find_all(['img', 'source'], srcset=True):
+        urls.update(candidate.split()[0] for candidate in tag['srcset'].split(',') if candidate.strip())
+    return sorted(urls)
+
+def compute_gate_value(html_content: str, soup=None, normalization_rules: list | None = None) -> str:
+    """Hash of the canonical DOM and the referenced asset URLs of a page."""
+    if soup is None:
+        soup = get_parsed_page(html_content).soup
+    digest = hashlib.sha256(canonical_hash(html_content, normalization_rules).encode('ascii'))
+    for url in referenced_asset_urls(soup):
+        digest.update(b'\n' + url.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+def should_capture(gate_value: str | None, baseline_info: dict | None,
+                   force_capture_every: int | None = DEFAULT_FORCE_CAPTURE_EVERY) -> bool:
+    """
+    False only when the page's gate value matches the last confirmed one and a forced capture is
+    not yet due. Pages without a gate value or baseline are always captured.
+    """
+    if not gate_value or not baseline_info:
+        return True
+    reference = baseline_info.get('confirmed_gate_value') or baseline_info.get('gate_value')
+    if reference != gate_value:
+        return True
+    if force_capture_every and baseline_info.get('gate_skipped_checks', 0) + 1 >= force_capture_every:
+        logger.debug(f"Forcing a capture after {baseline_info.get('gate_skipped_checks', 0)} skipped checks")
+        return True
+    return False
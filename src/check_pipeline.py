@@ -0,0 +1,108 @@
+"""
+Pipelined execution of the snapshot stage of a site check.
+
+Instead of waiting for the whole crawl to finish, the crawler hands every page it discovers
+to a SnapshotPipeline. Pages that pass the visual filter are captured (and compared against
+their baselines) on a background thread while the crawl keeps fetching further pages, so the
+total check time approaches the longest stage rather than the sum of all stages.
+"""
+import queue
+import threading
+
+from src.logger_setup import setup_logging
+
+logger = setup_logging()
+
+_STOP = object()
+
+class SnapshotPipeline:
+    """
+    Background capture queue for one site check.
+
+    Usage:
+        pipeline = SnapshotPipeline(crawler_module, results, is_baseline=False)
+        pipeline.start()
+        ... pipeline.submit(page_record) for every crawled page ...
+        pipeline.finish()   # waits for queued captures and stores them in results
+    """
+
+    def __init__(self, crawler_module, results, is_baseline=False):
+        self.crawler_module = crawler_module
+        self.results = results
+        self.is_baseline = is_baseline
+        self.website_id = results['website_id']
+        self.snapshot_map = {}
+        self.page_results = results.get('page_results', {})
+        self.pages_submitted = 0
+
+        website = crawler_module.website_manager.get_website(self.website_id) or {}
+        self.all_baselines = website.get('all_baselines', {})
+
+        self._queue = queue.Queue()
+        self._submitted_urls = set()
+        self._thread = None
+        self._finished = False
+        self._cancelled = threading.Event()
+
+    def start(self):
+        """Starts the capture thread."""
+        self._thread = threading.Thread(target=self._run, name=f"snapshot-pipeline-{self.website_id}", daemon=True)
+        self._thread.start()
+        logger.info(f"Started snapshot pipeline for website {self.website_id} (baseline: {self.is_baseline})")
+        return self
+
+    def submit(self, page):
+        """Queues a crawled page for capture if it passes the visual filter. Returns True if queued."""
+        url = page.get('url')
+        if not url or url in self._submitted_urls or self._finished:
+            return False
+        if not self.crawler_module._is_snapshot_candidate(page, self.website_id):
+            return False
+
+        self._submitted_urls.add(url)
+        self.pages_submitted += 1
+        self._queue.put(url)
+        logger.debug(f"Queued {url} for snapshot capture ({self._queue.qsize()} waiting)")
+        return True
+
+    def finish(self, timeout=None):
+        """
+        Waits for all queued captures to complete and stores the snapshots in the check results.
+
+        If the capture thread is still running after timeout seconds, it is told to stop after its
+        current page and nothing is stored: the snapshots are incomplete and the thread may still
+        write to them. results['snapshot_pipeline_incomplete'] is set instead.
+        """
+        if self._finished:
+            return
+        self._finished = True
+
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                self._cancelled.set()
+                self.results['snapshot_pipeline_incomplete'] = True
+                logger.error(f"Snapshot pipeline for website {self.website_id} did not finish within {timeout}s; "
+                             f"cancelled the remaining captures and left the visual check incomplete")
+                return
+
+        if not self.pages_submitted:
+            logger.warning(f"No valid internal pages found to capture snapshots for website {self.website_id}.")
+            return
+        self.crawler_module._finish_snapshots(self.results, self.is_baseline, self.snapshot_map, self.page_results)
+
+    def _run(self):
+        capture_session = self.crawler_module._open_capture_session(self.results)
+        try:
+            while True:
+                url = self._queue.get()
+                if url is _STOP or self._cancelled.is_set():
+                    break
+                self.crawler_module._snapshot_page(url, self.results, self.is_baseline, self.all_baselines,
+                                                   self.page_results, self.snapshot_map, capture_session)
+        except Exception as e:
+            logger.error(f"Snapshot pipeline for website {self.website_id} stopped unexpectedly: {e}", exc_info=True)
+        finally:
+            if capture_session is not None:
+                capture_session.close()
@@ -1,5 +1,4 @@
 import difflib
-from bs4 import BeautifulSoup
 from src.logger_setup import setup_logging
 from PIL import Image, ImageChops, ImageDraw
 import numpy as np
@@ -7,6 +6,16 @@ import os
 import diff_match_patch as dmp_module # Import the library
 from datetime import datetime
 from src.image_processor import create_visual_diff_report # Import the new function
+from src.tiled_screenshot import SnapshotReader, is_tiled_snapshot
+from src.visual_diff import (compare_image_files, DEFAULT_PYRAMID_BLOCK_SIZE, DEFAULT_PYRAMID_SATURATION,
+                             DEFAULT_PYRAMID_MAX_ERROR_PERCENT, DEFAULT_REGION_MERGE_DISTANCE, DEFAULT_MAX_REGIONS)
+from src.baseline_cache import load_baseline_array
+from src.tile_hashing import load_tile_hashes, find_changed_tiles
+from src.ignore_masks import get_ignore_mask, load_ignore_regions
+from src.parsed_page import ParsedPage, get_parsed_page
+from src.text_diff import compare_texts, DEFAULT_TIME_BUDGET_SECONDS, DEFAULT_MAX_EDITS
+from src.structure_fingerprint import structure_fingerprint, fingerprint_distance, DEFAULT_MAX_DISTANCE
+from src.config_loader import get_config
 
 # Attempt to import OpenCV and scikit-image for SSIM, but make it optional
 try:
@@ -19,6 +28,7 @@ except ImportError:
     ssim = None
 
 logger = setup_logging()
+config = get_config()
 
 def _apply_ignore_regions(image: Image.Image, regions: list[list[int]]) -> Image.Image:
     """Applies ignore regions to an image by drawing black rectangles.
@@ -51,37 +61,39 @@ def _apply_ignore_regions(image: Image.Image, regions: list[list[int]]) -> Image
             logger.warning(f"Skipping invalid ignore region (must have 4 elements [x,y,w,h]): {region}")
     return img_copy
 
-def extract_text_from_html(html_content: str) -> str:
+def extract_text_from_html(html_content: str | ParsedPage) -> str:
     """
     Extracts and cleans text content from HTML.
     Removes script and style tags, and normalizes whitespace.
+
+    Like the other HTML comparators, accepts the HTML or a ParsedPage; HTML is parsed once and
+    shared through the parsed page cache.
     """
     if not html_content:
         return ""
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # Remove script and style elements
-        for script_or_style in soup(['script', 'style']):
-            script_or_style.decompose()
-
-        # Get text and normalize whitespace
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        return text
+        return get_parsed_page(html_content).text
     except Exception as e:
         logger.error(f"Error extracting text from HTML: {e}", exc_info=True)
         return "" # Return empty string on error to avoid breaking comparisons
 
-def compare_html_text_content(old_html: str, new_html: str) -> tuple[float, list[str]]:
+def _get_text_diff_options(time_budget: float | None) -> dict:
+    """compare_texts arguments from the text_diff config section; an explicit time budget wins."""
+    text_diff_config = config.get('text_diff', {}) or {}
+    if time_budget is None:
+        time_budget = text_diff_config.get('time_budget_seconds', DEFAULT_TIME_BUDGET_SECONDS)
+    return {'time_budget': time_budget, 'max_edits': text_diff_config.get('max_edits', DEFAULT_MAX_EDITS)}
+
+def compare_html_text_content(old_html: str | ParsedPage, new_html: str | ParsedPage,
+                              time_budget: float | None = None) -> tuple[float, list[str]]:
     """
     Compares the textual content of two HTML documents.
 
     Args:
         old_html (str): The old HTML content.
         new_html (str): The new HTML content.
+        time_budget (float, optional): Seconds the line diff may take before the similarity is
+            estimated instead (see text_diff.compare_texts). Defaults to text_diff.time_budget_seconds.
 
     Returns:
         tuple[float, list[str]]: 
@@ -106,19 +118,10 @@ def compare_html_text_content(old_html: str, new_html: str) -> tuple[float, list
         return 0.0, diff_output
 
 
-    # Using SequenceMatcher for similarity ratio
-    similarity_ratio = difflib.SequenceMatcher(None, old_text, new_text).ratio()
+    # Line-based diff: character-level SequenceMatcher is quadratic on large pages
+    similarity_ratio, diff_output = compare_texts(old_text, new_text, fromfile='old_version', tofile='new_version',
+                                                  **_get_text_diff_options(time_budget))
 
-    # Using unified_diff for human-readable differences
-    # splitlines() is important for difflib
-    diff_output = list(difflib.unified_diff(
-        old_text.splitlines(),
-        new_text.splitlines(),
-        fromfile='old_version',
-        tofile='new_version',
-        lineterm='' # Keep newlines if any, but primarily for splitting
-    ))
-    
     logger.debug(f"HTML text comparison similarity: {similarity_ratio:.4f}")
     return similarity_ratio, diff_output
 
@@ -160,37 +163,53 @@ def compare_text_semantic(text1: str, text2: str) -> tuple[float, list[tuple[int
     logger.debug(f"Semantic text comparison similarity: {similarity:.4f}, Levenshtein distance: {lev_distance}")
     return similarity, diffs
 
-def compare_html_structure(old_html: str, new_html: str) -> tuple[float, list[str]]:
+def compare_html_structure(old_html: str | ParsedPage, new_html: str | ParsedPage,
+                           time_budget: float | None = None, old_fingerprint: str | None = None,
+                           new_fingerprint: str | None = None) -> tuple[float, list[str]]:
     """
     Compares the structure of two HTML documents, ignoring text content within tags for the primary comparison.
-    It serializes the parsed HTML (minus script, style, comments, and text nodes) and compares these representations.
+    It serializes the parsed HTML (minus script, style, comments, and text nodes) and compares these representations
+    (see ParsedPage.structure).
+
+    The structure fingerprints (see structure_fingerprint.py) are compared first: documents whose
+    fingerprints are at most structure_fingerprint.max_distance bits apart count as structurally
+    identical, and are not serialized or diffed.
 
     Args:
         old_html (str): The old HTML content.
         new_html (str): The new HTML content.
+        time_budget (float, optional): Seconds the line diff may take before the similarity is
+            estimated instead. Defaults to text_diff.time_budget_seconds.
+        old_fingerprint, new_fingerprint (str, optional): Fingerprints stored at capture time;
+            computed from the HTML when not given.
 
     Returns:
         tuple[float, list[str]]:
             - Similarity ratio of the structural representations (0.0 to 1.0).
             - A list of strings representing the differences in the serialized structure.
     """
-    def get_structural_representation(html_content: str) -> str:
+    def get_structural_representation(html_content: str | ParsedPage) -> str:
         if not html_content:
             return ""
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            # Remove script, style, and comment tags
-            for unwanted_tag in soup(['script', 'style', 'comment']):
-                unwanted_tag.decompose()
-            # Remove all text nodes to focus on tags and their attributes
-            for element in soup.find_all(text=True):
-                element.extract()
-            # Return a string representation of the cleaned soup, pretty-printed for consistent formatting
-            return soup.prettify()
+            return get_parsed_page(html_content).structure
         except Exception as e:
             logger.error(f"Error generating structural representation from HTML: {e}", exc_info=True)
             return "" # Return empty on error
 
+    fingerprint_config = config.get('structure_fingerprint', {}) or {}
+    # Empty documents fall through to the checks below
+    if (fingerprint_config.get('enabled', True) and old_html and new_html and
+            get_parsed_page(old_html).html_content and get_parsed_page(new_html).html_content):
+        try:
+            distance = fingerprint_distance(old_fingerprint or structure_fingerprint(old_html),
+                                            new_fingerprint or structure_fingerprint(new_html))
+            if distance <= fingerprint_config.get('max_distance', DEFAULT_MAX_DISTANCE):
+                logger.debug(f"HTML structure fingerprints differ by {distance} bits; skipping the structural diff")
+                return 1.0, []
+        except Exception as e:
+            logger.error(f"Error comparing structure fingerprints: {e}", exc_info=True)
+
     old_structure_str = get_structural_representation(old_html)
     new_structure_str = get_structural_representation(new_html)
 
@@ -207,31 +226,19 @@ def compare_html_structure(old_html: str, new_html: str) -> tuple[float, list[st
         ))
         return 0.0, diff_output
 
-    similarity_ratio = difflib.SequenceMatcher(None, old_structure_str, new_structure_str).ratio()
-    
-    diff_output = list(difflib.unified_diff(
-        old_structure_str.splitlines(),
-        new_structure_str.splitlines(),
-        fromfile='old_structure',
-        tofile='new_structure',
-        lineterm=''
-    ))
+    similarity_ratio, diff_output = compare_texts(old_structure_str, new_structure_str, fromfile='old_structure',
+                                                  tofile='new_structure', **_get_text_diff_options(time_budget))
 
     logger.debug(f"HTML structural comparison similarity: {similarity_ratio:.4f}")
     return similarity_ratio, diff_output
 
-def extract_meta_tags(html_content: str, meta_names: list[str]) -> dict[str, str | None]:
+def extract_meta_tags(html_content: str | ParsedPage, meta_names: list[str]) -> dict[str, str | None]:
     """Extracts specified meta tags (by name) from HTML content."""
     if not html_content:
         return {name: None for name in meta_names}
-    soup = BeautifulSoup(html_content, 'html.parser')
-    extracted_tags = {}
-    for name in meta_names:
-        tag = soup.find('meta', attrs={'name': name})
-        extracted_tags[name] = tag['content'] if tag and tag.has_attr('content') else None
-    return extracted_tags
+    return get_parsed_page(html_content).meta_tags(meta_names)
 
-def compare_meta_tags(old_html: str, new_html: str, meta_names: list[str]) -> dict[str, dict[str, str | None]] :
+def compare_meta_tags(old_html: str | ParsedPage, new_html: str | ParsedPage, meta_names: list[str]) -> dict[str, dict[str, str | None]] :
     """Compares specified meta tags between old and new HTML content."""
     old_tags = extract_meta_tags(old_html, meta_names)
     new_tags = extract_meta_tags(new_html, meta_names)
@@ -243,17 +250,13 @@ def compare_meta_tags(old_html: str, new_html: str, meta_names: list[str]) -> di
             logger.debug(f"Meta tag '{name}' changed from '{old_tags.get(name)}' to '{new_tags.get(name)}'")
     return changes
 
-def extract_links(html_content: str) -> set[str]:
+def extract_links(html_content: str | ParsedPage) -> set[str]:
     """Extracts all unique href values from anchor tags."""
     if not html_content:
         return set()
-    soup = BeautifulSoup(html_content, 'html.parser')
-    links = set()
-    for a_tag in soup.find_all('a', href=True):
-        links.add(a_tag['href'].strip())
-    return links
+    return set(get_parsed_page(html_content).links)
 
-def compare_links(old_html: str, new_html: str) -> dict[str, set[str]]:
+def compare_links(old_html: str | ParsedPage, new_html: str | ParsedPage) -> dict[str, set[str]]:
     """Compares links found in old and new HTML content."""
     old_links = extract_links(old_html)
     new_links = extract_links(new_html)
@@ -270,15 +273,13 @@ def compare_links(old_html: str, new_html: str) -> dict[str, set[str]]:
         logger.debug(f"Links removed: {removed_links}")
     return changes
 
-def extract_canonical_url(html_content: str) -> str | None:
+def extract_canonical_url(html_content: str | ParsedPage) -> str | None:
     """Extracts the canonical URL from the HTML content."""
     if not html_content:
         return None
-    soup = BeautifulSoup(html_content, 'html.parser')
-    canonical_tag = soup.find('link', rel='canonical', href=True)
-    return canonical_tag['href'] if canonical_tag else None
+    return get_parsed_page(html_content).canonical_url
 
-def compare_canonical_urls(old_html: str, new_html: str) -> dict[str, str | None] | None:
+def compare_canonical_urls(old_html: str | ParsedPage, new_html: str | ParsedPage) -> dict[str, str | None] | None:
     """Compares canonical URLs from old and new HTML content."""
     old_canonical = extract_canonical_url(old_html)
     new_canonical = extract_canonical_url(new_html)
@@ -289,17 +290,13 @@ def compare_canonical_urls(old_html: str, new_html: str) -> dict[str, str | None
         return change
     return None
 
-def extract_image_sources(html_content: str) -> set[str]:
+def extract_image_sources(html_content: str | ParsedPage) -> set[str]:
     """Extracts all unique src values from img tags."""
     if not html_content:
         return set()
-    soup = BeautifulSoup(html_content, 'html.parser')
-    img_sources = set()
-    for img_tag in soup.find_all('img', src=True):
-        img_sources.add(img_tag['src'].strip())
-    return img_sources
+    return set(get_parsed_page(html_content).image_sources)
 
-def compare_image_sources(old_html: str, new_html: str) -> dict[str, set[str]]:
+def compare_image_sources(old_html: str | ParsedPage, new_html: str | ParsedPage) -> dict[str, set[str]]:
     """Compares the src attributes of all <img> tags."""
     old_images = extract_image_sources(old_html)
     new_images = extract_image_sources(new_html)
@@ -332,74 +329,289 @@ def compare_screenshots_percentage(
             - The percentage of different pixels.
             - The path to the generated diff image, or None if no difference.
     """
+    result = compare_screenshots_detailed(image_path1, image_path2, ignore_regions)
+    return result['percent'], result['diff_image_path']
+
+def compare_screenshots_detailed(
+    image_path1: str,
+    image_path2: str,
+    ignore_regions: list[list[int]] = None,
+    compute_ssim: bool = False,
+    decision_threshold: float | None = None,
+    base_array: np.ndarray | None = None
+) -> dict:
+    """
+    Compares two screenshots in a single pass and returns every result of the comparison.
+
+    Whole images are decoded once by the visual_diff engine, which derives the percentage,
+    change bounding box, optional SSIM and the before/after report from the same arrays. The
+    baseline (image_path1) comes from the decoded baseline cache, so repeated comparisons
+    against it skip PNG decoding, unless an already decoded baseline is passed as base_array
+    (as batch_comparison does with arrays in shared memory).
+
+    Ignore regions are combined with the regions that CSS ignore selectors resolved to when
+    either screenshot was captured (see ignore_masks), and are applied as a mask to the
+    difference rather than painted onto copies of the images.
+
+    With visual_comparison.mode set to 'pyramid', whole images are compared coarse-to-fine (see
+    visual_diff.diff_arrays_pyramid): the percentage may then overstate the exact value by at
+    most visual_comparison.pyramid_max_error_percent, but never flips the comparison with
+    decision_threshold (the alert threshold percentage).
+
+    Returns:
+        dict: {
+            'percent': percentage of different pixels,
+            'diff_image_path': path of the before/after report, or None,
+            'bbox': (left, top, right, bottom) of the changed area, or None if unknown or unchanged,
+            'regions': separate (left, top, right, bottom) changed regions, empty if unknown or unchanged,
+            'shifted_regions': blocks of rows that moved without changing (see screenshot_alignment),
+            'ssim': SSIM score when compute_ssim is set and it could be computed, else None
+        }
+    """
+    result = {'percent': 0.0, 'diff_image_path': None, 'bbox': None, 'regions': [], 'shifted_regions': [], 'ssim': None}
     if not os.path.exists(image_path1):
         logger.error(f"Baseline image not found at: {image_path1}")
-        return 100.0, None # Return max difference if baseline is missing
+        result['percent'] = 100.0 # Return max difference if baseline is missing
+        return result
     if not os.path.exists(image_path2):
         logger.error(f"Latest image not found at: {image_path2}")
         # This case is tricky. If the new snapshot failed, is it a change?
         # For now, let's say it's not a comparable change.
+        return result
+
+    # Elements matched by ignore selectors, wherever they were in either screenshot
+    ignore_regions = list(ignore_regions or []) + load_ignore_regions(image_path1) + load_ignore_regions(image_path2)
+
+    # Fast path: compare the tile hashes stored at capture time before decoding anything
+    hashed_result = _compare_by_tile_hashes(image_path1, image_path2, ignore_regions)
+    if hashed_result is not None:
+        result['percent'], result['diff_image_path'] = hashed_result
+        if compute_ssim and hashed_result[0] == 0:
+            result['ssim'] = 1.0
+        return result
+
+    if is_tiled_snapshot(image_path1) or is_tiled_snapshot(image_path2):
+        result['percent'], result['diff_image_path'] = _compare_screenshots_by_band(image_path1, image_path2, ignore_regions)
+        return result
+
+    try:
+        comparison = compare_image_files(image_path1, image_path2, ignore_regions=ignore_regions,
+                                         compute_ssim=compute_ssim, report_path=_get_diff_report_path(image_path2),
+                                         base_array=base_array if base_array is not None else load_baseline_array(image_path1),
+                                         pyramid=_get_pyramid_options(decision_threshold),
+                                         align=(config.get('visual_comparison', {}) or {}).get('align_shifts', True),
+                                         **_get_region_options())
+        result.update(percent=comparison['percent'], diff_image_path=comparison['diff_image_path'],
+                      bbox=comparison['bbox'], regions=comparison['regions'],
+                      shifted_regions=comparison['shifted_regions'], ssim=comparison['ssim'])
+
+        logger.info(f"Visual comparison of {os.path.basename(image_path1)} and {os.path.basename(image_path2)}: {result['percent']:.4f}% difference.")
+        if result['diff_image_path']:
+            logger.info(f"Visual diff report generated at: {result['diff_image_path']}")
+        return result
+
+    except FileNotFoundError as e:
+        logger.error(f"Error comparing images: {e}")
+        result['percent'] = 100.0 # Treat file not found as a major difference
+        return result
+    except Exception as e:
+        logger.error(f"An unexpected error occurred during image comparison: {e}", exc_info=True)
+        result['percent'] = 100.0 # Treat any error as a major difference to be safe
+        return result
+
+def _get_pyramid_options(decision_threshold: float | None) -> dict | None:
+    """Options for the coarse-to-fine comparison, or None when full-resolution comparison is configured."""
+    comparison_config = config.get('visual_comparison', {}) or {}
+    if comparison_config.get('mode', 'full') != 'pyramid':
+        return None
+    return {
+        'block_size': comparison_config.get('pyramid_block_size', DEFAULT_PYRAMID_BLOCK_SIZE),
+        'saturation': comparison_config.get('pyramid_saturation', DEFAULT_PYRAMID_SATURATION),
+        'max_error_percent': comparison_config.get('pyramid_max_error_percent', DEFAULT_PYRAMID_MAX_ERROR_PERCENT),
+        'decision_threshold': decision_threshold
+    }
+
+def _get_region_options() -> dict:
+    """How changed pixels are grouped into the regions of the diff report."""
+    comparison_config = config.get('visual_comparison', {}) or {}
+    return {
+        'merge_distance': comparison_config.get('region_merge_distance', DEFAULT_REGION_MERGE_DISTANCE),
+        'max_regions': comparison_config.get('max_regions', DEFAULT_MAX_REGIONS)
+    }
+
+def _get_diff_report_path(image_path2: str) -> str:
+    """Path for a new diff report image in the 'diffs' folder next to the latest snapshot."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    diff_dir = os.path.join(os.path.dirname(image_path2), 'diffs')
+    return os.path.join(diff_dir, f'diff_{timestamp}_{os.path.basename(image_path2)}')
+
+def _count_band_changes(base_band: Image.Image, latest_band: Image.Image, band_mask: np.ndarray | None) -> int:
+    """Changed channel values of two equally sized bands, leaving out the pixels set in band_mask."""
+    diff_np = np.array(ImageChops.difference(base_band, latest_band))
+    if band_mask is not None:
+        diff_np[band_mask] = 0
+    return int(np.count_nonzero(diff_np))
+
+def _create_band_diff_report(base_reader: SnapshotReader, latest_reader: SnapshotReader, y: int, height: int,
+                             width: int, image_path2: str) -> str | None:
+    """Creates the before/after diff report for rows [y, y + height) of two snapshots."""
+    diff_image_path = _get_diff_report_path(image_path2)
+    diff_dir = os.path.dirname(diff_image_path)
+    os.makedirs(diff_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+    # The diff report works on files, so write out just the two bands it needs
+    base_band_path = os.path.join(diff_dir, f'band_base_{timestamp}.png')
+    latest_band_path = os.path.join(diff_dir, f'band_latest_{timestamp}.png')
+    base_reader.read_band(y, height, width).save(base_band_path)
+    latest_reader.read_band(y, height, width).save(latest_band_path)
+    try:
+        diff_image_final_path = create_visual_diff_report(
+            base_path=base_band_path,
+            latest_path=latest_band_path,
+            output_path=diff_image_path
+        )
+    finally:
+        for band_path in (base_band_path, latest_band_path):
+            if os.path.exists(band_path):
+                os.remove(band_path)
+    if diff_image_final_path:
+        logger.info(f"Visual diff report for rows {y}-{y + height} generated at: {diff_image_final_path}")
+    return diff_image_final_path
+
+def _compare_by_tile_hashes(
+    image_path1: str,
+    image_path2: str,
+    ignore_regions: list[list[int]] = None
+) -> tuple[float, str | None] | None:
+    """
+    Fast path of compare_screenshots_percentage based on the tile hashes stored at capture time.
+
+    Snapshots whose tile hashes all match are reported unchanged without decoding either image.
+    For tiled snapshots, only the tiles whose hashes differ are pixel-diffed, one row of tiles at
+    a time. Returns None when either snapshot has no usable hashes, or when a whole-image snapshot
+    changed, so the caller runs the full diff.
+    """
+    hashes1 = load_tile_hashes(image_path1)
+    hashes2 = load_tile_hashes(image_path2)
+    if not hashes1 or not hashes2:
+        return None
+
+    tile_hash_config = config.get('tile_hashing', {}) or {}
+    changed_tiles = find_changed_tiles(hashes1, hashes2, tile_hash_config.get('perceptual_threshold'))
+    if changed_tiles is None:
+        return None
+    if not changed_tiles:
+        logger.info(f"Visual comparison of {os.path.basename(image_path1)} and {os.path.basename(image_path2)}: all tile hashes match, 0% difference.")
         return 0.0, None
+    # Changed whole images are decoded once by the single-pass engine, which reuses the cached baseline
+    if not (is_tiled_snapshot(image_path1) or is_tiled_snapshot(image_path2)):
+        return None
 
+    base_reader = latest_reader = None
     try:
-        base_img = Image.open(image_path1).convert('RGB')
-        latest_img = Image.open(image_path2).convert('RGB')
+        base_reader = SnapshotReader(image_path1)
+        latest_reader = SnapshotReader(image_path2)
+        tile_size, width, height = hashes1['tile_size'], hashes1['width'], hashes1['height']
+        ignore_mask = get_ignore_mask(ignore_regions, height, width)
+
+        columns_by_row = {}
+        for row, column in changed_tiles:
+            columns_by_row.setdefault(row, []).append(column)
+
+        non_zero_pixels = 0
+        worst_row = None  # (changed pixels, y, band height)
+        for row in sorted(columns_by_row):
+            y = row * tile_size
+            band_height = min(tile_size, height - y)
+            base_band = base_reader.read_band(y, band_height)
+            latest_band = latest_reader.read_band(y, band_height)
+
+            row_changed = 0
+            for column in columns_by_row[row]:
+                x0, x1 = column * tile_size, min((column + 1) * tile_size, width)
+                box = (x0, 0, x1, band_height)
+                tile_mask = ignore_mask[y:y + band_height, x0:x1] if ignore_mask is not None else None
+                row_changed += _count_band_changes(base_band.crop(box), latest_band.crop(box), tile_mask)
+            non_zero_pixels += row_changed
+            if row_changed and (worst_row is None or row_changed > worst_row[0]):
+                worst_row = (row_changed, y, band_height)
+
+        # Same denominator as the full diff: every channel of every pixel
+        total_pixels = width * height * 3
+        percentage_diff = (non_zero_pixels / total_pixels) * 100 if total_pixels > 0 else 0
+        logger.info(f"Visual comparison of {os.path.basename(image_path1)} and {os.path.basename(image_path2)}: "
+                    f"{len(changed_tiles)}/{hashes1['rows'] * hashes1['columns']} tiles changed, {percentage_diff:.4f}% difference.")
+
+        diff_image_final_path = None
+        if worst_row:
+            _, y, band_height = worst_row
+            diff_image_final_path = _create_band_diff_report(base_reader, latest_reader, y, band_height, width, image_path2)
+
+        return percentage_diff, diff_image_final_path
+
+    except Exception as e:
+        logger.error(f"Tile hash comparison failed, falling back to a full diff: {e}", exc_info=True)
+        return None
+    finally:
+        for reader in (base_reader, latest_reader):
+            if reader is not None:
+                reader.close()
+
+def _compare_screenshots_by_band(
+    image_path1: str,
+    image_path2: str,
+    ignore_regions: list[list[int]] = None
+) -> tuple[float, str | None]:
+    """
+    Tile-by-tile variant of compare_screenshots_percentage for tiled snapshots.
+
+    Both snapshots are read in horizontal bands of one tile height, so only one band of each
+    image is decoded at a time. Sizes are padded with white as in the whole-image comparison,
+    and ignore regions are given in page coordinates. The diff report covers the band with
+    the most changed pixels.
+    """
+    base_reader = latest_reader = None
+    try:
+        base_reader = SnapshotReader(image_path1)
+        latest_reader = SnapshotReader(image_path2)
+        band_height = base_reader.tile_height or latest_reader.tile_height
+        width = max(base_reader.width, latest_reader.width)
+        height = max(base_reader.height, latest_reader.height)
+        ignore_mask = get_ignore_mask(ignore_regions, height, width)
+
+        non_zero_pixels = 0
+        total_pixels = 0
+        worst_band = None  # (changed pixels, y, band height)
+        for y in range(0, height, band_height):
+            current_height = min(band_height, height - y)
+            base_band = base_reader.read_band(y, current_height, width)
+            latest_band = latest_reader.read_band(y, current_height, width)
+
+            band_mask = ignore_mask[y:y + current_height] if ignore_mask is not None else None
+            band_changed = _count_band_changes(base_band, latest_band, band_mask)
+            non_zero_pixels += band_changed
+            total_pixels += width * current_height * 3
+            if band_changed and (worst_band is None or band_changed > worst_band[0]):
+                worst_band = (band_changed, y, current_height)
 
-        # Apply ignore regions if any
-        if ignore_regions:
-            base_img = _apply_ignore_regions(base_img, ignore_regions)
-            latest_img = _apply_ignore_regions(latest_img, ignore_regions)
-
-        # Resize images to be the same size for comparison, using the larger dimensions
-        if base_img.size != latest_img.size:
-            logger.warning(f"Image sizes differ. Base: {base_img.size}, Latest: {latest_img.size}. Resizing to common dimensions for comparison.")
-            # Create a new blank canvas with the max dimensions of both images
-            max_width = max(base_img.width, latest_img.width)
-            max_height = max(base_img.height, latest_img.height)
-            
-            new_base_img = Image.new('RGB', (max_width, max_height), (255, 255, 255))
-            new_base_img.paste(base_img, (0, 0))
-            base_img = new_base_img
-            
-            new_latest_img = Image.new('RGB', (max_width, max_height), (255, 255, 255))
-            new_latest_img.paste(latest_img, (0, 0))
-            latest_img = new_latest_img
-
-        # --- Calculate Percentage Difference ---
-        diff = ImageChops.difference(base_img, latest_img)
-        diff_np = np.array(diff)
-        non_zero_pixels = np.count_nonzero(diff_np)
-        total_pixels = diff_np.size
         percentage_diff = (non_zero_pixels / total_pixels) * 100 if total_pixels > 0 else 0
-        
-        logger.info(f"Visual comparison of {os.path.basename(image_path1)} and {os.path.basename(image_path2)}: {percentage_diff:.4f}% difference.")
+        logger.info(f"Tiled visual comparison of {os.path.basename(image_path1)} and {os.path.basename(image_path2)}: {percentage_diff:.4f}% difference.")
 
-        # --- Generate Diff Image using the user's script logic ---
         diff_image_final_path = None
-        if percentage_diff > 0:
-            # Define a path for the diff report image
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            diff_dir = os.path.join(os.path.dirname(image_path2), 'diffs')
-            os.makedirs(diff_dir, exist_ok=True)
-            diff_image_path = os.path.join(diff_dir, f'diff_{timestamp}_{os.path.basename(image_path2)}')
-            
-            # Call the function from image_processor to create the "before/after" report
-            diff_image_final_path = create_visual_diff_report(
-                base_path=image_path1,
-                latest_path=image_path2,
-                output_path=diff_image_path
-            )
-            if diff_image_final_path:
-                logger.info(f"Visual diff report generated at: {diff_image_final_path}")
+        if worst_band:
+            _, y, current_height = worst_band
+            diff_image_final_path = _create_band_diff_report(base_reader, latest_reader, y, current_height, width, image_path2)
 
         return percentage_diff, diff_image_final_path
 
-    except FileNotFoundError as e:
-        logger.error(f"Error comparing images: {e}")
-        return 100.0, None # Treat file not found as a major difference
     except Exception as e:
-        logger.error(f"An unexpected error occurred during image comparison: {e}", exc_info=True)
+        logger.error(f"An unexpected error occurred during tiled image comparison: {e}", exc_info=True)
         return 100.0, None # Treat any error as a major difference to be safe
+    finally:
+        for reader in (base_reader, latest_reader):
+            if reader is not None:
+                reader.close()
 
 def compare_screenshots(image_path1: str, image_path2: str, diff_image_path: str = None, ignore_regions: list[list[int]] = None, create_comparison: bool = False) -> tuple[float, str | None, str | None]:
     """
@@ -0,0 +1,84 @@
+"""
+Normalization of dynamic page content before hashing.
+
+save_html_snapshot stores a SHA-256 of the raw HTML, but nonces, CSRF tokens, cache-busting
+query strings of assets and machine-readable timestamps make that hash differ on every load of an
+unchanged page. The canonical hash is taken after a list of regex rules has replaced those
+values: the built-in rules below, the content_normalization.rules of the config and the site's
+own 'normalization_rules'. When the canonical hashes of the baseline and latest DOM match, the
+HTML comparators have nothing to find and are skipped. The built-in rules only touch markup
+(attributes, asset URLs), never the page text, so a changed date or price in the text still
+changes the hash.
+
+A rule is a regex string (matches are removed) or a dict {'pattern': ..., 'replacement': ...};
+use inline flags such as (?i) for case-insensitive rules.
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+from src.config_loader import get_config
+from src.logger_setup import setup_logging
+
+logger = setup_logging()
+
+DEFAULT_RULES = (
+    # Script/style nonces as attributes or in inline JSON/JS ("nonce":"...", _wpnonce=...)
+    {'pattern': r'''(?i)(\b[\w-]*nonce["']?\s*[:=]\s*["']?)[\w+/=-]+''', 'replacement': r'\1'},
+    # CSRF tokens in form fields and meta tags, with the name before or after the value
+    {'pattern': r'''(?i)(name=["'](?:csrf[\w-]*|_csrf|_token|authenticity_token|__requestverificationtoken|csrfmiddlewaretoken)["'][^>]*?\b(?:value|content)=["'])[^"']*''',
+     'replacement': r'\1'},
+    {'pattern': r'''(?i)(\b(?:value|content)=["'])[^"']*(["'][^>]*?\bname=["'](?:csrf[\w-]*|_csrf|_token|authenticity_token|__requestverificationtoken|csrfmiddlewaretoken)["'])''',
+     'replacement': r'\1\2'},
+    # Cache-busting query strings of stylesheet, script, font and image URLs in src/href
+    # attributes (style.css?ver=6.4.2, app.js?v=1718000000); other URLs keep their query
+    {'pattern': r'''(?i)(\b(?:src|href)\s*=\s*["']?[^"'\s<>?#]+\.(?:css|js|mjs|woff2?|ttf|otf|eot|png|jpe?g|gif|svg|webp|avif|ico)\?)[^"'\s<>#]*''',
+     'replacement': r'\1'},
+    # Machine-readable dates of <time datetime="..."> and ISO 8601 timestamps in other attribute
+    # values (data-updated="..."); dates in the page text are content
+    {'pattern': r'''(?i)(<time\b[^<>]*?\bdatetime\s*=\s*["'])[^"'<>]*''', 'replacement': r'\1'},
+    {'pattern': r'''(<[^<>]*?=\s*["'][^"'<>]*?)\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?\b''',
+     'replacement': r'\1<timestamp>'},
+    # Whitespace runs, so re-indented markup hashes the same
+    {'pattern': r'\s+', 'replacement': ' '},
+)
+
+def _rule_key(rule: str | dict) -> tuple[str, str]:
+    if isinstance(rule, str):
+        return rule, ''
+    return rule['pattern'], rule.get('replacement', '')
+
+@lru_cache(maxsize=64)
+def _compile_rules(rule_keys: tuple[tuple[str, str], ...]) -> tuple[tuple[re.Pattern, str], ...]:
+    """Compiles (pattern, replacement) pairs once per distinct rule list; invalid patterns are skipped."""
+    compiled = []
+    for pattern, replacement in rule_keys:
+        try:
+            compiled.append((re.compile(pattern), replacement))
+        except re.error as e:
+            logger.warning(f"Ignoring invalid content normalization rule {pattern!r}: {e}")
+    return tuple(compiled)
+
+def get_normalization_rules(site_rules: list | None = None) -> tuple[tuple[re.Pattern, str], ...]:
+    """The compiled rules for a site: built-in rules (unless disabled), config rules, then the site's rules."""
+    normalization_config = get_config().get('content_normalization', {}) or {}
+    rules = list(DEFAULT_RULES) if normalization_config.get('default_rules', True) else []
+    rules += normalization_config.get('rules') or []
+    rules += site_rules or []
+    try:
+        rule_keys = tuple(_rule_key(rule) for rule in rules)
+    except (KeyError, TypeError) as e:
+        logger.warning(f"Ignoring malformed content normalization rules: {e}")
+        rule_keys = tuple(_rule_key(rule) for rule in DEFAULT_RULES)
+    return _compile_rules(rule_keys)
+
+def normalize_html(html_content: str, site_rules: list | None = None) -> str:
+    """The HTML with every normalization rule applied in order."""
+    normalized = html_content or ""
+    for pattern, replacement in get_normalization_rules(site_rules):
+        normalized = pattern.sub(replacement, normalized)
+    return normalized.strip()
+
+def canonical_hash(html_content: str, site_rules: list | None = None) -> str:
+    """SHA-256 of the normalized HTML; equal for loads of a page that differ only in dynamic values."""
+    return hashlib.sha256(normalize_html(html_content, site_rules).encode('utf-8', 'surrogatepass')).hexdigest()
@@ -8,6 +8,7 @@ from datetime import datetime, timezone
 from urllib.parse import urljoin, urlparse, urlunparse
 from typing import Dict, List, Any, Optional, Tuple
 import sqlite3
+import threading
 from src.website_manager_sqlite import WebsiteManager
 
 import re
@@ -15,11 +16,17 @@ import re
 from src.greenflare_crawler import GreenflareWrapper, GREENFLARE_AVAILABLE
 from src.logger_setup import setup_logging
 from src.config_loader import get_config
-from src.comparators import compare_screenshots_percentage, compare_screenshots_ssim, OPENCV_SKIMAGE_AVAILABLE
+from src.comparators import compare_screenshots_detailed, OPENCV_SKIMAGE_AVAILABLE
+from src.batch_comparison import compare_screenshot_pairs, get_batch_options
+from src.change_gate import get_gate_options, should_capture
+from src.baseline_cache import invalidate_baseline
 from src.path_utils import get_database_path, ensure_directory_exists
 
 logger = setup_logging()
 
+# Direct links to images are never snapshotted
+IMAGE_URL_PATTERN = re.compile(r'\.(png|jpg|jpeg|gif|webp|svg|bmp)$', re.IGNORECASE)
+
 class CrawlerModule:
     def __init__(self, config_path=None):
         self.logger = logger
@@ -43,6 +50,10 @@ class CrawlerModule:
         # Initialize website manager (use SQLite version)
         from src.website_manager_sqlite import WebsiteManagerSQLite
         self.website_manager = WebsiteManagerSQLite(config_path=config_path)
+
+        # Image response bodies captured with the snapshots of the current check, by page URL, for
+        # blur detection to reuse. None while the check will not run blur detection.
+        self._captured_images = None
         
         # Initialize database
         self._initialize_database()
@@ -273,6 +284,15 @@ class CrawlerModule:
         
         self.logger.info(f"Check configuration: {check_config} (scheduled: {is_scheduled})")
 
+        # Image bodies are only kept from the snapshot captures when blur detection can reuse them
+        self._captured_images = {} if blur_check_only or check_config.get('blur_enabled', False) else None
+
+        # Pipelined execution: snapshots are captured while the crawl runs and later stages
+        # start as soon as their inputs are ready, instead of waiting out fixed delays.
+        pipeline_enabled = (self.config.get('check_pipeline', {}) or {}).get('enabled', True)
+        snapshot_pipeline = None
+        performance_thread = None
+
         results = {
             "website_id": website_id, "url": url, "timestamp": datetime.now().isoformat(),
             "broken_links": [], "missing_meta_tags": [], "all_pages": [],
@@ -364,6 +384,10 @@ class CrawlerModule:
                     'extract_alt_text': True,  # Also extract alt text for accessibility checks
                                             'meta_tags': self.config.get('meta_tags_to_check', ["title", "description"])  # Use configured meta tags
                 }
+                if get_gate_options(self.config)['enabled']:
+                    # Gate values let the visual step skip pages that have not changed since the last capture
+                    greenflare_config['compute_gate_values'] = True
+                    greenflare_config['normalization_rules'] = (self.website_manager.get_website(website_id) or {}).get('normalization_rules', [])
                 
                 # Run crawl if crawl is enabled OR performance check is enabled (need pages for performance analysis)
                 performance_enabled = check_config.get('performance_enabled', False) or options.get('performance_check_only', False)
@@ -375,14 +399,21 @@ class CrawlerModule:
                         greenflare_config['max_depth'] = min(greenflare_config.get('max_depth', 2), 2)
                         self.logger.info(f"Running crawl for performance check with max_depth={greenflare_config['max_depth']}")
                     
+                    if pipeline_enabled and check_config.get('visual_enabled', True) and not crawl_only:
+                        snapshot_pipeline = self._start_snapshot_pipeline(results, create_baseline)
+                    if snapshot_pipeline:
+                        # Process pages as they are crawled so captures start while crawling continues
+                        greenflare_config['on_page'] = lambda page: self._process_streamed_page(page, results, url, snapshot_pipeline)
+                    
                     crawler = self.bot.configure(greenflare_config)
                     
                     start_time = time.time()
                     crawl_results = crawler.run()
                     self.logger.info(f"Crawl completed in {time.time() - start_time:.2f} seconds.")
                     
-                    for page in crawl_results.get('pages', []):
-                        self._process_page(page, results, url)
+                    if not snapshot_pipeline:
+                        for page in crawl_results.get('pages', []):
+                            self._process_page(page, results, url)
                 else:
                     self.logger.info("Crawling disabled for this check - using existing data or single page")
                     
@@ -469,7 +500,9 @@ class CrawlerModule:
             # For visual-only checks, always run visual comparison regardless of other check types
             visual_check_only = options.get('visual_check_only', False)
             if check_config.get('visual_enabled', True) and not crawl_only and (not blur_check_only or visual_check_only):
-                if create_baseline:
+                if snapshot_pipeline:
+                    self.logger.info(f"Visual snapshots for website {website_id} are being captured by the check pipeline")
+                elif create_baseline:
                     self.logger.info(f"Creating visual baselines for website {website_id}")
                     self._create_visual_baselines(results)
                 else:
@@ -497,12 +530,26 @@ class CrawlerModule:
             crawl_id = self._save_crawl_results(results)
             results['crawl_id'] = crawl_id
 
+            if snapshot_pipeline:
+                # Performance only needs the crawled pages, so it runs while captures continue
+                if check_config.get('performance_enabled', False) or options.get('performance_check_only', False):
+                    performance_thread = threading.Thread(
+                        target=self._run_performance_check_if_enabled,
+                        args=(results, website_id, original_options),
+                        name=f"performance-check-{website_id}",
+                        daemon=True
+                    )
+                    performance_thread.start()
+                # Blur detection reuses the image bytes captured by the pipeline, so wait for it first
+                if (self.config.get('single_navigation_capture', {}) or {}).get('enabled', True):
+                    snapshot_pipeline.finish()
+
             # Run blur detection if enabled for this website (after saving to get crawl_id)
             blur_enabled = check_config.get('blur_enabled', False)
             self.logger.info(f"Blur check evaluation - blur_check_only: {blur_check_only}, blur_enabled: {blur_enabled}")
             
-            # Add delay between check types for single-site processing
-            if check_delay > 0:
+            # Add delay between check types for single-site processing (not needed when pipelined)
+            if check_delay > 0 and not snapshot_pipeline:
                 self.logger.info(f"⏳ Waiting {check_delay}s before running blur detection...")
                 time.sleep(check_delay)
             
@@ -516,9 +563,11 @@ class CrawlerModule:
                 self._run_blur_detection_if_enabled(results, website_id, original_options)
             else:
                 self.logger.debug(f"Blur detection disabled - blur_check_only: {blur_check_only}, blur_enabled: {blur_enabled}")
+            # Captures still running in the pipeline have no use for image bodies any more
+            self._captured_images = None
             
-            # Add delay between check types for single-site processing
-            if check_delay > 0:
+            # Add delay between check types for single-site processing (not needed when pipelined)
+            if check_delay > 0 and not snapshot_pipeline:
                 self.logger.info(f"⏳ Waiting {check_delay}s before running performance check...")
                 time.sleep(check_delay)
             
@@ -529,12 +578,17 @@ class CrawlerModule:
             
             # For performance-only checks, always run regardless of other settings
             # For other checks, only run if performance is enabled in the check configuration
-            if performance_check_only or performance_enabled:
+            if performance_thread:
+                performance_thread.join()
+            elif performance_check_only or performance_enabled:
                 self.logger.info(f"Running performance check for website {website_id} (performance_check_only: {performance_check_only}, performance_enabled: {performance_enabled})")
                 self._run_performance_check_if_enabled(results, website_id, original_options)
             else:
                 self.logger.debug(f"Performance check disabled - performance_enabled: {performance_enabled}, performance_check_only: {performance_check_only}")
 
+            if snapshot_pipeline:
+                snapshot_pipeline.finish()
+
             results["internal_urls"] = list(results["internal_urls"])
             results["external_urls"] = list(results["external_urls"])
             self.logger.info(f"Crawl of {url} completed. Found {len(results['broken_links'])} broken links.")
@@ -575,8 +629,34 @@ class CrawlerModule:
                 
         except Exception as e:
             self.logger.error(f"Error during crawl of {url}: {e}", exc_info=True)
+            if snapshot_pipeline:
+                snapshot_pipeline.finish()
+            self._captured_images = None
             return {"website_id": website_id, "url": url, "timestamp": datetime.now().isoformat(), "error": str(e)}
 
+    def _start_snapshot_pipeline(self, results, create_baseline):
+        """Starts a background snapshot pipeline for the check, or returns None if there is nothing to compare against."""
+        from src.check_pipeline import SnapshotPipeline
+
+        if not create_baseline:
+            website_config = self.website_manager.get_website(results['website_id'])
+            if not website_config or not website_config.get('all_baselines'):
+                # Leave it to the regular visual step to report the missing baselines
+                return None
+
+        if create_baseline:
+            self.logger.info(f"Creating visual baselines for website {results['website_id']} while crawling")
+        else:
+            self.logger.info(f"Capturing latest snapshots for website {results['website_id']} while crawling")
+        return SnapshotPipeline(self, results, is_baseline=create_baseline).start()
+
+    def _process_streamed_page(self, page, results, base_url, snapshot_pipeline):
+        """Crawler callback: records a crawled page and hands it to the snapshot pipeline."""
+        pages_before = len(results['all_pages'])
+        self._process_page(page, results, base_url)
+        if len(results['all_pages']) > pages_before:
+            snapshot_pipeline.submit(results['all_pages'][-1])
+
     def _process_page(self, page, results, base_url):
         normalized_url = self._normalize_url(page.get('url'))
         if not normalized_url or normalized_url in results['processed_urls']:
@@ -589,6 +669,8 @@ class CrawlerModule:
 
         page_record = {"url": normalized_url, "status_code": page.get('status_code'), "title": page.get('title', ''), "is_internal": is_internal, "referring_page": page.get('referring_page', ''), "meta": page.get('meta'), "images": page.get('images')}
         results["all_pages"].append(page_record)
+        if page.get('gate_value'):
+            results.setdefault('gate_values', {})[normalized_url] = page['gate_value']
         
         results["crawl_stats"]["pages_crawled"] += 1
         status_str = str(page.get('status_code') or 'unknown')
@@ -628,9 +710,6 @@ class CrawlerModule:
         self._handle_snapshots(results, is_baseline=False)
 
     def _handle_snapshots(self, results, is_baseline, visual_check_only=False):
-        from src.snapshot_tool import save_visual_snapshot
-        from src.comparators import compare_screenshots_percentage # Import our comparison function
-
         # Use the existing website_manager instance instead of creating a new one
         website_config = self.website_manager.get_website(results['website_id'])
         
@@ -645,27 +724,19 @@ class CrawlerModule:
         self.logger.info(f"Starting to capture {log_action} snapshots for website ID: {results['website_id']}")
 
         # --- FIX: Filter out direct links to images and excluded pages ---
-        image_ext_pattern = re.compile(r'\.(png|jpg|jpeg|gif|webp|svg|bmp)$', re.IGNORECASE)
-        
         if visual_check_only:
             # For baseline creation, only create baselines for pages that will do visual checks
             # This means excluding pages that would be excluded from visual checks
             pages_to_snapshot = [
                 p for p in results.get('all_pages', []) 
-                if (p.get('is_internal') and 
-                    p.get('status_code') == 200 and 
-                    not image_ext_pattern.search(p['url']) and
-                    not self._should_exclude_url_for_checks(p['url'], 'visual', results['website_id']))
+                if self._is_snapshot_candidate(p, results['website_id'])
             ]
             self.logger.info(f"Creating baselines only for pages that will do visual checks: {len(pages_to_snapshot)} pages")
         else:
             # For regular visual checks, use all valid pages
             pages_to_snapshot = [
                 p for p in results.get('all_pages', []) 
-                if (p.get('is_internal') and 
-                    p.get('status_code') == 200 and 
-                    not image_ext_pattern.search(p['url']) and
-                    not self._should_exclude_url_for_checks(p['url'], 'visual', results['website_id']))
+                if self._is_snapshot_candidate(p, results['website_id'])
             ]
         
         if not pages_to_snapshot:
@@ -675,99 +746,421 @@ class CrawlerModule:
         snapshot_map = {}
         page_results = results.get('page_results', {}) # Get or create page_results
 
-        for page in pages_to_snapshot:
-            url = page['url']
-            try:
-                url_path = (urlparse(url).path.strip('/') or 'home').replace('/', '_')
-                url_path = re.sub(r'\.(html|htm|php|aspx|jsp)$', '', url_path, flags=re.IGNORECASE).lower()
+        # Share one browser context across all pages of the site so static assets are
+        # cached after the first page and consent banners are accepted only once.
+        capture_session = self._open_capture_session(results)
+        try:
+            for page in pages_to_snapshot:
+                self._snapshot_page(page['url'], results, is_baseline, all_baselines, page_results, snapshot_map, capture_session)
+        finally:
+            if capture_session is not None:
+                capture_session.close()
 
-                # Save the snapshot (this part is the same for baseline and latest)
-                snapshot_path = save_visual_snapshot(site_id=results['website_id'], url=url, is_baseline=is_baseline, url_path=url_path)
-                
-                if snapshot_path:
-                    snapshot_map[url] = snapshot_path
-                    # Ensure page_results has an entry for this URL
-                    if url not in page_results:
-                        page_results[url] = {}
-                    
-                    page_results[url]['url_path'] = url_path
-                    
-                    # If this is the main URL, update the top-level results dictionary
-                    if url == results['url']:
-                        key = 'baseline_visual_path' if is_baseline else 'latest_visual_snapshot_path'
-                        results[key] = snapshot_path
-
-                    # --- NEW COMPARISON LOGIC ---
-                    # If we are capturing the LATEST snapshot (not creating a baseline)
-                    if not is_baseline:
-                        # Find the corresponding baseline path for this URL
-                        # Try exact match first
-                        baseline_info = all_baselines.get(url)
-                        
-                        # If no exact match, try normalized URL matching
-                        if not baseline_info:
-                            normalized_url = self._normalize_url(url)
-                            for stored_url, stored_info in all_baselines.items():
-                                if self._normalize_url(stored_url) == normalized_url:
-                                    baseline_info = stored_info
-                                    self.logger.info(f"Found baseline match using normalized URL: {stored_url} -> {url}")
-                                    break
-                        
-                        if baseline_info and 'path' in baseline_info and os.path.exists(baseline_info['path']):
-                            baseline_path = baseline_info['path']
-                            self.logger.info(f"Comparing latest snapshot for {url} against baseline: {baseline_path}")
-
-                            # Call the percentage comparison function
-                            results['visual_diff_percent'], results['visual_diff_image_path'] = compare_screenshots_percentage(
-                                image_path1=baseline_path,
-                                image_path2=snapshot_path,
-                                ignore_regions=self.website_manager.get_website(results['website_id']).get('ignore_regions', [])
-                            )
-                            
-                            # Store the results
-                            page_results[url]['visual_diff_percent'] = results['visual_diff_percent']
-                            if url == results['url']: # If it's the main page, also store it at the top level
-                                results['visual_diff_percent'] = results['visual_diff_percent']
-                            
-                            if results['visual_diff_image_path']:
-                                page_results[url]['visual_diff_image_path'] = results['visual_diff_image_path']
+        self._finish_snapshots(results, is_baseline, snapshot_map, page_results)
 
-                            self.logger.info(f"Visual comparison for {url} complete. Difference: {results['visual_diff_percent']:.2f}%")
-                            
-                            # Mark that baseline comparison was completed (for email template)
-                            results['baseline_comparison_completed'] = True
-
-                            # For backward compatibility and other potential checks, let's keep ssim if available.
-                            if OPENCV_SKIMAGE_AVAILABLE:
-                                results['ssim_score'] = compare_screenshots_ssim(
-                                    image_path1=baseline_path,
-                                    image_path2=snapshot_path
-                                )
+    def _is_snapshot_candidate(self, page, website_id):
+        """Returns True for crawled pages that get a visual snapshot: internal, HTTP 200, not an image and not excluded."""
+        return bool(page.get('is_internal') and 
+                    page.get('status_code') == 200 and 
+                    not IMAGE_URL_PATTERN.search(page['url']) and
+                    not self._should_exclude_url_for_checks(page['url'], 'visual', website_id))
+
+    def _open_capture_session(self, results):
+        """
+        Opens the capture backend for a site: an isolated CaptureWorker process when capture_workers
+        is enabled, otherwise a shared in-process browser session. Returns None when neither is used.
+        """
+        from src.snapshot_tool import SiteCaptureSession
+        from src.capture_worker import CaptureWorker
+
+        if (self.config.get('capture_workers', {}) or {}).get('enabled', True):
+            # The worker process starts lazily on the first capture
+            return CaptureWorker(results['website_id'], results['url'], config_path=self.config.get('config_path'))
+
+        reuse_config = self.config.get('browser_context_reuse', {}) or {}
+        if not reuse_config.get('enabled', True):
+            return None
+        try:
+            capture_session = SiteCaptureSession(results['website_id'], results['url'])
+            capture_session.start()
+            return capture_session
+        except Exception as e:
+            self.logger.warning(f"Could not open shared browser session, falling back to per-page browsers: {e}")
+            return None
+
+    def _snapshot_page(self, url, results, is_baseline, all_baselines, page_results, snapshot_map, capture_session=None):
+        """Captures one page's snapshot and, for latest snapshots, compares it against the page's baseline."""
+        from src.snapshot_tool import save_visual_snapshot, capture_page_artifacts
+        from src.capture_worker import CaptureWorker
+
+        try:
+            if not is_baseline and not self._gate_allows_capture(url, results, all_baselines):
+                self.logger.info(f"Skipping capture of {url}: page and assets unchanged since the last confirmed check")
+                page_results.setdefault(url, {})['capture_skipped'] = True
+                return
+
+            url_path = (urlparse(url).path.strip('/') or 'home').replace('/', '_')
+            url_path = re.sub(r'\.(html|htm|php|aspx|jsp)$', '', url_path, flags=re.IGNORECASE).lower()
+
+            # Save the snapshot (this part is the same for baseline and latest)
+            artifacts = None
+            single_navigation = (self.config.get('single_navigation_capture', {}) or {}).get('enabled', True)
+            # Dynamic elements (ads, carousels, timestamps) are located by selector while the page is open
+            ignore_selectors = (self.website_manager.get_website(results['website_id']) or {}).get('ignore_selectors', [])
+            capture_images = self._captured_images is not None
+            if isinstance(capture_session, CaptureWorker):
+                # Captured in an isolated browser process with a hard timeout
+                if single_navigation:
+                    artifacts = capture_session.capture_page_artifacts(results['website_id'], url, is_baseline=is_baseline, url_path=url_path,
+                                                                       ignore_selectors=ignore_selectors, capture_images=capture_images)
+                    snapshot_path = artifacts['screenshot_path'] if artifacts else None
+                else:
+                    snapshot_path = capture_session.save_visual_snapshot(results['website_id'], url, is_baseline=is_baseline, url_path=url_path,
+                                                                         ignore_selectors=ignore_selectors)
+            elif single_navigation:
+                # One navigation yields the screenshot, rendered DOM, image bytes and timings
+                artifacts = capture_page_artifacts(site_id=results['website_id'], url=url, is_baseline=is_baseline,
+                                                   url_path=url_path, session=capture_session, ignore_selectors=ignore_selectors,
+                                                   capture_images=capture_images)
+                snapshot_path = artifacts['screenshot_path'] if artifacts else None
+            else:
+                snapshot_path = save_visual_snapshot(site_id=results['website_id'], url=url, is_baseline=is_baseline, url_path=url_path,
+                                                 session=capture_session, ignore_selectors=ignore_selectors)
+        
+            if snapshot_path:
+                snapshot_map[url] = snapshot_path
+                # Ensure page_results has an entry for this URL
+                if url not in page_results:
+                    page_results[url] = {}
+            
+                page_results[url]['url_path'] = url_path
+
+                viewport_snapshots = self._get_viewport_snapshots(snapshot_path)
+                if viewport_snapshots:
+                    page_results[url]['viewport_snapshots'] = viewport_snapshots
+
+                if artifacts:
+                    page_results[url]['html_snapshot_path'] = artifacts['html_path']
+                    page_results[url]['html_content_hash'] = artifacts['html_hash']
+                    if artifacts.get('structure_fingerprint'):
+                        page_results[url]['structure_fingerprint'] = artifacts['structure_fingerprint']
+                    canonical_content_hash = self._get_canonical_content_hash(artifacts['html_path'], results['website_id'])
+                    if canonical_content_hash:
+                        page_results[url]['canonical_content_hash'] = canonical_content_hash
+                    page_results[url]['navigation_timing'] = artifacts['navigation_timing']
+                    captured_images = self._captured_images
+                    if captured_images is not None and artifacts['images']:
+                        captured_images[url] = artifacts['images']
+            
+                # If this is the main URL, update the top-level results dictionary
+                if url == results['url']:
+                    key = 'baseline_visual_path' if is_baseline else 'latest_visual_snapshot_path'
+                    results[key] = snapshot_path
+
+                # --- NEW COMPARISON LOGIC ---
+                # If we are capturing the LATEST snapshot (not creating a baseline)
+                if not is_baseline:
+                    # Find the corresponding baseline path for this URL
+                    baseline_info = self._find_baseline_entry(url, all_baselines)
+                
+                    if baseline_info and 'path' in baseline_info and os.path.exists(baseline_info['path']):
+                        self.logger.info(f"Comparing latest snapshot for {url} against baseline: {baseline_info['path']}")
+                        comparison_jobs = self._get_comparison_jobs(url, baseline_info, snapshot_path, viewport_snapshots,
+                                                                    results['website_id'])
+                        if get_batch_options()['enabled']:
+                            # Compared together with the check's other pages once every page is captured
+                            results.setdefault('pending_visual_comparisons', []).extend(comparison_jobs)
                         else:
-                            # Only warn if we're not in baseline creation mode
-                            if not hasattr(self, '_creating_baseline') or not self._creating_baseline:
-                                self.logger.warning(f"No baseline found for URL {url} to compare against the latest snapshot.")
+                            for job in comparison_jobs:
+                                comparison = compare_screenshots_detailed(job['baseline_path'], job['snapshot_path'],
+                                                                          ignore_regions=job['ignore_regions'],
+                                                                          compute_ssim=job['compute_ssim'],
+                                                                          decision_threshold=job['decision_threshold'])
+                                self._apply_comparison(job, comparison, results, page_results)
+                        if artifacts:
+                            self._compare_page_html(url, baseline_info, artifacts, results, page_results)
                     else:
-                        # If we're creating baselines, log that baseline was created
-                        self.logger.info(f"Baseline snapshot created for URL {url}: {snapshot_path}")
+                        # Only warn if we're not in baseline creation mode
+                        if not hasattr(self, '_creating_baseline') or not self._creating_baseline:
+                            self.logger.warning(f"No baseline found for URL {url} to compare against the latest snapshot.")
+                else:
+                    # If we're creating baselines, log that baseline was created
+                    self.logger.info(f"Baseline snapshot created for URL {url}: {snapshot_path}")
+
+        except Exception as e:
+            self.logger.error(f"Error processing snapshot for URL {url}: {e}", exc_info=True)
+
+    def _find_baseline_entry(self, url, all_baselines):
+        """The all_baselines entry of a page: stored under the exact URL, else under an equal normalized URL."""
+        baseline_info = all_baselines.get(url)
+        if baseline_info:
+            return baseline_info
+        normalized_url = self._normalize_url(url)
+        for stored_url, stored_info in all_baselines.items():
+            if self._normalize_url(stored_url) == normalized_url:
+                self.logger.info(f"Found baseline match using normalized URL: {stored_url} -> {url}")
+                return stored_info
+        return None
+
+    def _gate_allows_capture(self, url, results, all_baselines):
+        """Asks the change gate (see change_gate.py) whether a latest snapshot of the page is needed."""
+        gate_options = get_gate_options(self.config)
+        if not gate_options['enabled']:
+            return True
+        gate_value = (results.get('gate_values') or {}).get(url)
+        return should_capture(gate_value, self._find_baseline_entry(url, all_baselines), gate_options['force_capture_every'])
+
+    def _capture_matches_baseline(self, page_result):
+        """
+        True when a captured page was compared with its baseline and neither the screenshot nor the
+        DOM structure changed beyond the alert thresholds (as in scheduler.determine_significance).
+        """
+        visual_diff_percent = page_result.get('visual_diff_percent')
+        if visual_diff_percent is None:
+            # Not compared, so nothing is known about the page
+            return False
+        if visual_diff_percent > self.config.get('visual_change_alert_threshold_percent', 1.0):
+            return False
+        structure_diff_score = page_result.get('structure_diff_score')
+        return structure_diff_score is None or structure_diff_score >= self.config.get('structure_change_threshold', 0.98)
+
+    def _record_gate_outcomes(self, results, snapshot_map, page_results):
+        """
+        Stores the change gate state on the all_baselines entries. A captured page that matches its
+        baseline confirms its current gate value; a captured page that differs drops any confirmed
+        value, so later checks gate against the baseline's value and keep capturing it until it is
+        re-baselined or matches again. Skipped pages count one more skipped check.
+        """
+        gate_values = results.get('gate_values') or {}
+        if not gate_values:
+            return
+        website = self.website_manager.get_website(results['website_id'])
+        if not website:
+            return
+
+        all_baselines = website.get('all_baselines', {})
+        updated = False
+        for url, gate_value in gate_values.items():
+            baseline_entry = self._find_baseline_entry(url, all_baselines)
+            if baseline_entry is None:
+                continue
+            if url in snapshot_map:
+                if self._capture_matches_baseline(page_results.get(url, {})):
+                    baseline_entry['confirmed_gate_value'] = gate_value
+                else:
+                    baseline_entry.pop('confirmed_gate_value', None)
+                baseline_entry['gate_skipped_checks'] = 0
+                updated = True
+            elif page_results.get(url, {}).get('capture_skipped'):
+                baseline_entry['gate_skipped_checks'] = baseline_entry.get('gate_skipped_checks', 0) + 1
+                updated = True
+        if updated:
+            self.website_manager.update_website(results['website_id'], {'all_baselines': all_baselines})
+
+    def _get_viewport_snapshots(self, snapshot_path):
+        """Returns {viewport name: path} for the secondary viewport snapshots saved next to a snapshot."""
+        from src.snapshot_tool import get_capture_viewports, get_viewport_snapshot_path
+
+        viewport_snapshots = {}
+        for viewport in get_capture_viewports()[1:]:
+            viewport_path = get_viewport_snapshot_path(snapshot_path, viewport['name'])
+            if os.path.exists(viewport_path):
+                viewport_snapshots[viewport['name']] = viewport_path
+        return viewport_snapshots
+
+    def _get_comparison_jobs(self, url, baseline_info, snapshot_path, viewport_snapshots, website_id):
+        """
+        Lists the screenshot comparisons of a captured page: the main snapshot against its baseline,
+        then each secondary viewport snapshot against the baseline for the same viewport.
+        """
+        from src.snapshot_tool import get_viewport_snapshot_path
+
+        ignore_regions = (self.website_manager.get_website(website_id) or {}).get('ignore_regions', [])
+        # One comparison pass yields the percentage, the diff report and (if available) SSIM
+        jobs = [{
+            'url': url,
+            'viewport': None,
+            'baseline_path': baseline_info['path'],
+            'snapshot_path': snapshot_path,
+            'ignore_regions': ignore_regions,
+            'compute_ssim': OPENCV_SKIMAGE_AVAILABLE,
+            'decision_threshold': self.config.get('visual_change_alert_threshold_percent', 1.0)
+        }]
+
+        baseline_viewports = baseline_info.get('viewports', {})
+        for viewport_name, viewport_path in (viewport_snapshots or {}).items():
+            baseline_path = (baseline_viewports.get(viewport_name, {}).get('path') or
+                             get_viewport_snapshot_path(baseline_info['path'], viewport_name))
+            if not os.path.exists(baseline_path):
+                self.logger.warning(f"No {viewport_name} baseline found for URL {url}; recreate baselines to compare this viewport.")
+                continue
+            jobs.append({
+                'url': url,
+                'viewport': viewport_name,
+                'baseline_path': baseline_path,
+                'snapshot_path': viewport_path,
+                'ignore_regions': ignore_regions,
+                'compute_ssim': False,
+                'decision_threshold': None
+            })
+        return jobs
+
+    def _apply_comparison(self, job, comparison, results, page_results):
+        """Stores the result of one screenshot comparison in the page results."""
+        url = job['url']
+        page_result = page_results.setdefault(url, {})
+
+        if job['viewport'] is not None:
+            diff_percent, diff_image_path = comparison['percent'], comparison['diff_image_path']
+            page_result.setdefault('viewport_diffs', {})[job['viewport']] = {
+                'visual_diff_percent': diff_percent,
+                'visual_diff_image_path': diff_image_path
+            }
+            self.logger.info(f"Visual comparison for {url} ({job['viewport']}) complete. Difference: {diff_percent:.2f}%")
+
+            # A change in any viewport is a visual change of the page
+            if diff_percent > page_result.get('visual_diff_percent', 0):
+                page_result['visual_diff_percent'] = diff_percent
+                if diff_image_path:
+                    page_result['visual_diff_image_path'] = diff_image_path
+            return
+
+        results['visual_diff_percent'] = comparison['percent']
+        results['visual_diff_image_path'] = comparison['diff_image_path']
+
+        # Store the results
+        page_result['visual_diff_percent'] = results['visual_diff_percent']
+        if results['visual_diff_image_path']:
+            page_result['visual_diff_image_path'] = results['visual_diff_image_path']
+        if comparison['regions']:
+            page_result['visual_change_regions'] = [list(region) for region in comparison['regions']]
+        if comparison['shifted_regions']:
+            # Content that only moved is reported apart from real changes
+            page_result['visual_shifted_regions'] = comparison['shifted_regions']
+
+        self.logger.info(f"Visual comparison for {url} complete. Difference: {results['visual_diff_percent']:.2f}%")
+
+        # Mark that baseline comparison was completed (for email template)
+        results['baseline_comparison_completed'] = True
+
+        # For backward compatibility and other potential checks, let's keep ssim if available.
+        if OPENCV_SKIMAGE_AVAILABLE:
+            results['ssim_score'] = comparison['ssim']
+
+    def _get_canonical_content_hash(self, html_path, website_id):
+        """Hash of a saved DOM after the site's content normalization rules (see content_normalizer.py)."""
+        from src.content_normalizer import canonical_hash
+
+        if not html_path or not (self.config.get('content_normalization', {}) or {}).get('enabled', True):
+            return None
+        try:
+            with open(html_path, 'r', encoding='utf-8') as f:
+                html_content = f.read()
+            site_rules = (self.website_manager.get_website(website_id) or {}).get('normalization_rules', [])
+            return canonical_hash(html_content, site_rules)
+        except Exception as e:
+            self.logger.warning(f"Could not compute canonical content hash of {html_path}: {e}")
+            return None
+
+    def _compare_page_html(self, url, baseline_info, artifacts, results, page_results):
+        """
+        Compares the latest DOM of a page with the baseline DOM. Nothing is compared when their
+        canonical content hashes match. Otherwise the structure fingerprints are compared, and the
+        detailed structural diff only runs when they are further apart than
+        structure_fingerprint.max_distance.
+        """
+        from src.comparators import compare_html_structure
+        from src.structure_fingerprint import (fingerprint_distance, load_structure_fingerprint,
+                                               write_structure_fingerprint, DEFAULT_MAX_DISTANCE)
+
+        page_result = page_results.setdefault(url, {})
+        baseline_hash = baseline_info.get('canonical_content_hash')
+        if baseline_hash and baseline_hash == page_result.get('canonical_content_hash'):
+            self.logger.info(f"DOM of {url} matches the baseline after normalization; skipping HTML comparisons")
+            page_result['html_unchanged'] = True
+            page_result['structure_diff_score'] = 1.0
+            results.setdefault('structure_diff_score', 1.0)
+            return
+
+        baseline_fingerprint = baseline_info.get('structure_fingerprint')
+        latest_fingerprint = artifacts.get('structure_fingerprint')
+        baseline_html_path = baseline_info.get('html_path')
+        if not baseline_fingerprint and latest_fingerprint and baseline_html_path and os.path.exists(baseline_html_path):
+            # Baselines recorded without a fingerprint: use the snapshot's sidecar, creating it if needed
+            baseline_fingerprint = (load_structure_fingerprint(baseline_html_path) or
+                                    write_structure_fingerprint(baseline_html_path))
+        if not baseline_fingerprint or not latest_fingerprint:
+            return
+
+        distance = fingerprint_distance(baseline_fingerprint, latest_fingerprint)
+        page_result['structure_fingerprint_distance'] = distance
+        max_distance = (self.config.get('structure_fingerprint', {}) or {}).get('max_distance', DEFAULT_MAX_DISTANCE)
+        if distance <= max_distance:
+            structure_score = 1.0
+        else:
+            latest_html_path = artifacts.get('html_path')
+            if not (baseline_html_path and latest_html_path and os.path.exists(baseline_html_path)):
+                return
+            with open(baseline_html_path, 'r', encoding='utf-8') as f:
+                baseline_html = f.read()
+            with open(latest_html_path, 'r', encoding='utf-8') as f:
+                latest_html = f.read()
+            structure_score, structure_diff = compare_html_structure(baseline_html, latest_html,
+                                                                     old_fingerprint=baseline_fingerprint,
+                                                                     new_fingerprint=latest_fingerprint)
+            page_result['structure_diff_lines'] = len(structure_diff)
+            self.logger.info(f"Structure of {url} changed: fingerprints {distance} bits apart, similarity {structure_score:.4f}")
+
+        page_result['structure_diff_score'] = structure_score
+        # The least similar page decides the check's structure score
+        results['structure_diff_score'] = min(results.get('structure_diff_score', 1.0), structure_score)
+
+    def _run_pending_comparisons(self, results, page_results):
+        """Compares every screenshot pair collected during capture in one batch and merges the results."""
+        jobs = results.pop('pending_visual_comparisons', [])
+        if not jobs:
+            return
+        batch_options = get_batch_options()
+        comparisons = compare_screenshot_pairs(jobs, max_workers=batch_options['max_workers'],
+                                               min_pairs=batch_options['min_pairs'])
+        for job, comparison in zip(jobs, comparisons):
+            self._apply_comparison(job, comparison, results, page_results)
+
+    def _finish_snapshots(self, results, is_baseline, snapshot_map, page_results):
+        """Stores captured snapshots in the results and, for baselines, on the website record."""
+        log_action = "baseline" if is_baseline else "latest"
+
+        if not is_baseline:
+            self._run_pending_comparisons(results, page_results)
+            self._record_gate_outcomes(results, snapshot_map, page_results)
 
-            except Exception as e:
-                self.logger.error(f"Error processing snapshot for URL {url}: {e}", exc_info=True)
-        
         # Update results with the detailed page_results
         results['page_results'] = page_results
 
         if is_baseline:
             results['visual_baselines'] = [{'url': u, 'path': p} for u, p in snapshot_map.items()]
             self.logger.info(f"DEBUG: About to call _update_website_with_baselines with {len(snapshot_map)} baselines")
-            self._update_website_with_baselines(results['website_id'], snapshot_map)
+            viewports_by_url = {url: page_results[url]['viewport_snapshots'] for url in snapshot_map
+                                if page_results.get(url, {}).get('viewport_snapshots')}
+            page_info_by_url = {}
+            for url in snapshot_map:
+                page_result = page_results.get(url, {})
+                page_info = {key: page_result[key] for key in ('structure_fingerprint', 'canonical_content_hash')
+                             if page_result.get(key)}
+                if page_result.get('html_snapshot_path'):
+                    page_info['html_path'] = page_result['html_snapshot_path']
+                if (results.get('gate_values') or {}).get(url):
+                    page_info['gate_value'] = results['gate_values'][url]
+                if page_info:
+                    page_info_by_url[url] = page_info
+            self._update_website_with_baselines(results['website_id'], snapshot_map, viewports_by_url, page_info_by_url)
             self.logger.info(f"DEBUG: _update_website_with_baselines completed")
         else:
             results['latest_snapshots'] = snapshot_map
         
         self.logger.info(f"Captured {len(snapshot_map)} {log_action} snapshots.")
     
-    def _update_website_with_baselines(self, website_id, baselines_by_url):
+    def _update_website_with_baselines(self, website_id, baselines_by_url, viewports_by_url=None, page_info_by_url=None):
         self.logger.info(f"DEBUG: _update_website_with_baselines called with website_id: {website_id}, baselines_by_url: {baselines_by_url}")
         if not baselines_by_url:
             self.logger.warning(f"DEBUG: No baselines to update for website {website_id}")
@@ -787,7 +1180,19 @@ class CrawlerModule:
         self.logger.info(f"Website main URL: {website.get('url')}")
         
         for url, path in baselines_by_url.items():
+            # Baselines reuse their filename, so decoded copies of the previous baseline must go
+            invalidate_baseline(path)
+            for viewport_path in (viewports_by_url or {}).get(url, {}).values():
+                invalidate_baseline(viewport_path)
             all_baselines[url] = {'path': path, 'timestamp': current_time}
+            # Secondary viewport baselines are keyed by viewport name under the page's entry
+            if viewports_by_url and viewports_by_url.get(url):
+                all_baselines[url]['viewports'] = {name: {'path': viewport_path}
+                                                   for name, viewport_path in viewports_by_url[url].items()}
+            # The baseline DOM with its structure fingerprint and canonical hash, for HTML comparisons,
+            # and the page's change gate value
+            if page_info_by_url and page_info_by_url.get(url):
+                all_baselines[url].update(page_info_by_url[url])
         
         self.logger.info(f"DEBUG: Storing all_baselines: {all_baselines}")
         updates = {"all_baselines": all_baselines, "has_subpage_baselines": True}
@@ -854,6 +1259,29 @@ class CrawlerModule:
         except Exception:
             return url
     
+    def _attach_captured_image_bytes(self, all_images_data):
+        """
+        Adds 'image_bytes' to image entries whose response body was captured during page rendering.
+        The captured bodies are released here; only the image entries handed to blur detection keep them.
+        """
+        captured_images, self._captured_images = self._captured_images or {}, None
+        if not captured_images:
+            return
+
+        bodies_by_url = {}
+        for page_images in captured_images.values():
+            for image in page_images:
+                if image.get('body'):
+                    bodies_by_url.setdefault(image['image_url'], image['body'])
+
+        reused = 0
+        for img_data in all_images_data:
+            body = bodies_by_url.get(img_data['image_url'])
+            if body:
+                img_data['image_bytes'] = body
+                reused += 1
+        self.logger.info(f"Reusing {reused}/{len(all_images_data)} image bodies captured during page rendering")
+
     def _is_internal_url(self, url, base_url):
         if not url:
             return False
@@ -1217,6 +1645,9 @@ class CrawlerModule:
             self.logger.info(f"Processing {total_images} internal images from {total_pages} pages in batch operation")
             
             try:
+                # Reuse image bytes already fetched by the browser during snapshot capture
+                self._attach_captured_image_bytes(all_images_data)
+
                 # Run batch blur detection on all images
                 all_blur_results = blur_detector.analyze_website_images(
                     website_id=website_id,
@@ -1366,6 +1797,9 @@ class CrawlerModule:
             self.logger.info(f"Processing {total_images} internal images from {total_pages} pages in batch operation")
             
             try:
+                # Reuse image bytes already fetched by the browser during snapshot capture
+                self._attach_captured_image_bytes(all_images_data)
+
                 # Run batch blur detection on all images
                 all_blur_results = blur_detector.analyze_website_images(
                     website_id=website_id,
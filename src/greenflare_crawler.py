@@ -12,6 +12,7 @@ import queue
 from urllib.parse import urlparse, urljoin, urlunparse
 import requests
 from bs4 import BeautifulSoup
+from src.change_gate import compute_gate_value
 
 # Define GREENFLARE_AVAILABLE as a global variable
 GREENFLARE_AVAILABLE = False
@@ -124,6 +125,11 @@ class GreenflareWrapper:
         self.extract_meta_tags = config.get('meta_tags', ["title", "description", "keywords", "robots", "canonical"])
         self.extract_images = config.get('extract_images', True)
         self.extract_alt_text = config.get('extract_alt_text', True)
+        # Optional callback invoked with each page dict as soon as it has been crawled
+        self.on_page = config.get('on_page')
+        # Change gate values for the visual check (see change_gate.py); needs the custom crawler's page HTML
+        self.compute_gate_values = config.get('compute_gate_values', False)
+        self.normalization_rules = config.get('normalization_rules')
         
         # Configure the official crawler if available
         if self.official_crawler:
@@ -393,6 +399,12 @@ class GreenflareWrapper:
                     
                     if missing_meta_tags:
                         page_data['missing_meta_tags'] = missing_meta_tags
+
+                    if is_internal and self.compute_gate_values:
+                        try:
+                            page_data['gate_value'] = compute_gate_value(response.text, soup, self.normalization_rules)
+                        except Exception as e:
+                            logger.warning(f"Could not compute change gate value for {url}: {e}")
                     
                     # Add meta data if available
                     if meta:
@@ -448,6 +460,7 @@ class GreenflareWrapper:
                 
                 # Add the page to results
                 results['pages'].append(page_data)
+                self._notify_page(page_data)
                 
             except Exception as e:
                 # Add as broken page
@@ -461,8 +474,19 @@ class GreenflareWrapper:
                     'is_broken': True,
                     'error_message': str(e)
                 })
+                self._notify_page(results['pages'][-1])
         
         return results
+
+    def _notify_page(self, page_data):
+        """Passes a crawled page to the on_page callback; callback errors never stop the crawl."""
+        on_page = getattr(self, 'on_page', None)
+        if not on_page:
+            return
+        try:
+            on_page(page_data)
+        except Exception as e:
+            logger.error(f"on_page callback failed for {page_data.get('url')}: {e}", exc_info=True)
     
     def _fetch_with_retry(self, url):
         """Fetch a URL with retry logic and exponential backoff."""
@@ -0,0 +1,104 @@
+"""
+Ignore masks for visual comparisons.
+
+Ignore regions ([x, y, width, height] rectangles in page coordinates) used to be painted onto
+copies of both images before every diff and SSIM call. They are now compiled into a boolean
+mask, cached per set of regions and image size, which the diff engine applies to the
+difference directly, so masking no longer copies either image.
+
+Regions can also be given as CSS selectors (visual_comparison.ignore_selectors, or a site's
+'ignore_selectors'). Selectors are resolved to element boxes at capture time, while the page is
+still open, and stored in a '<snapshot>.ignore.json' sidecar next to the screenshot.
+"""
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from src.logger_setup import setup_logging
+
+logger = setup_logging()
+
+IGNORE_SIDECAR_SUFFIX = ".ignore.json"
+# Masks kept per distinct (regions, image size); a site's pages usually share a handful of sizes
+_MASK_CACHE_SIZE = 16
+
+def get_ignore_sidecar_path(image_path: str) -> str:
+    """Returns the path of the resolved ignore regions of a snapshot, e.g. 'x_utc.png' -> 'x_utc.png.ignore.json'."""
+    return f"{image_path}{IGNORE_SIDECAR_SUFFIX}"
+
+def normalize_ignore_regions(regions: list[list[int]] | None) -> tuple[tuple[int, int, int, int], ...]:
+    """Returns the valid [x, y, width, height] regions as a hashable, de-duplicated tuple."""
+    normalized = []
+    for region in regions or []:
+        if len(region) != 4:
+            logger.warning(f"Skipping invalid ignore region (must have 4 elements [x,y,w,h]): {region}")
+            continue
+        region = tuple(int(v) for v in region)
+        if region not in normalized:
+            normalized.append(region)
+    return tuple(normalized)
+
+@lru_cache(maxsize=_MASK_CACHE_SIZE)
+def _build_ignore_mask(regions: tuple[tuple[int, int, int, int], ...], height: int, width: int) -> np.ndarray | None:
+    mask = np.zeros((height, width), dtype=bool)
+    for x, y, w, h in regions:
+        # Right and bottom edges are included, like the PIL rectangles previously drawn
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + w + 1, width), min(y + h + 1, height)
+        if x0 < x1 and y0 < y1:
+            mask[y0:y1, x0:x1] = True
+    if not mask.any():
+        return None
+    mask.flags.writeable = False
+    return mask
+
+def get_ignore_mask(regions: list[list[int]] | None, height: int, width: int) -> np.ndarray | None:
+    """
+    Returns a read-only (height, width) boolean mask of the ignored pixels, or None if no region
+    applies. Masks are cached, so repeated comparisons of a site's pages reuse them.
+    """
+    regions = normalize_ignore_regions(regions)
+    if not regions:
+        return None
+    return _build_ignore_mask(regions, height, width)
+
+def write_ignore_regions(image_path: str, selectors: list[str], regions: list[list[int]]):
+    """Stores the element boxes that the ignore selectors resolved to when a snapshot was captured."""
+    try:
+        stat = os.stat(image_path)
+        with open(get_ignore_sidecar_path(image_path), 'w', encoding='utf-8') as f:
+            json.dump({
+                'selectors': list(selectors),
+                'regions': [list(region) for region in regions],
+                # Ties the sidecar to this exact file, like the tile hash sidecar
+                'source_size': stat.st_size,
+                'source_mtime_ns': stat.st_mtime_ns
+            }, f)
+    except OSError as e:
+        logger.error(f"Could not store ignore regions for {image_path}: {e}")
+
+def load_ignore_regions(image_path: str) -> list[list[int]]:
+    """Returns the ignore regions resolved from CSS selectors at capture time, or [] if there are none."""
+    sidecar_path = get_ignore_sidecar_path(image_path)
+    if not os.path.exists(sidecar_path):
+        return []
+    try:
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        stat = os.stat(image_path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read ignore regions {sidecar_path}: {e}")
+        return []
+
+    if data.get('source_size') != stat.st_size or data.get('source_mtime_ns') != stat.st_mtime_ns:
+        logger.debug(f"Ignoring stale ignore regions for {image_path}")
+        return []
+    return data.get('regions', [])
+
+def remove_ignore_regions(image_path: str):
+    """Deletes the ignore region sidecar of a snapshot, if any."""
+    sidecar_path = get_ignore_sidecar_path(image_path)
+    if os.path.exists(sidecar_path):
+        os.remove(sidecar_path)
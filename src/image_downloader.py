@@ -0,0 +1,144 @@
+"""
+Pooled image downloads for blur detection.
+
+BlurDetector used to open a new requests.Session and HTTPAdapter for every download attempt, ran
+two download threads and slept half a second after every third image. An ImageDownloader is shared
+by a whole blur run instead:
+- one session whose connection pools keep connections to each host alive;
+- at most max_connections downloads at a time, and at most max_connections_per_host to one host;
+- consecutive requests to one host start at least min_request_interval apart, and a 429/503
+  response with Retry-After holds that host back for the requested time;
+- map() keeps only a bounded number of downloads queued ahead of the consumer (backpressure).
+
+Politeness now comes from these per-host limits, so other hosts are not slowed by a global sleep.
+Threads are used rather than asyncio: requests and the rest of the pipeline are synchronous, and
+the work is I/O bound.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.logger_setup import setup_logging
+
+logger = setup_logging()
+
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 4
+DEFAULT_MIN_REQUEST_INTERVAL = 0.1  # Seconds between request starts to one host
+# Longest Retry-After a host can impose on the run
+_MAX_RETRY_AFTER_SECONDS = 60
+
+class _HostState:
+    def __init__(self, max_connections):
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+
+class ImageDownloader:
+    """
+    Shared, rate-limited HTTP downloader.
+
+    Usage:
+        with ImageDownloader.from_config(config) as downloader:
+            for result in downloader.map(download_one, items):  # download_one calls downloader.get()
+                ...
+    """
+
+    def __init__(self, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+                 min_request_interval: float = DEFAULT_MIN_REQUEST_INTERVAL, max_pending: int | None = None):
+        self.max_connections = max(1, int(max_connections))
+        self.max_connections_per_host = max(1, min(int(max_connections_per_host), self.max_connections))
+        self.min_request_interval = max(0.0, float(min_request_interval))
+        self.max_pending = max_pending or self.max_connections * 2
+
+        self.session = requests.Session()
+        # One pool per host, each as large as the per-host limit
+        adapter = HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_connections_per_host,
+                              max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'ImageDownloader':
+        """A downloader with the blur_detection_* connection settings of the config."""
+        return cls(
+            max_connections=config.get('blur_detection_max_connections', DEFAULT_MAX_CONNECTIONS),
+            max_connections_per_host=config.get('blur_detection_max_connections_per_host', DEFAULT_MAX_CONNECTIONS_PER_HOST),
+            min_request_interval=config.get('blur_detection_min_request_interval', DEFAULT_MIN_REQUEST_INTERVAL)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _host_state(self, host: str) -> _HostState:
+        with self._hosts_lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(self.max_connections_per_host)
+            return state
+
+    @contextmanager
+    def host_slot(self, url: str):
+        """Waits for a free connection to the URL's host and for that host's next request start time."""
+        state = self._host_state(urlparse(url).netloc.lower())
+        with state.slots:
+            with state.lock:
+                now = time.monotonic()
+                start = max(now, state.next_start)
+                state.next_start = start + self.min_request_interval
+            if start > now:
+                time.sleep(start - now)
+            yield state
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET through the shared session within the host's limits. The body is read before the
+        connection slot is released, so the limits cover the whole transfer.
+        """
+        kwargs.pop('stream', None)
+        with self.host_slot(url) as state:
+            response = self.session.get(url, **kwargs)
+            if response.status_code in (429, 503):
+                self._hold_back(state, url, response.headers.get('Retry-After'))
+            return response
+
+    def _hold_back(self, state: _HostState, url: str, retry_after: str | None):
+        """Delays the next requests to a host that asked for it with Retry-After (in seconds)."""
+        try:
+            delay = min(float(retry_after), _MAX_RETRY_AFTER_SECONDS)
+        except (TypeError, ValueError):
+            return
+        with state.lock:
+            state.next_start = max(state.next_start, time.monotonic() + delay)
+        logger.debug(f"Holding back requests to {urlparse(url).netloc} for {delay:.0f}s (Retry-After)")
+
+    def map(self, fn, items):
+        """
+        Yields fn(item) for every item, in order, running up to max_connections calls at a time.
+        At most max_pending calls are queued ahead of the consumer, so a slow consumer or a long
+        item list does not hold every result in memory.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            pending = deque()
+            for item in items:
+                if len(pending) >= self.max_pending:
+                    yield pending.popleft().result()
+                pending.append(executor.submit(fn, item))
+            while pending:
+                yield pending.popleft().result()
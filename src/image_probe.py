@@ -0,0 +1,73 @@
+"""
+Image header probing before full downloads.
+
+Most <img> tags on image-heavy sites are icons, spacers and tracking pixels, which blur detection
+skips anyway after downloading them in full. A probe fetches only the first few KB of an image with
+a ranged GET. The format and dimensions are read from that header, so SVGs, tracking pixels and
+images below blur_detection_min_image_size are dropped before their download.
+
+Pillow reads the dimensions of JPEG, PNG, GIF, BMP and TIFF from a truncated header; WebP headers
+are parsed here because Pillow's WebP plugin needs the whole file.
+"""
+import struct
+from io import BytesIO
+
+from PIL import Image
+
+# Bytes requested by a probe; enough for the header of nearly all images
+DEFAULT_PROBE_BYTES = 16 * 1024
+# Images at most this wide and high are treated as tracking pixels
+TRACKING_PIXEL_MAX_SIZE = 3
+
+def _webp_dimensions(data: bytes) -> tuple[int, int] | None:
+    """Width and height from a WebP header (lossy VP8, lossless VP8L or extended VP8X)."""
+    if len(data) < 30 or data[:4] != b'RIFF' or data[8:12] != b'WEBP':
+        return None
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and data[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3fff, height & 0x3fff
+    if chunk == b'VP8L' and data[20:21] == b'\x2f':
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3fff) + 1, ((bits >> 14) & 0x3fff) + 1
+    if chunk == b'VP8X':
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None
+
+def is_svg(data: bytes, content_type: str = '') -> bool:
+    """True for SVG documents, by content type or by markup at the start of the data."""
+    if 'svg' in (content_type or '').lower():
+        return True
+    head = data[:1024].lstrip().lower()
+    return head.startswith((b'<svg', b'<?xml', b'<!doctype svg')) and b'<svg' in head
+
+def read_image_header(data: bytes) -> tuple[str, int, int] | None:
+    """(format, width, height) from the first bytes of an image, or None when they do not tell."""
+    webp_dimensions = _webp_dimensions(data)
+    if webp_dimensions:
+        return ('WEBP', *webp_dimensions)
+    try:
+        with Image.open(BytesIO(data)) as img:
+            return img.format, img.width, img.height
+    except Exception:
+        return None
+
+def total_size_from_headers(headers, status_code: int, received: int) -> int | None:
+    """Full size of the resource: from Content-Range for a 206, the received length for a 200."""
+    if status_code == 200:
+        return received
+    content_range = headers.get('Content-Range', '')
+    total = content_range.rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+def probe_skip_reason(width: int | None, height: int | None, min_image_size: int, svg: bool = False) -> str | None:
+    """Why a probed image needs no full download, or None when it should be analyzed."""
+    if svg:
+        return "SVG image"
+    if width is None or height is None:
+        return None
+    if width <= TRACKING_PIXEL_MAX_SIZE and height <= TRACKING_PIXEL_MAX_SIZE:
+        return "Tracking pixel"
+    if width < min_image_size or height < min_image_size:
+        return "Image too small"
+    return None
@@ -0,0 +1,219 @@
+"""
+Parsed HTML documents shared by the HTML comparators.
+
+Every HTML comparator used to build its own BeautifulSoup tree for both documents, so a full
+comparison parsed each page about six times. A ParsedPage parses a document once and derives the
+text, structure, tag paths, meta tags, links, canonical URL and image sources from that single
+tree on first use. Pages are cached by content hash, so comparators called one after another on
+the same HTML share one parse.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+from bs4.formatter import HTMLFormatter
+
+from src.logger_setup import setup_logging
+from src.text_extractor import extract_text
+
+logger = setup_logging()
+
+# Parsed trees are several times larger than their HTML, so only recent pages are kept
+DEFAULT_CACHE_SIZE = 32
+# Text of documents at least this long is extracted without a tree unless one was already built
+STREAMING_TEXT_MIN_CHARS = 1024 * 1024
+# Elements whose content is not page text or structure
+_NON_CONTENT_TAGS = ('script', 'style')
+
+class ParsedPage:
+    """
+    One HTML document, parsed once, with lazily derived views for the comparators.
+
+    Usage:
+        page = get_parsed_page(html_content)    # cached by content hash
+        page.text, page.structure, page.links, page.canonical_url, page.image_sources
+        page.meta_tags(['description', 'keywords'])
+    """
+
+    def __init__(self, html_content: str, content_hash: str | None = None):
+        self.html_content = html_content or ""
+        self.content_hash = content_hash or hash_html(self.html_content)
+
+    @cached_property
+    def soup(self) -> BeautifulSoup:
+        return BeautifulSoup(self.html_content, 'html.parser')
+
+    @cached_property
+    def text(self) -> str:
+        """Visible text without script and style content, one non-empty phrase per line."""
+        if not self.html_content:
+            return ""
+        if 'soup' not in self.__dict__ and len(self.html_content) >= STREAMING_TEXT_MIN_CHARS:
+            # Same result, with memory bounded by the chunk size instead of a full tree
+            return extract_text(self.html_content)
+        # Only plain text and CDATA, like get_text(); comments, doctypes and script/style content are left out
+        strings = (string for string in self.soup.find_all(string=True)
+                   if type(string) in (NavigableString, CData) and string.parent.name not in _NON_CONTENT_TAGS)
+        text = ''.join(strings)
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        return '\n'.join(chunk for chunk in chunks if chunk)
+
+    @cached_property
+    def structure(self) -> str:
+        """
+        The tag tree without text, comments, scripts and styles, one tag per line and indented by
+        depth like BeautifulSoup's prettify() of a tree stripped of those nodes.
+        """
+        if not self.html_content:
+            return ""
+        formatter = HTMLFormatter.REGISTRY['minimal']
+        # prettify() keeps <pre> and <textarea> on one line
+        preserve_whitespace_tags = self.soup.preserve_whitespace_tags or set()
+        lines = []
+        # Iterative walk: (children iterator, depth, closing line of the parent)
+        stack = [(iter(self.soup.children), 0, None)]
+        while stack:
+            children, depth, closing = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                if closing:
+                    lines.append(closing)
+                continue
+            if not isinstance(child, Tag) or child.name in _NON_CONTENT_TAGS:
+                continue
+
+            indent = ' ' * depth
+            if child.can_be_empty_element or child.name in preserve_whitespace_tags:
+                lines.append(indent + _inline_structure(child, formatter))
+            else:
+                name, attributes = _tag_name(child), _format_attributes(child, formatter)
+                lines.append(f"{indent}<{name}{attributes}>")
+                stack.append((iter(child.children), depth + 1, f"{indent}</{name}>"))
+        return '\n'.join(lines)
+
+    @cached_property
+    def tag_paths(self) -> tuple[str, ...]:
+        """
+        The root path of every tag in document order, e.g. 'html>body>div#main>p.intro', without
+        script and style elements and their descendants.
+        """
+        if not self.html_content:
+            return ()
+        paths = []
+        stack = [(iter(self.soup.children), '')]
+        while stack:
+            children, parent_path = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+            if not isinstance(child, Tag) or child.name in _NON_CONTENT_TAGS:
+                continue
+            path = f"{parent_path}>{_path_step(child)}" if parent_path else _path_step(child)
+            paths.append(path)
+            stack.append((iter(child.children), path))
+        return tuple(paths)
+
+    @cached_property
+    def _meta_by_name(self) -> dict[str, str | None]:
+        meta_by_name = {}
+        for tag in self.soup.find_all('meta', attrs={'name': True}):
+            # The first tag with a name wins, as with soup.find()
+            meta_by_name.setdefault(tag['name'], tag['content'] if tag.has_attr('content') else None)
+        return meta_by_name
+
+    def meta_tags(self, meta_names: list[str]) -> dict[str, str | None]:
+        """Content of the named meta tags; None for tags that are missing or have no content."""
+        if not self.html_content:
+            return {name: None for name in meta_names}
+        return {name: self._meta_by_name.get(name) for name in meta_names}
+
+    @cached_property
+    def links(self) -> frozenset[str]:
+        """Unique href values of anchor tags."""
+        if not self.html_content:
+            return frozenset()
+        return frozenset(a_tag['href'].strip() for a_tag in self.soup.find_all('a', href=True))
+
+    @cached_property
+    def canonical_url(self) -> str | None:
+        if not self.html_content:
+            return None
+        canonical_tag = self.soup.find('link', rel='canonical', href=True)
+        return canonical_tag['href'] if canonical_tag else None
+
+    @cached_property
+    def image_sources(self) -> frozenset[str]:
+        """Unique src values of img tags."""
+        if not self.html_content:
+            return frozenset()
+        return frozenset(img_tag['src'].strip() for img_tag in self.soup.find_all('img', src=True))
+
+def _tag_name(tag: Tag) -> str:
+    return f"{tag.prefix}:{tag.name}" if tag.prefix else tag.name
+
+def _path_step(tag: Tag) -> str:
+    """A tag's name with its id and classes, as one step of a tag path."""
+    step = _tag_name(tag)
+    tag_id = tag.get('id')
+    if isinstance(tag_id, str) and tag_id:
+        step += f"#{tag_id}"
+    classes = tag.get('class')
+    if classes:
+        step += '.' + '.'.join(classes if isinstance(classes, list) else [classes])
+    return step
+
+def _format_attributes(tag: Tag, formatter: HTMLFormatter) -> str:
+    """The attributes of a start tag, formatted as BeautifulSoup does."""
+    attributes = []
+    for key, value in formatter.attributes(tag):
+        if value is None:
+            attributes.append(f" {key}")
+            continue
+        if isinstance(value, (list, tuple)):
+            value = ' '.join(value)
+        attributes.append(f" {key}={formatter.quoted_attribute_value(formatter.attribute_value(str(value)))}")
+    return ''.join(attributes)
+
+def _inline_structure(tag: Tag, formatter: HTMLFormatter) -> str:
+    """A void or whitespace-preserving tag and its descendant tags on a single line."""
+    name, attributes = _tag_name(tag), _format_attributes(tag, formatter)
+    if tag.can_be_empty_element:
+        return f"<{name}{attributes}/>"
+    children = ''.join(_inline_structure(child, formatter) for child in tag.children
+                       if isinstance(child, Tag) and child.name not in _NON_CONTENT_TAGS)
+    return f"<{name}{attributes}>{children}</{name}>"
+
+def hash_html(html_content: str) -> str:
+    """Content hash used as the cache key of parsed pages."""
+    return hashlib.blake2b((html_content or "").encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+_cache = OrderedDict()  # content hash -> ParsedPage
+_cache_lock = threading.Lock()
+
+def get_parsed_page(html_content: str | ParsedPage) -> ParsedPage:
+    """Returns the ParsedPage of an HTML document, reusing a cached one for identical content."""
+    if isinstance(html_content, ParsedPage):
+        return html_content
+
+    content_hash = hash_html(html_content)
+    with _cache_lock:
+        page = _cache.get(content_hash)
+        if page is not None:
+            _cache.move_to_end(content_hash)
+            return page
+
+    page = ParsedPage(html_content, content_hash)
+    with _cache_lock:
+        _cache[content_hash] = page
+        while len(_cache) > DEFAULT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return page
+
+def clear_parsed_page_cache():
+    with _cache_lock:
+        _cache.clear()
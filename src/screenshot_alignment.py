@@ -0,0 +1,196 @@
+"""
+Vertical alignment of two screenshots of the same page.
+
+When content near the top of a page grows or shrinks (a banner gains 40px, a notice
+disappears), every row below it moves and a row-by-row comparison reports the rest of the page
+as changed. align_screenshots hashes every pixel row of both screenshots, aligns the two row
+sequences to find blocks of rows that were inserted, removed or merely moved, and builds a copy
+of the baseline laid out in the latest screenshot's coordinates. Diffing that copy against the
+latest screenshot shows only real content changes, while the moved blocks are reported
+separately as shifted regions.
+
+A full sequence alignment of tall screenshots is quadratic, so the row runs are aligned
+patience-style instead: the common top and bottom are matched, then runs whose hash occurs once
+in each screenshot anchor the alignment, and only small gaps between anchors are aligned
+exactly. Pages with few distinct rows (repeating patterns) find few anchors and fall back to a
+plain comparison.
+"""
+import hashlib
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from src.logger_setup import setup_logging
+from src.text_diff import opcodes_from_matches, unique_matches
+
+logger = setup_logging()
+
+# Gaps between anchors are aligned exactly when base runs x latest runs is at most this
+_MAX_GAP_CELLS = 10000
+
+def hash_rows(array: np.ndarray, ignore_mask: np.ndarray | None = None) -> list[bytes]:
+    """
+    Returns an 8-byte BLAKE2b digest of every pixel row of an image array. Pixels set in
+    ignore_mask (at least as large as the array) are hashed as black.
+    """
+    array = np.ascontiguousarray(array)
+    if ignore_mask is None:
+        return [hashlib.blake2b(row, digest_size=8).digest() for row in array]
+
+    ignore_mask = ignore_mask[:array.shape[0], :array.shape[1]]
+    masked_rows = ignore_mask.any(axis=1)
+    hashes = []
+    for y, row in enumerate(array):
+        if masked_rows[y]:
+            # Only rows that cross an ignore region are copied
+            row = row.copy()
+            row[ignore_mask[y]] = 0
+        hashes.append(hashlib.blake2b(row, digest_size=8).digest())
+    return hashes
+
+def _runs(hashes: list[bytes]) -> list[tuple[bytes, int, int]]:
+    """Collapses consecutive identical rows into (hash, first row, row count) runs."""
+    runs = []
+    for y, row_hash in enumerate(hashes):
+        if runs and runs[-1][0] == row_hash:
+            runs[-1][2] += 1
+        else:
+            runs.append([row_hash, y, 1])
+    return [tuple(run) for run in runs]
+
+def _match_runs(base_keys: list[bytes], latest_keys: list[bytes]) -> list[tuple[int, int]]:
+    """Matched (base, latest) run index pairs, in order; O(N log N) plus the bounded gap alignments."""
+    n, m = len(base_keys), len(latest_keys)
+    head = 0
+    while head < n and head < m and base_keys[head] == latest_keys[head]:
+        head += 1
+    tail = 0
+    while tail < n - head and tail < m - head and base_keys[n - 1 - tail] == latest_keys[m - 1 - tail]:
+        tail += 1
+
+    anchors = [(head + i, head + j) for i, j in unique_matches(base_keys[head:n - tail], latest_keys[head:m - tail])]
+    anchors.append((n - tail, m - tail))
+    matches = [(i, i) for i in range(head)]
+    previous_i, previous_j = head, head
+    for anchor_i, anchor_j in anchors:
+        gap_base, gap_latest = anchor_i - previous_i, anchor_j - previous_j
+        if gap_base and gap_latest and gap_base * gap_latest <= _MAX_GAP_CELLS:
+            matcher = SequenceMatcher(None, base_keys[previous_i:anchor_i], latest_keys[previous_j:anchor_j], autojunk=False)
+            for block in matcher.get_matching_blocks():
+                matches += [(previous_i + block.a + k, previous_j + block.b + k) for k in range(block.size)]
+        if anchor_i < n - tail:
+            matches.append((anchor_i, anchor_j))
+        previous_i, previous_j = anchor_i + 1, anchor_j + 1
+    matches += [(n - tail + i, m - tail + i) for i in range(tail)]
+    return matches
+
+def align_rows(base_hashes: list[bytes], latest_hashes: list[bytes]) -> dict:
+    """
+    Aligns two row-hash sequences.
+
+    Runs of identical rows (blank margins, solid bars) are collapsed first, so a gap that grew by
+    a few pixels aligns as a matched run plus a few inserted rows rather than a mismatch. Runs
+    that cannot be anchored (see the module docstring) are reported as replaced.
+
+    Returns:
+        dict: {
+            'matches': [(base_y, latest_y, height)] blocks of identical rows,
+            'replaced': [(base_y, base_height, latest_y, latest_height)] blocks whose content changed,
+            'removed': [(base_y, height)] rows only in the baseline,
+            'inserted': [(latest_y, height)] rows only in the latest screenshot
+        }
+    """
+    base_runs, latest_runs = _runs(base_hashes), _runs(latest_hashes)
+    run_matches = _match_runs([run[0] for run in base_runs], [run[0] for run in latest_runs])
+
+    matches, replaced, removed, inserted = [], [], [], []
+
+    def add_match(base_y, latest_y, height):
+        # Consecutive matches with the same offset form one block
+        if matches and matches[-1][0] + matches[-1][2] == base_y and matches[-1][1] + matches[-1][2] == latest_y:
+            matches[-1] = (matches[-1][0], matches[-1][1], matches[-1][2] + height)
+        else:
+            matches.append((base_y, latest_y, height))
+
+    def span(runs, start, end):
+        return (runs[start][1], runs[end - 1][1] + runs[end - 1][2] - runs[start][1]) if end > start else (None, 0)
+
+    for tag, i1, i2, j1, j2 in opcodes_from_matches(run_matches, len(base_runs), len(latest_runs)):
+        if tag == 'equal':
+            for base_run, latest_run in zip(base_runs[i1:i2], latest_runs[j1:j2]):
+                height = min(base_run[2], latest_run[2])
+                extra_base, extra_latest = base_run[2] - height, latest_run[2] - height
+                continues_block = matches and matches[-1][0] + matches[-1][2] == base_run[1] \
+                    and matches[-1][1] + matches[-1][2] == latest_run[1]
+                if continues_block:
+                    # Keep the offset of the block above; the run's extra rows are at its bottom
+                    base_y, latest_y = base_run[1], latest_run[1]
+                    extra_base_y, extra_latest_y = base_y + height, latest_y + height
+                else:
+                    # After a change, align the run's bottom with the rows that follow it
+                    base_y, latest_y = base_run[1] + extra_base, latest_run[1] + extra_latest
+                    extra_base_y, extra_latest_y = base_run[1], latest_run[1]
+                add_match(base_y, latest_y, height)
+                if extra_base:
+                    removed.append((extra_base_y, extra_base))
+                elif extra_latest:
+                    inserted.append((extra_latest_y, extra_latest))
+        elif tag == 'replace':
+            base_y, base_height = span(base_runs, i1, i2)
+            latest_y, latest_height = span(latest_runs, j1, j2)
+            replaced.append((base_y, base_height, latest_y, latest_height))
+        elif tag == 'delete':
+            removed.append(span(base_runs, i1, i2))
+        elif tag == 'insert':
+            inserted.append(span(latest_runs, j1, j2))
+
+    return {'matches': matches, 'replaced': replaced, 'removed': removed, 'inserted': inserted}
+
+def align_screenshots(base: np.ndarray, latest: np.ndarray, min_shift_rows: int = 1,
+                      ignore_mask: np.ndarray | None = None) -> dict | None:
+    """
+    Aligns a baseline screenshot to the latest one. Ignored pixels (see ignore_masks) do not
+    affect the alignment.
+
+    Returns None when the screenshots have different widths or no block of rows moved, in which
+    case a plain comparison gives the same result. Otherwise returns:
+        dict: {
+            'aligned_base': baseline rows laid out in the latest screenshot's coordinates; rows
+                that only exist in the latest screenshot are white,
+            'removed_rows': number of baseline rows with no place in the latest screenshot,
+            'shifted_regions': [{'base_y', 'latest_y', 'height', 'offset'}] moved, unchanged blocks,
+            'alignment': the align_rows result
+        }
+    """
+    if base.shape[1] != latest.shape[1]:
+        return None
+
+    alignment = align_rows(hash_rows(base, ignore_mask), hash_rows(latest, ignore_mask))
+    shifted_regions = [
+        {'base_y': base_y, 'latest_y': latest_y, 'height': height, 'offset': latest_y - base_y}
+        for base_y, latest_y, height in alignment['matches']
+        if latest_y != base_y and height >= min_shift_rows
+    ]
+    if not shifted_regions:
+        return None
+
+    aligned_base = np.full(latest.shape, 255, dtype=np.uint8)
+    for base_y, latest_y, height in alignment['matches']:
+        aligned_base[latest_y:latest_y + height] = base[base_y:base_y + height]
+
+    removed_rows = sum(height for _, height in alignment['removed'])
+    for base_y, base_height, latest_y, latest_height in alignment['replaced']:
+        # Changed blocks are compared top-aligned; baseline rows beyond the latest block were removed
+        overlap = min(base_height, latest_height)
+        aligned_base[latest_y:latest_y + overlap] = base[base_y:base_y + overlap]
+        removed_rows += base_height - overlap
+
+    logger.info(f"Screenshot alignment: {len(shifted_regions)} shifted blocks "
+                f"({sum(r['height'] for r in shifted_regions)} rows), "
+                f"{sum(h for _, h in alignment['inserted'])} rows inserted, {removed_rows} rows removed")
+    return {
+        'aligned_base': aligned_base,
+        'removed_rows': removed_rows,
+        'shifted_regions': shifted_regions,
+        'alignment': alignment
+    }
@@ -5,6 +5,10 @@ import time
 from urllib.parse import urlparse
 from src.config_loader import get_config
 from src.logger_setup import setup_logging
+from src.tiled_screenshot import get_tiles_directory, write_tile_manifest, create_preview_from_tiles, remove_tiles
+from src.tile_hashing import write_tile_hashes, remove_tile_hashes, DEFAULT_TILE_SIZE
+from src.ignore_masks import write_ignore_regions, remove_ignore_regions
+from src.structure_fingerprint import write_structure_fingerprint
 import re
 
 # Playwright imports
@@ -14,168 +18,188 @@ logger = setup_logging()
 config = get_config()
 
 DEFAULT_SNAPSHOT_DIR = "data/snapshots"
+DEFAULT_PROFILE_DIR = "data/browser_profiles"
+DEFAULT_VIEWPORT = {'name': 'desktop', 'width': 1920, 'height': 1080}
+
+# Buttons tried, in order, to dismiss cookie/consent banners in a shared browser session
+DEFAULT_CONSENT_SELECTORS = [
+    '#onetrust-accept-btn-handler',
+    '#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll',
+    '#CybotCookiebotDialogBodyButtonAccept',
+    '.cc-allow',
+    '.cky-btn-accept',
+    'button[aria-label="Accept all"]',
+    'button:has-text("Accept all")',
+    'button:has-text("Accept")',
+]
+
+# Prepares a page for a full-page screenshot in a single round trip: promotes lazy-loaded media,
+# scrolls through the page in-page to trigger intersection observers, waits for visible images,
+# returns to the top and finally neutralizes sticky/fixed elements found with a TreeWalker.
+# Style reads are batched before any writes so the DOM is only re-laid out once.
+PAGE_PREPARATION_SCRIPT = """
+async (options) => {
+    const report = {lazyPromoted: 0, scrollSteps: 0, pageHeight: 0, imagesTotal: 0, imagesLoaded: 0, stickyNeutralized: 0};
+    const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms));
+    const nextFrame = () => new Promise(resolve => requestAnimationFrame(() => resolve()));
+    const scrollingElement = document.scrollingElement || document.documentElement;
+
+    if (options.promoteLazy) {
+        document.querySelectorAll('img[loading="lazy"], iframe[loading="lazy"]').forEach(el => {
+            el.loading = 'eager';
+            report.lazyPromoted++;
+        });
+        document.querySelectorAll('img[data-src]:not([src]), source[data-src]:not([src])').forEach(el => {
+            el.src = el.dataset.src;
+            el.removeAttribute('data-src');
+            report.lazyPromoted++;
+        });
+        document.querySelectorAll('img[data-srcset]:not([srcset]), source[data-srcset]:not([srcset])').forEach(el => {
+            el.srcset = el.dataset.srcset;
+            el.removeAttribute('data-srcset');
+            report.lazyPromoted++;
+        });
+    }
+
+    if (options.scroll) {
+        const started = performance.now();
+        const step = Math.max(200, Math.floor(window.innerHeight / 2));
+        let position = 0;
+        // The page may grow while scrolling (infinite scroll), so re-read its height every step
+        while (position < Math.min(scrollingElement.scrollHeight, options.maxScrollHeight) &&
+               performance.now() - started < options.maxScrollMs) {
+            window.scrollTo(0, position);
+            report.scrollSteps++;
+            await nextFrame();
+            await sleep(options.scrollPauseMs);
+            position += step;
+        }
+        window.scrollTo(0, Math.min(scrollingElement.scrollHeight, options.maxScrollHeight));
+        await sleep(options.scrollPauseMs);
+    }
+
+    if (options.promoteLazy) {
+        document.querySelectorAll('[data-lazy], [data-src], [class*="lazy"]').forEach(el => {
+            el.dispatchEvent(new Event('load'));
+            if (el.style.display === 'none' && !el.classList.contains('hidden-permanently')) {
+                el.style.display = 'block';
+            }
+        });
 
-def handle_sticky_elements(page):
-    """Advanced sticky element handling that addresses all common scenarios"""
-    
-    page.evaluate("""
-        () => {
-            // Find all sticky and fixed elements
-            const allElements = document.querySelectorAll('*');
-            const stickyElements = [];
-            
-            allElements.forEach(el => {
-                const style = window.getComputedStyle(el);
-                if (style.position === 'sticky' || style.position === 'fixed') {
-                    stickyElements.push({
-                        element: el,
-                        originalPosition: style.position,
-                        originalTop: style.top,
-                        originalZIndex: style.zIndex
-                    });
-                }
-            });
-            
-            // Store original values and convert to relative
-            window.stickyElementsBackup = stickyElements;
-            
-            stickyElements.forEach(item => {
-                const el = item.element;
-                el.style.position = 'relative';
-                el.style.top = 'auto';
-                el.style.zIndex = 'auto';
-            });
-            
-            // Handle common sticky classes
-            const commonStickySelectors = [
-                '.sticky', '.fixed', '.navbar-fixed-top', '.navbar-fixed',
-                '.header-fixed', '.floating', '.affix', '.sticky-header',
-                '.fixed-header', '.navbar-static-top', '.sticky-nav'
-            ];
-            
-            commonStickySelectors.forEach(selector => {
-                document.querySelectorAll(selector).forEach(el => {
-                    const style = window.getComputedStyle(el);
-                    if (style.position === 'sticky' || style.position === 'fixed') {
-                        el.style.position = 'relative';
-                        el.style.top = 'auto';
-                    }
-                });
-            });
+        // Wait until at least 80% of the rendered images have loaded
+        const deadline = performance.now() + options.imageWaitMs;
+        while (true) {
+            const rendered = Array.from(document.images).filter(img => img.width > 0 && img.height > 0);
+            report.imagesTotal = rendered.length;
+            report.imagesLoaded = rendered.filter(img => img.complete && (img.naturalWidth > 0 || img.src === '')).length;
+            if (report.imagesLoaded >= Math.ceil(report.imagesTotal * 0.8) || performance.now() > deadline) break;
+            await sleep(100);
         }
-    """)
+    }
 
-def advanced_lazy_loading_handler(page):
-    """Comprehensive lazy loading handler using latest Playwright techniques"""
-    
-    logger.info("Starting advanced lazy loading detection...")
-    
-    # Step 1: Force eager loading for native lazy images
-    page.evaluate("""
-        () => {
-            // Force all lazy images to eager loading
-            document.querySelectorAll('img[loading="lazy"]').forEach(img => {
-                img.loading = 'eager';
-            });
-            
-            // Handle data-src lazy images
-            document.querySelectorAll('img[data-src]:not([src])').forEach(img => {
-                if (img.dataset.src) {
-                    img.src = img.dataset.src;
-                    img.removeAttribute('data-src');
-                }
-            });
-            
-            // Handle srcset lazy images
-            document.querySelectorAll('img[data-srcset]:not([srcset])').forEach(img => {
-                if (img.dataset.srcset) {
-                    img.srcset = img.dataset.srcset;
-                    img.removeAttribute('data-srcset');
-                }
-            });
+    if (options.scroll) {
+        window.scrollTo(0, 0);
+        await nextFrame();
+    }
+
+    if (options.neutralizeSticky) {
+        const skipped = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'svg', 'HEAD']);
+        const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_ELEMENT, {
+            acceptNode: (node) => skipped.has(node.nodeName) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT
+        });
+        const stuck = [];
+        for (let node = walker.currentNode; node; node = walker.nextNode()) {
+            const position = getComputedStyle(node).position;
+            if (position === 'sticky' || position === 'fixed') stuck.push(node);
         }
-    """)
-    
-    # Step 2: Smart scrolling to trigger intersection observers
-    try:
-        page_height = page.evaluate("document.documentElement.scrollHeight")
-        viewport_height = page.evaluate("window.innerHeight")
-        
-        # Calculate scroll positions to ensure all content is triggered
-        scroll_positions = []
-        current_pos = 0
-        step_size = viewport_height // 2  # Overlap scrolling
-        
-        while current_pos < page_height:
-            scroll_positions.append(current_pos)
-            current_pos += step_size
-            
-        # Add final position
-        scroll_positions.append(page_height)
-        
-        # Scroll through all positions
-        for pos in scroll_positions:
-            page.evaluate(f"window.scrollTo(0, {pos})")
-            time.sleep(0.2)  # Brief pause for intersection observers
-            
-            # Wait for any new network requests
-            try:
-                page.wait_for_load_state('networkidle', timeout=2000)
-            except:
-                pass  # Continue if timeout
-                
-    except Exception as e:
-        logger.warning(f"Error during smart scrolling: {e}")
-    
-    # Step 3: Handle specific lazy loading libraries
-    page.evaluate("""
-        () => {
-            // Trigger common lazy loading libraries
-            const lazyElements = document.querySelectorAll(
-                '[data-lazy], [data-src], [class*="lazy"], [class*="lazyload"]'
-            );
-            
-            lazyElements.forEach(el => {
-                // Trigger intersection observer manually
-                const event = new Event('load');
-                el.dispatchEvent(event);
-                
-                // Force visibility if hidden
-                if (el.style.display === 'none' && !el.classList.contains('hidden-permanently')) {
-                    el.style.display = 'block';
-                }
-            });
+        // All reads are done; write in one batch
+        for (const el of stuck) {
+            el.style.setProperty('position', 'relative', 'important');
+            el.style.setProperty('top', 'auto', 'important');
+            el.style.setProperty('z-index', 'auto', 'important');
         }
-    """)
-    
-    # Step 4: Wait for visible images to load (optimized)
+        report.stickyNeutralized = stuck.length;
+    }
+
+    report.pageHeight = scrollingElement.scrollHeight;
+    return report;
+}
+"""
+
+def _get_preparation_options(**overrides) -> dict:
+    """Options for PAGE_PREPARATION_SCRIPT, read from the page_preparation config section."""
+    preparation_config = config.get('page_preparation', {}) or {}
+    options = {
+        'neutralizeSticky': True,
+        'promoteLazy': True,
+        'scroll': True,
+        'scrollPauseMs': preparation_config.get('scroll_pause_ms', 150),
+        'maxScrollMs': preparation_config.get('max_scroll_ms', 15000),
+        'maxScrollHeight': preparation_config.get('max_scroll_height', 30000),
+        'imageWaitMs': preparation_config.get('image_wait_ms', 5000)
+    }
+    options.update(overrides)
+    return options
+
+def prepare_page_for_capture(page) -> dict:
+    """
+    Runs the bundled preparation script in one round trip: lazy content promotion, in-page
+    scrolling, image wait and sticky element neutralization. Returns the script's report.
+    """
+    report = page.evaluate(PAGE_PREPARATION_SCRIPT, _get_preparation_options())
+    logger.info(f"Page prepared: {report}")
+    return report
+
+# Page-coordinate [x, y, width, height] boxes of the visible elements matching any selector
+IGNORE_SELECTOR_SCRIPT = """
+(selectors) => {
+    const boxes = [];
+    for (const selector of selectors) {
+        let elements;
+        try {
+            elements = document.querySelectorAll(selector);
+        } catch (e) {
+            continue;  // Invalid selector
+        }
+        for (const element of elements) {
+            const rect = element.getBoundingClientRect();
+            if (rect.width <= 0 || rect.height <= 0) continue;
+            const left = Math.floor(rect.left + window.scrollX);
+            const top = Math.floor(rect.top + window.scrollY);
+            boxes.push([left, top,
+                        Math.ceil(rect.right + window.scrollX) - left,
+                        Math.ceil(rect.bottom + window.scrollY) - top]);
+        }
+    }
+    return boxes;
+}
+"""
+
+def get_ignore_selectors(site_selectors: list[str] | None = None) -> list[str]:
+    """CSS selectors of elements to leave out of visual comparisons: the configured ones plus the site's own."""
+    comparison_config = config.get('visual_comparison', {}) or {}
+    selectors = list(comparison_config.get('ignore_selectors', []) or [])
+    for selector in site_selectors or []:
+        if selector and selector not in selectors:
+            selectors.append(selector)
+    return selectors
+
+def _resolve_ignore_selectors(page, selectors: list[str]) -> list[list[int]]:
+    """Resolves ignore selectors to the element boxes on the page as it is about to be captured."""
     try:
-        page.wait_for_function("""
-            () => {
-                const images = Array.from(document.images);
-                const visibleImages = images.filter(img => {
-                    const rect = img.getBoundingClientRect();
-                    return rect.width > 0 && rect.height > 0 && 
-                           window.getComputedStyle(img).display !== 'none';
-                });
-                
-                // Check if at least 80% of visible images are loaded
-                if (visibleImages.length === 0) return true;
-                
-                const loadedCount = visibleImages.filter(img => 
-                    img.complete && (img.naturalWidth > 0 || img.src === '')
-                ).length;
-                
-                return loadedCount >= Math.ceil(visibleImages.length * 0.8);
-            }
-        """, timeout=5000)  # Reduced from 10000 to 5000 for better performance
-        logger.info("Visible images loading completed")
+        return page.evaluate(IGNORE_SELECTOR_SCRIPT, selectors)
     except Exception as e:
-        logger.info(f"Image loading completed with some timeouts: {e}")
-    
-    # Step 5: Return to top for screenshot
-    page.evaluate("window.scrollTo(0, 0)")
-    time.sleep(1)  # Allow scroll to complete
+        logger.warning(f"Could not resolve ignore selectors {selectors}: {e}")
+        return []
+
+def handle_sticky_elements(page):
+    """Neutralizes sticky and fixed elements (the sticky part of the bundled preparation script)."""
+    return page.evaluate(PAGE_PREPARATION_SCRIPT, _get_preparation_options(promoteLazy=False, scroll=False))
+
+def advanced_lazy_loading_handler(page):
+    """Promotes lazy-loaded media and scrolls the page to trigger it (the lazy loading part of the bundled preparation script)."""
+    logger.info("Starting advanced lazy loading detection...")
+    return page.evaluate(PAGE_PREPARATION_SCRIPT, _get_preparation_options(neutralizeSticky=False))
 
 def scroll_and_load_lazy_content(page):
     """Legacy function - now calls advanced lazy loading handler"""
@@ -305,7 +329,8 @@ def get_snapshot_directory():
             raise # Or handle by returning a default/temp path
     return path
 
-def save_html_snapshot(site_id: str, url: str, html_content: str, timestamp: datetime = None, is_baseline: bool = False) -> tuple[str | None, str | None]:
+def save_html_snapshot(site_id: str, url: str, html_content: str, timestamp: datetime = None, is_baseline: bool = False,
+                       url_path: str = None) -> tuple[str | None, str | None]:
     """
     Saves a snapshot of the HTML content to a file.
     If is_baseline is True, saves to a dedicated baseline location with a fixed name.
@@ -318,6 +343,8 @@ def save_html_snapshot(site_id: str, url: str, html_content: str, timestamp: dat
                                         Defaults to current UTC time if not provided.
                                         Used for regular snapshots, ignored for baseline filename.
         is_baseline (bool, optional): If True, save as a baseline snapshot.
+        url_path (str, optional): Page slug; when given, baselines are saved per page as
+                                  baseline_<url_path>.html instead of a single baseline.html.
 
     Returns:
         tuple[str | None, str | None]: (file_path, content_hash) if successful, (None, None) otherwise.
@@ -334,7 +361,7 @@ def save_html_snapshot(site_id: str, url: str, html_content: str, timestamp: dat
 
     if is_baseline:
         site_snapshot_dir = os.path.join(site_base_dir, "baseline")
-        filename = "baseline.html"
+        filename = f"baseline_{url_path}.html" if url_path else "baseline.html"
         log_prefix = "Baseline HTML"
     else:
         site_snapshot_dir = os.path.join(site_base_dir, "html")
@@ -365,13 +392,279 @@ def save_html_snapshot(site_id: str, url: str, html_content: str, timestamp: dat
         logger.error(f"An unexpected error occurred while saving {log_prefix.lower()} snapshot for site ID {site_id}: {e}", exc_info=True)
         return None, None
 
-def save_visual_snapshot(site_id: str, url: str, timestamp: datetime = None, is_baseline: bool = False, url_path: str = None) -> str | None:
+def _get_launch_args(browser_type: str) -> list[str]:
+    """Returns the browser launch arguments used for every capture."""
+    # Enhanced launch arguments for stability
+    launch_args = [
+        '--no-sandbox',
+        '--disable-setuid-sandbox',
+        '--disable-dev-shm-usage',
+        '--disable-gpu',
+        '--disable-extensions'
+    ]
+
+    if browser_type == 'chromium':
+        launch_args.extend([
+            '--use-angle=gl',
+            '--disable-background-timer-throttling',
+            '--disable-renderer-backgrounding'
+        ])
+    return launch_args
+
+def _to_project_relative_path(path_abs: str) -> str:
     """
-    Saves a visual snapshot (screenshot) of a web page using Playwright.
-    Returns a web-friendly, relative path to the saved image file, including the 'data' directory.
+    Construct a relative path that is valid from the project root.
+    It will look like: 'data/snapshots/domain/site_id/folder/file.png'
     """
-    logger.info(f"Attempting to capture visual snapshot for site ID {site_id} ({url})")
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    correct_relative_path = os.path.relpath(path_abs, project_root)
+    # Normalize for web (use forward slashes)
+    return correct_relative_path.replace("\\", "/")
+
+def get_capture_viewports() -> list[dict]:
+    """
+    Returns the viewports every page is rendered at, as {'name', 'width', 'height'} dicts.
+    The first one is the primary viewport, whose snapshot keeps the unsuffixed filename.
+    """
+    multi_viewport_config = config.get('multi_viewport_capture', {}) or {}
+    viewports = multi_viewport_config.get('viewports') or []
+    if not multi_viewport_config.get('enabled', False) or not viewports:
+        return [DEFAULT_VIEWPORT]
+    return viewports
+
+def get_viewport_snapshot_path(snapshot_path: str, viewport_name: str) -> str:
+    """Path of a secondary viewport's snapshot, e.g. 'baseline_home.png' -> 'baseline_home__mobile.png'."""
+    stem, extension = os.path.splitext(snapshot_path)
+    return f"{stem}__{viewport_name}{extension}"
+
+def _get_viewport_size(viewport: dict) -> dict:
+    return {'width': viewport['width'], 'height': viewport['height']}
+
+def _get_profile_directory(site_id: str, url: str) -> str:
+    """Gets the on-disk browser profile directory for a site, creating it if needed."""
+    reuse_config = config.get('browser_context_reuse', {}) or {}
+    path = reuse_config.get('profile_directory', DEFAULT_PROFILE_DIR)
+    if not os.path.isabs(path):
+        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        path = os.path.join(project_root, path)
+
+    domain_name = urlparse(url).netloc.replace('.', '_').replace(':', '_')
+    profile_dir = os.path.join(path, domain_name, site_id)
+    os.makedirs(profile_dir, exist_ok=True)
+    return profile_dir
+
+class SiteCaptureSession:
+    """
+    Shares one browser context across all page captures of a single site.
+
+    Every page captured through the session is opened in the same context, so CSS,
+    JS and fonts fetched for the first page are served from the browser's HTTP cache
+    for the rest of the site, and a cookie/consent banner only needs to be accepted once.
+    With ``persistent_profile`` enabled the context is backed by a per-site profile
+    directory, which keeps the cache and consent cookies between checks as well.
+
+    Usage:
+        with SiteCaptureSession(site_id, url) as session:
+            save_visual_snapshot(site_id, page_url, session=session)
+    """
+
+    def __init__(self, site_id: str, url: str, persistent_profile: bool | None = None):
+        reuse_config = config.get('browser_context_reuse', {}) or {}
+        self.site_id = site_id
+        self.url = url
+        self.persistent_profile = reuse_config.get('persistent_profile', False) if persistent_profile is None else persistent_profile
+        self.consent_selectors = reuse_config.get('consent_selectors', DEFAULT_CONSENT_SELECTORS)
+        self.browser_type = config.get('playwright_browser_type', 'chromium')
+        self.pages_captured = 0
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._consent_handled = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def start(self):
+        """Launches the browser and opens the shared context."""
+        self._playwright = sync_playwright().start()
+        browser_launcher = getattr(self._playwright, self.browser_type)
+        context_options = {
+            'user_agent': config.get('playwright_user_agent'),
+            'viewport': _get_viewport_size(get_capture_viewports()[0])
+        }
 
+        if self.persistent_profile:
+            profile_dir = _get_profile_directory(self.site_id, self.url)
+            self._context = browser_launcher.launch_persistent_context(
+                profile_dir,
+                headless=config.get('playwright_headless_mode', True),
+                args=_get_launch_args(self.browser_type),
+                **context_options
+            )
+            logger.info(f"Opened persistent browser profile for site ID {self.site_id}: {profile_dir}")
+        else:
+            self._browser = browser_launcher.launch(
+                headless=config.get('playwright_headless_mode', True),
+                args=_get_launch_args(self.browser_type)
+            )
+            self._context = self._browser.new_context(**context_options)
+            logger.info(f"Opened shared browser context for site ID {self.site_id}")
+
+    def close(self):
+        """Closes the shared context, the browser and Playwright."""
+        for closable in (self._context, self._browser):
+            if closable is None:
+                continue
+            try:
+                closable.close()
+            except Exception as e:
+                logger.debug(f"Error closing browser resource for site ID {self.site_id}: {e}")
+        if self._playwright is not None:
+            try:
+                self._playwright.stop()
+            except Exception as e:
+                logger.debug(f"Error stopping Playwright for site ID {self.site_id}: {e}")
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        logger.info(f"Closed browser session for site ID {self.site_id} after {self.pages_captured} captures")
+
+    def restart(self):
+        """Discards the current browser and context and opens fresh ones (used after a crash)."""
+        logger.warning(f"Restarting browser session for site ID {self.site_id}")
+        self.close()
+        self._consent_handled = False
+        self.start()
+
+    def new_page(self):
+        """
+        Opens a new tab in the shared context. The session is restarted only when the browser has
+        disconnected or the context no longer opens pages; a failed capture of one page (navigation
+        timeout, network error) leaves the shared context and its cache in place.
+        """
+        if self._context is None:
+            self.start()
+        elif self._browser is not None and not self._browser.is_connected():
+            self.restart()
+        try:
+            return self._context.new_page()
+        except Exception as e:
+            logger.warning(f"Shared browser context for site ID {self.site_id} cannot open pages: {e}")
+            self.restart()
+            return self._context.new_page()
+
+    def accept_consent_once(self, page):
+        """Clicks the first visible cookie/consent button, once per session."""
+        if self._consent_handled:
+            return
+        self._consent_handled = True
+        for selector in self.consent_selectors:
+            try:
+                button = page.locator(selector).first
+                if button.count() and button.is_visible():
+                    button.click(timeout=2000)
+                    logger.info(f"Accepted consent banner for site ID {self.site_id} using selector: {selector}")
+                    return
+            except Exception as e:
+                logger.debug(f"Consent selector {selector} not usable: {e}")
+
+def _capture_screenshot(page, url: str, image_path_abs: str, session: SiteCaptureSession | None = None,
+                        ignore_selectors: list[str] | None = None):
+    """Navigates the page, prepares it and saves a full-page screenshot."""
+    # Navigate with comprehensive waiting
+    page.goto(url, 
+        wait_until='domcontentloaded', 
+        timeout=config.get('playwright_navigation_timeout_ms', 30000)
+    )
+    
+    # Initial render delay
+    time.sleep(config.get('playwright_render_delay_ms', 2000) / 1000)
+
+    if session is not None:
+        session.accept_consent_once(page)
+    
+    # Lazy content, scrolling and sticky elements in a single in-page script
+    prepare_page_for_capture(page)
+    
+    # Ensure everything is completely loaded
+    ensure_complete_loading(page)
+    
+    ignore_selectors = get_ignore_selectors(ignore_selectors)
+    _save_screenshot(page, image_path_abs, ignore_selectors)
+
+    # Re-render the already loaded page at the other viewports instead of loading it again
+    viewports = get_capture_viewports()
+    for viewport in viewports[1:]:
+        page.set_viewport_size(_get_viewport_size(viewport))
+        # Media queries may change layout, sticky elements and which lazy images are visible
+        prepare_page_for_capture(page)
+        _save_screenshot(page, get_viewport_snapshot_path(image_path_abs, viewport['name']), ignore_selectors)
+        logger.info(f"Saved {viewport['name']} ({viewport['width']}x{viewport['height']}) snapshot of {url}")
+    if len(viewports) > 1:
+        page.set_viewport_size(_get_viewport_size(viewports[0]))
+
+def _save_screenshot(page, image_path_abs: str, ignore_selectors: list[str] | None = None):
+    """Saves a full-page screenshot, in tiles when tiled capture applies to the page."""
+    # Tiles from an earlier capture at the same path (baselines reuse their filename) must not linger
+    remove_tiles(image_path_abs)
+    remove_tile_hashes(image_path_abs)
+    remove_ignore_regions(image_path_abs)
+    # Element boxes depend on the layout of this viewport, so they are resolved for every screenshot
+    ignore_regions = _resolve_ignore_selectors(page, ignore_selectors) if ignore_selectors else []
+    tiled_config = config.get('tiled_capture', {}) or {}
+    if not (tiled_config.get('enabled', False) and _capture_tiled_screenshot(page, image_path_abs, tiled_config)):
+        page.screenshot(path=image_path_abs, full_page=True)
+    if ignore_regions:
+        write_ignore_regions(image_path_abs, ignore_selectors, ignore_regions)
+
+    # Tile hashes let later comparisons skip the pixel diff for unchanged areas
+    tile_hash_config = config.get('tile_hashing', {}) or {}
+    if tile_hash_config.get('enabled', True):
+        write_tile_hashes(image_path_abs, tile_hash_config.get('tile_size', DEFAULT_TILE_SIZE))
+
+def _capture_tiled_screenshot(page, image_path_abs: str, tiled_config: dict) -> bool:
+    """
+    Saves a tall page as fixed-height tiles plus a manifest, and a small preview at image_path_abs.
+    Pages taller than max_page_height are cut off there. Returns False (nothing captured) for pages
+    shorter than min_page_height, which are saved as a single screenshot instead.
+    """
+    page_height = page.evaluate(
+        "() => Math.max(document.body ? document.body.scrollHeight : 0, document.documentElement.scrollHeight)"
+    )
+    if page_height < tiled_config.get('min_page_height', 8000):
+        return False
+
+    tile_height = tiled_config.get('tile_height', 4000)
+    height = min(page_height, tiled_config.get('max_page_height', 30000))
+    width = page.viewport_size['width']
+    extension = os.path.splitext(image_path_abs)[1]
+
+    tiles_dir = get_tiles_directory(image_path_abs)
+    os.makedirs(tiles_dir, exist_ok=True)
+
+    tiles = []
+    for index, y in enumerate(range(0, height, tile_height)):
+        tile = {'file': f"tile_{index:04d}{extension}", 'y': y, 'height': min(tile_height, height - y)}
+        page.screenshot(
+            path=os.path.join(tiles_dir, tile['file']),
+            full_page=True,
+            clip={'x': 0, 'y': y, 'width': width, 'height': tile['height']}
+        )
+        tiles.append(tile)
+
+    manifest = write_tile_manifest(image_path_abs, width, height, page_height, tile_height, tiles, extension.lstrip('.'))
+    create_preview_from_tiles(image_path_abs, manifest, tiled_config.get('preview_width', 960))
+    logger.info(f"Saved {len(tiles)} tiles ({width}x{height}, page height {page_height}) to {tiles_dir}")
+    return True
+
+def _get_visual_snapshot_path(site_id: str, url: str, timestamp: datetime = None, is_baseline: bool = False,
+                              url_path: str = None) -> str:
+    """Builds (and creates the directory for) the absolute path of a visual snapshot."""
     # Get snapshot format from config, default to 'png' for best quality
     snapshot_format = config.get('snapshot_format', 'png').lower()
     if snapshot_format not in ['png', 'jpeg', 'webp']:
@@ -382,8 +675,7 @@ def save_visual_snapshot(site_id: str, url: str, timestamp: datetime = None, is_
     domain_name = parsed_url.netloc.replace('.', '_').replace(':', '_')
     
     if url_path is None:
-        url_path = (parsed_url.path.strip('/') or 'home').replace('/', '_')
-        url_path = re.sub(r'\.(html|htm|php|aspx|jsp)$', '', url_path, flags=re.IGNORECASE).lower()
+        url_path = get_url_path_slug(url)
 
     # This function returns the absolute path to the data/snapshots directory
     # e.g., C:/.../Project/data/snapshots
@@ -400,85 +692,178 @@ def save_visual_snapshot(site_id: str, url: str, timestamp: datetime = None, is_
         filename = f"{ts.strftime('%Y%m%d_%H%M%S_%f')}_utc.{snapshot_format}"
 
     os.makedirs(site_visual_dir, exist_ok=True)
-    image_path_abs = os.path.join(site_visual_dir, filename)
+    return os.path.join(site_visual_dir, filename)
 
+def get_url_path_slug(url: str) -> str:
+    """Turns a page URL into the slug used in snapshot filenames, e.g. '/about/team.html' -> 'about_team'."""
+    url_path = (urlparse(url).path.strip('/') or 'home').replace('/', '_')
+    return re.sub(r'\.(html|htm|php|aspx|jsp)$', '', url_path, flags=re.IGNORECASE).lower()
+
+def _run_with_page(site_id: str, url: str, capture_fn, session: SiteCaptureSession | None = None):
+    """
+    Opens a page (in the session's shared context, or in a fresh browser) and runs capture_fn(page),
+    retrying up to playwright_retries times. Returns capture_fn's result, or None if all attempts fail.
+    """
     max_retries = config.get('playwright_retries', 3)
     for attempt in range(1, max_retries + 1):
         try:
+            if session is not None:
+                page = session.new_page()
+                try:
+                    result = capture_fn(page)
+                finally:
+                    page.close()
+                session.pages_captured += 1
+                return result
+
             with sync_playwright() as p:
                 browser_type = config.get('playwright_browser_type', 'chromium')
-                
-                # Enhanced launch arguments for stability
-                launch_args = [
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-dev-shm-usage',
-                    '--disable-gpu',
-                    '--disable-extensions'
-                ]
-                
-                if browser_type == 'chromium':
-                    launch_args.extend([
-                        '--use-angle=gl',
-                        '--disable-background-timer-throttling',
-                        '--disable-renderer-backgrounding'
-                    ])
-
                 browser = getattr(p, browser_type).launch(
                     headless=config.get('playwright_headless_mode', True),
-                    args=launch_args
+                    args=_get_launch_args(browser_type)
                 )
                 
                 context = browser.new_context(
                     user_agent=config.get('playwright_user_agent'),
-                    viewport={'width': 1920, 'height': 1080}
+                    viewport=_get_viewport_size(get_capture_viewports()[0])
                 )
                 page = context.new_page()
-                
-                # Navigate with comprehensive waiting
-                page.goto(url, 
-                    wait_until='domcontentloaded', 
-                    timeout=config.get('playwright_navigation_timeout_ms', 30000)
-                )
-                
-                # Initial render delay
-                time.sleep(config.get('playwright_render_delay_ms', 2000) / 1000)
-                
-                # Handle sticky elements FIRST
-                handle_sticky_elements(page)
-                
-                # Advanced lazy loading handling
-                advanced_lazy_loading_handler(page)
-                
-                # Ensure everything is completely loaded
-                ensure_complete_loading(page)
-                
-                page.screenshot(path=image_path_abs, full_page=True)
+                result = capture_fn(page)
                 browser.close()
-
-                logger.info(f"Successfully saved visual snapshot for site ID {site_id} to: {image_path_abs}")
-
-                # --- THIS IS THE DEFINITIVE FIX ---
-                # Construct a relative path that is valid from the project root.
-                # It will look like: 'data/snapshots/domain/site_id/folder/file.png'
-                project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                correct_relative_path = os.path.relpath(image_path_abs, project_root)
-                
-                # Normalize for web (use forward slashes)
-                final_path = correct_relative_path.replace("\\", "/")
-                
-                logger.info(f"Returning final relative snapshot path: {final_path}")
-                return final_path
+                return result
 
         except Exception as e:
             logger.error(f"Attempt {attempt}/{max_retries} failed for snapshot {url}: {e}", exc_info=True)
             if attempt < max_retries:
-                time.sleep(5) 
+                # A crashed browser or closed context is restarted by session.new_page() on the next attempt
+                # Exponential backoff instead of a fixed pause between attempts
+                backoff = min(config.get('playwright_retry_backoff_seconds', 1) * (2 ** (attempt - 1)), 30)
+                time.sleep(backoff)
             else:
                 logger.error(f"All {max_retries} attempts failed for visual snapshot of {url}.")
-                return None
     return None
 
+def save_visual_snapshot(site_id: str, url: str, timestamp: datetime = None, is_baseline: bool = False, url_path: str = None,
+                         session: SiteCaptureSession | None = None, ignore_selectors: list[str] | None = None) -> str | None:
+    """
+    Saves a visual snapshot (screenshot) of a web page using Playwright.
+    Returns a web-friendly, relative path to the saved image file, including the 'data' directory.
+
+    If a SiteCaptureSession is given, the page is opened in the session's shared browser
+    context instead of launching a new browser for this capture. Elements matching
+    ignore_selectors (in addition to visual_comparison.ignore_selectors) are recorded next to
+    the screenshot and left out of later comparisons.
+    """
+    logger.info(f"Attempting to capture visual snapshot for site ID {site_id} ({url})")
+    image_path_abs = _get_visual_snapshot_path(site_id, url, timestamp, is_baseline, url_path)
+
+    def capture(page):
+        _capture_screenshot(page, url, image_path_abs, session=session, ignore_selectors=ignore_selectors)
+        return True
+
+    if not _run_with_page(site_id, url, capture, session=session):
+        return None
+
+    logger.info(f"Successfully saved visual snapshot for site ID {site_id} to: {image_path_abs}")
+    final_path = _to_project_relative_path(image_path_abs)
+    logger.info(f"Returning final relative snapshot path: {final_path}")
+    return final_path
+
+def _collect_navigation_timing(page) -> dict:
+    """Reads Navigation Timing and paint metrics (in milliseconds) from the loaded page."""
+    try:
+        return page.evaluate("""() => {
+            const nav = performance.getEntriesByType('navigation')[0];
+            const timing = {};
+            if (nav) {
+                timing.ttfb_ms = nav.responseStart - nav.requestStart;
+                timing.dom_content_loaded_ms = nav.domContentLoadedEventEnd - nav.startTime;
+                timing.load_ms = nav.loadEventEnd - nav.startTime;
+                timing.transfer_size = nav.transferSize;
+            }
+            for (const entry of performance.getEntriesByType('paint')) {
+                if (entry.name === 'first-contentful-paint') timing.first_contentful_paint_ms = entry.startTime;
+            }
+            const lcp = performance.getEntriesByType('largest-contentful-paint');
+            if (lcp.length) timing.largest_contentful_paint_ms = lcp[lcp.length - 1].startTime;
+            timing.resource_count = performance.getEntriesByType('resource').length;
+            return timing;
+        }""")
+    except Exception as e:
+        logger.warning(f"Could not collect navigation timing: {e}")
+        return {}
+
+def capture_page_artifacts(site_id: str, url: str, timestamp: datetime = None, is_baseline: bool = False, url_path: str = None,
+                           session: SiteCaptureSession | None = None, ignore_selectors: list[str] | None = None,
+                           capture_images: bool = True) -> dict | None:
+    """
+    Loads a page once in Playwright and collects everything the checks need from that single navigation.
+
+    Returns a dict with:
+        screenshot_path: relative path of the full-page screenshot (as save_visual_snapshot returns).
+        html_path, html_hash: the saved rendered DOM (see save_html_snapshot).
+        structure_fingerprint: SimHash of the DOM's tag structure, also stored next to html_path
+            (None when disabled or the DOM could not be saved).
+        images: list of {'image_url', 'content_type', 'body'} for every image response the page loaded
+            (empty when capture_images is False, e.g. because blur detection will not run).
+        navigation_timing: Navigation Timing / paint metrics measured during the load.
+    Returns None if the page could not be captured. ignore_selectors are handled as in save_visual_snapshot.
+    """
+    logger.info(f"Attempting single-navigation capture for site ID {site_id} ({url})")
+    if url_path is None:
+        url_path = get_url_path_slug(url)
+    image_path_abs = _get_visual_snapshot_path(site_id, url, timestamp, is_baseline, url_path)
+
+    def capture(page):
+        image_responses = []
+        if capture_images:
+            page.on('response', lambda response: image_responses.append(response)
+                    if response.request.resource_type == 'image' else None)
+
+        _capture_screenshot(page, url, image_path_abs, session=session, ignore_selectors=ignore_selectors)
+        html_content = page.content()
+        navigation_timing = _collect_navigation_timing(page)
+
+        images = []
+        seen_urls = set()
+        for response in image_responses:
+            if response.url in seen_urls or response.url.startswith('data:'):
+                continue
+            seen_urls.add(response.url)
+            try:
+                if not response.ok:
+                    continue
+                images.append({
+                    'image_url': response.url,
+                    'content_type': response.headers.get('content-type', ''),
+                    'body': response.body()
+                })
+            except Exception as e:
+                # Bodies of redirected or evicted responses are not available
+                logger.debug(f"Could not read image response body for {response.url}: {e}")
+        return html_content, navigation_timing, images
+
+    captured = _run_with_page(site_id, url, capture, session=session)
+    if captured is None:
+        return None
+
+    html_content, navigation_timing, images = captured
+    html_path, html_hash = save_html_snapshot(site_id, url, html_content, timestamp=timestamp,
+                                              is_baseline=is_baseline, url_path=url_path)
+    structure_fingerprint = None
+    if html_path and (config.get('structure_fingerprint', {}) or {}).get('enabled', True):
+        structure_fingerprint = write_structure_fingerprint(html_path, html_content)
+
+    logger.info(f"Captured {url} in one navigation: screenshot, DOM ({len(html_content)} chars), {len(images)} images")
+    return {
+        'screenshot_path': _to_project_relative_path(image_path_abs),
+        'html_path': html_path,
+        'html_hash': html_hash,
+        'structure_fingerprint': structure_fingerprint,
+        'images': images,
+        'navigation_timing': navigation_timing
+    }
+
 if __name__ == '__main__':
     logger.info("----- Snapshot Tool Demo (Playwright) -----")
 
@@ -0,0 +1,101 @@
+"""
+Structural fingerprints of HTML snapshots.
+
+Comparing page structure used to mean serializing both tag trees and diffing the text. Instead,
+every HTML snapshot now gets a 64-bit SimHash of its tag-path shingles when it is captured: each
+tag's root path (e.g. 'html>body>div#main>p') and each run of consecutive paths in document
+order. The fingerprint is stored in a JSON sidecar next to the snapshot and with the check.
+Similar trees give fingerprints a few bits apart, so a structure comparison starts with a Hamming
+distance. The detailed diff only runs when the fingerprints are further apart than
+structure_fingerprint.max_distance.
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+
+import numpy as np
+
+from src.logger_setup import setup_logging
+from src.parsed_page import ParsedPage, get_parsed_page
+from src.tile_hashing import hamming_distance
+
+logger = setup_logging()
+
+FINGERPRINT_BITS = 64
+FINGERPRINT_SIDECAR_SUFFIX = ".structure.json"
+# Fingerprints at most this many bits apart are treated as the same structure
+DEFAULT_MAX_DISTANCE = 3
+# Consecutive tag paths per order shingle
+_SHINGLE_SIZE = 3
+
+def _feature_hashes(features: Counter) -> tuple[np.ndarray, np.ndarray]:
+    """64-bit hashes of the features and their counts as weights."""
+    hashes = np.fromiter((int.from_bytes(hashlib.blake2b(feature.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'big')
+                          for feature in features), dtype=np.uint64, count=len(features))
+    weights = np.fromiter(features.values(), dtype=np.int64, count=len(features))
+    return hashes, weights
+
+def simhash(features: Counter) -> str:
+    """SimHash of weighted string features as a 16-digit hex string (the format of tile_hashing's dHashes)."""
+    if not features:
+        return '0' * (FINGERPRINT_BITS // 4)
+    hashes, weights = _feature_hashes(features)
+    # One row of bits per feature, most significant bit first
+    bits = np.unpackbits(hashes.astype('>u8').view(np.uint8).reshape(-1, 8), axis=1)
+    votes = ((bits.astype(np.int64) * 2 - 1) * weights[:, None]).sum(axis=0)
+    value = int(''.join('1' if vote > 0 else '0' for vote in votes), 2)
+    return f"{value:0{FINGERPRINT_BITS // 4}x}"
+
+def structure_features(html_content: str | ParsedPage) -> Counter:
+    """Tag paths and shingles of consecutive tag paths, with their counts."""
+    paths = get_parsed_page(html_content).tag_paths
+    features = Counter(paths)
+    features.update('|'.join(paths[i:i + _SHINGLE_SIZE]) for i in range(len(paths) - _SHINGLE_SIZE + 1))
+    return features
+
+def structure_fingerprint(html_content: str | ParsedPage) -> str:
+    """SimHash of the tag structure of an HTML document."""
+    return simhash(structure_features(html_content))
+
+def fingerprint_distance(fingerprint1: str, fingerprint2: str) -> int:
+    """Number of differing bits between two structure fingerprints."""
+    return hamming_distance(fingerprint1, fingerprint2)
+
+def get_fingerprint_sidecar_path(html_path: str) -> str:
+    """Returns the path of the fingerprint sidecar of an HTML snapshot, e.g. 'x_utc.html' -> 'x_utc.html.structure.json'."""
+    return f"{html_path}{FINGERPRINT_SIDECAR_SUFFIX}"
+
+def write_structure_fingerprint(html_path: str, html_content: str | ParsedPage | None = None) -> str | None:
+    """Computes the structure fingerprint of an HTML snapshot and stores it in its sidecar file."""
+    try:
+        if html_content is None:
+            with open(html_path, 'r', encoding='utf-8') as f:
+                html_content = f.read()
+        fingerprint = structure_fingerprint(html_content)
+        # Ties the sidecar to this exact file, like the tile hash sidecars
+        stat = os.stat(html_path)
+        with open(get_fingerprint_sidecar_path(html_path), 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': fingerprint, 'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}, f)
+        return fingerprint
+    except Exception as e:
+        logger.error(f"Could not compute structure fingerprint for {html_path}: {e}", exc_info=True)
+        return None
+
+def load_structure_fingerprint(html_path: str) -> str | None:
+    """Loads the structure fingerprint of an HTML snapshot, or None if there is no sidecar or it no longer matches the file."""
+    sidecar_path = get_fingerprint_sidecar_path(html_path)
+    if not os.path.exists(sidecar_path):
+        return None
+    try:
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        stat = os.stat(html_path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read structure fingerprint {sidecar_path}: {e}")
+        return None
+
+    if sidecar.get('source_size') != stat.st_size or sidecar.get('source_mtime_ns') != stat.st_mtime_ns:
+        logger.debug(f"Ignoring stale structure fingerprint for {html_path}")
+        return None
+    return sidecar.get('fingerprint')
@@ -0,0 +1,286 @@
+"""
+Line-based text diff for page text and structure comparisons.
+
+The HTML comparators used to run difflib.SequenceMatcher over the full page text character by
+character, which is quadratic and takes seconds to minutes on large pages. compare_texts
+instead maps every line to an integer id, trims the common head and tail, and runs Myers'
+O((N+M)D) diff over the remaining line ids. The similarity ratio is computed like
+SequenceMatcher.ratio() (2 * matched characters / total characters). Matched lines count in
+full, and small replaced blocks are matched character by character so that edited lines still
+count partially.
+
+The diff stops after a time budget or a maximum number of line edits. The untrimmed middle is
+then matched patience-style: lines that occur exactly once in both texts are anchored by a
+longest increasing subsequence and extended over equal neighbouring lines. That matching is a
+valid, if not minimal, diff, so the ratio computed from it is a lower bound; a rewritten or
+reordered page scores as the large change it is.
+"""
+import bisect
+import difflib
+import time
+from collections import Counter
+from collections.abc import Hashable, Sequence
+
+from src.logger_setup import setup_logging
+
+logger = setup_logging()
+
+DEFAULT_TIME_BUDGET_SECONDS = 2.0
+# Myers keeps one row of state per edit, so memory grows with the square of this
+DEFAULT_MAX_EDITS = 2000
+# Replaced blocks up to this many characters per side are matched character by character
+_INLINE_MATCH_MAX_CHARS = 1000
+# Edit steps between deadline checks
+_DEADLINE_CHECK_STEPS = 32
+
+def _line_ids(old_lines: list[str], new_lines: list[str]) -> tuple[list[int], list[int]]:
+    """Maps equal lines to equal integers, so the diff compares ints instead of strings."""
+    ids = {}
+    old_ids = [ids.setdefault(line, len(ids)) for line in old_lines]
+    new_ids = [ids.setdefault(line, len(ids)) for line in new_lines]
+    return old_ids, new_ids
+
+def _myers_matches(a: list[int], b: list[int], deadline: float | None, max_edits: int) -> list[tuple[int, int]] | None:
+    """
+    Matched (i, j) index pairs of a shortest edit script between a and b, in order, or None when
+    the edit distance exceeds max_edits or the deadline passes.
+    """
+    n, m = len(a), len(b)
+    max_d = min(n + m, max_edits)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []  # trace[d]: v for diagonals -d-1..d+1 before step d
+
+    for d in range(max_d + 1):
+        if deadline is not None and d % _DEADLINE_CHECK_STEPS == 0 and time.monotonic() > deadline:
+            return None
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]      # Insertion from b
+            else:
+                x = v[offset + k - 1] + 1  # Deletion from a
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+def _backtrack(trace: list[list[int]], n: int, m: int) -> list[tuple[int, int]]:
+    matches = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        # v covers diagonals -d-1..d+1
+        if k == -d or (k != d and v[k - 1 + d + 1] < v[k + 1 + d + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k + d + 1]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((x, y))
+        x, y = prev_x, prev_y
+    matches.reverse()
+    return matches
+
+def _longest_increasing_pairs(pairs: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Longest subsequence of (i, j) pairs, sorted by i, whose j values increase (patience sorting)."""
+    tails, tail_indexes = [], []
+    predecessors = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect.bisect_left(tails, j)
+        if pile:
+            predecessors[index] = tail_indexes[pile - 1]
+        if pile == len(tails):
+            tails.append(j)
+            tail_indexes.append(index)
+        else:
+            tails[pile] = j
+            tail_indexes[pile] = index
+
+    result = []
+    index = tail_indexes[-1] if tail_indexes else -1
+    while index >= 0:
+        result.append(pairs[index])
+        index = predecessors[index]
+    result.reverse()
+    return result
+
+def unique_matches(a: Sequence[Hashable], b: Sequence[Hashable]) -> list[tuple[int, int]]:
+    """
+    Matched (i, j) index pairs, in order, anchored on the items that occur once in a and once in b
+    and extended over equal items around each anchor (patience diff). Runs in O((N+M) log N).
+    """
+    count_a, count_b = Counter(a), Counter(b)
+    position_b = {line: j for j, line in enumerate(b) if count_b[line] == 1}
+    pairs = [(i, position_b[line]) for i, line in enumerate(a) if count_a[line] == 1 and line in position_b]
+    anchors = _longest_increasing_pairs(pairs)
+
+    matches = []
+    last_i = last_j = -1
+    for index, (i, j) in enumerate(anchors):
+        start = 0
+        while i - start - 1 > last_i and j - start - 1 > last_j and a[i - start - 1] == b[j - start - 1]:
+            start += 1
+        next_i, next_j = anchors[index + 1] if index + 1 < len(anchors) else (len(a), len(b))
+        end = 1
+        while i + end < next_i and j + end < next_j and a[i + end] == b[j + end]:
+            end += 1
+        matches += [(i + k, j + k) for k in range(-start, end)]
+        last_i, last_j = i + end - 1, j + end - 1
+    return matches
+
+def opcodes_from_matches(matches: list[tuple[int, int]], n: int, m: int) -> list[tuple[str, int, int, int, int]]:
+    """difflib-style opcodes from ordered matched index pairs."""
+    opcodes = []
+    i = j = 0
+    index = 0
+    while index <= len(matches):
+        if index < len(matches):
+            match_i, match_j = matches[index]
+        else:
+            match_i, match_j = n, m
+        if i < match_i and j < match_j:
+            opcodes.append(('replace', i, match_i, j, match_j))
+        elif i < match_i:
+            opcodes.append(('delete', i, match_i, j, j))
+        elif j < match_j:
+            opcodes.append(('insert', i, i, j, match_j))
+        if index == len(matches):
+            break
+        # Extend over the run of consecutive matches
+        size = 1
+        while (index + size < len(matches) and matches[index + size][0] == match_i + size and
+               matches[index + size][1] == match_j + size):
+            size += 1
+        opcodes.append(('equal', match_i, match_i + size, match_j, match_j + size))
+        i, j = match_i + size, match_j + size
+        index += size
+    return opcodes
+
+def diff_lines(old_lines: list[str], new_lines: list[str], time_budget: float | None = DEFAULT_TIME_BUDGET_SECONDS,
+               max_edits: int = DEFAULT_MAX_EDITS) -> tuple[list[tuple[str, int, int, int, int]], bool]:
+    """
+    Line opcodes (as difflib's get_opcodes()) between two lists of lines.
+
+    Returns:
+        tuple: (opcodes, exact). exact is False when the time budget or max_edits ran out; the
+        common head and tail are then still matched and the lines in between are matched on the
+        lines that occur once in both (see unique_matches).
+    """
+    n, m = len(old_lines), len(new_lines)
+    old_ids, new_ids = _line_ids(old_lines, new_lines)
+
+    head = 0
+    while head < n and head < m and old_ids[head] == new_ids[head]:
+        head += 1
+    tail = 0
+    while tail < n - head and tail < m - head and old_ids[n - 1 - tail] == new_ids[m - 1 - tail]:
+        tail += 1
+
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+    middle = _myers_matches(old_ids[head:n - tail], new_ids[head:m - tail], deadline, max_edits)
+    exact = middle is not None
+    if not exact:
+        logger.debug(f"Line diff of {n} and {m} lines exceeded its budget; matching the middle on unique lines")
+        middle = unique_matches(old_ids[head:n - tail], new_ids[head:m - tail])
+
+    matches = [(i, i) for i in range(head)]
+    matches += [(head + i, head + j) for i, j in middle]
+    matches += [(n - tail + i, m - tail + i) for i in range(tail)]
+    return opcodes_from_matches(matches, n, m), exact
+
+def _similarity(old_lines: list[str], new_lines: list[str], opcodes: list, exact: bool, total_chars: int) -> float:
+    """
+    2 * matched characters / total characters, like SequenceMatcher.ratio() on the joined texts.
+    For inexact opcodes only the matched lines count, which keeps the ratio a lower bound.
+    """
+    if total_chars == 0:
+        return 1.0
+
+    matched = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            matched += sum(len(line) + 1 for line in old_lines[i1:i2])
+        elif tag == 'replace' and exact:
+            old_chunk, new_chunk = '\n'.join(old_lines[i1:i2]), '\n'.join(new_lines[j1:j2])
+            if len(old_chunk) <= _INLINE_MATCH_MAX_CHARS and len(new_chunk) <= _INLINE_MATCH_MAX_CHARS:
+                matcher = difflib.SequenceMatcher(None, old_chunk, new_chunk)
+                matched += sum(block.size for block in matcher.get_matching_blocks())
+    return min(1.0, 2.0 * matched / total_chars)
+
+def _group_opcodes(opcodes: list, n: int = 3) -> list[list]:
+    """Hunks of changes with n lines of context, as difflib's get_grouped_opcodes()."""
+    codes = list(opcodes) or [('equal', 0, 1, 0, 1)]
+    if codes[0][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == 'equal':
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    groups, group = [], []
+    for tag, i1, i2, j1, j2 in codes:
+        # End the current hunk and start a new one at large unchanged ranges
+        if tag == 'equal' and i2 - i1 > n * 2:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            groups.append(group)
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == 'equal'):
+        groups.append(group)
+    return groups
+
+def _format_range(start: int, stop: int) -> str:
+    """Unified diff range, as difflib formats it."""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f'{beginning}'
+    if not length:
+        beginning -= 1
+    return f'{beginning},{length}'
+
+def unified_diff(old_lines: list[str], new_lines: list[str], opcodes: list, fromfile: str = '', tofile: str = '',
+                 n: int = 3) -> list[str]:
+    """Unified diff lines (as difflib.unified_diff with lineterm='') for precomputed opcodes."""
+    output = []
+    for group in _group_opcodes(opcodes, n):
+        if not output:
+            output += [f'--- {fromfile}', f'+++ {tofile}']
+        first, last = group[0], group[-1]
+        output.append(f'@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@')
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                output += [' ' + line for line in old_lines[i1:i2]]
+                continue
+            if tag in ('replace', 'delete'):
+                output += ['-' + line for line in old_lines[i1:i2]]
+            if tag in ('replace', 'insert'):
+                output += ['+' + line for line in new_lines[j1:j2]]
+    return output
+
+def compare_texts(old_text: str, new_text: str, fromfile: str = 'old_version', tofile: str = 'new_version',
+                  time_budget: float | None = DEFAULT_TIME_BUDGET_SECONDS,
+                  max_edits: int = DEFAULT_MAX_EDITS) -> tuple[float, list[str]]:
+    """
+    Compares two texts line by line.
+
+    Returns:
+        tuple[float, list[str]]:
+            - Similarity ratio (0.0 to 1.0), comparable to SequenceMatcher(None, old_text, new_text).ratio();
+              a lower bound when the diff ran out of budget.
+            - Unified diff lines.
+    """
+    old_lines, new_lines = old_text.splitlines(), new_text.splitlines()
+    opcodes, exact = diff_lines(old_lines, new_lines, time_budget=time_budget, max_edits=max_edits)
+    similarity = _similarity(old_lines, new_lines, opcodes, exact, len(old_text) + len(new_text))
+    return similarity, unified_diff(old_lines, new_lines, opcodes, fromfile, tofile)
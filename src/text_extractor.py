@@ -0,0 +1,228 @@
+"""
+Streaming text extraction from HTML.
+
+extract_text_from_html used to build a full BeautifulSoup tree before reading the text, so a
+multi-megabyte catalog page cost many times its size in memory. TextExtractor is an
+html.parser.HTMLParser subclass that reads the document in chunks. It skips script and style
+content and yields the same normalized phrases as ParsedPage.text (one stripped phrase per line,
+split at runs of two spaces). Memory stays bounded by the chunk size and the longest line.
+"""
+import html.entities
+import io
+from collections.abc import Iterable, Iterator
+from html.parser import HTMLParser
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# Elements whose content is not page text
+_NON_CONTENT_TAGS = ('script', 'style')
+# Elements inside which whitespace-only text is kept as is
+_PRESERVE_WHITESPACE_TAGS = ('pre', 'textarea')
+# Elements that never have content; the tree builder closes them at once
+_VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem',
+                        'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame',
+                        'image', 'isindex', 'nextid', 'spacer'))
+_ASCII_SPACES = ' \n\t\x0c\r'
+# A line without line breaks longer than this is flushed at its last double space
+_MAX_PENDING_CHARS = 1024 * 1024
+# Characters str.splitlines() breaks lines at
+_LINE_BREAKS = frozenset('\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029')
+
+class TextExtractor(HTMLParser):
+    """
+    Incremental text extractor.
+
+    Text nodes are built like BeautifulSoup's html.parser tree builder builds its strings, so the
+    result matches ParsedPage.text: character references are decoded the same way, text nodes
+    of only ASCII whitespace collapse to one space or newline outside <pre> and <textarea>, and
+    text whose parent element is a script or style is left out.
+
+    Usage:
+        extractor = TextExtractor()
+        for chunk in html_chunks:
+            phrases.extend(extractor.feed_chunk(chunk))
+        phrases.extend(extractor.finish())
+    """
+
+    def __init__(self):
+        # References are decoded in handle_charref/handle_entityref, as BeautifulSoup does
+        super().__init__(convert_charrefs=False)
+        self._open_tags = []
+        self._closed_void_tags = []
+        self._preserve_whitespace_depth = 0
+        self._node = []  # Whitespace-only start of the current text node
+        self._node_has_text = False
+        self._pending = []
+        self._pending_chars = 0
+        self._phrases = []
+
+    # --- Tree events ---
+
+    def handle_starttag(self, tag, attrs):
+        self._end_node()
+        if tag in _VOID_TAGS:
+            # Closed at once; a later end tag of that name is then ignored without ending the text
+            self._closed_void_tags.append(tag)
+            return
+        self._open_tags.append(tag)
+        if tag in _PRESERVE_WHITESPACE_TAGS:
+            self._preserve_whitespace_depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._end_node()
+        if tag in self._closed_void_tags:
+            self._closed_void_tags.remove(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_void_tags:
+            self._closed_void_tags.remove(tag)
+            return
+        self._end_node()
+        if tag not in self._open_tags:
+            return
+        # Closes the innermost open element of that name and everything inside it
+        while True:
+            closed = self._open_tags.pop()
+            if closed in _PRESERVE_WHITESPACE_TAGS:
+                self._preserve_whitespace_depth -= 1
+            if closed == tag:
+                break
+
+    def handle_data(self, data):
+        self._add_node_text(data)
+
+    def handle_charref(self, name):
+        code_point = int(name.lstrip('xX'), 16) if name[:1] in ('x', 'X') else int(name)
+        data = None
+        if code_point < 256:
+            # Numeric references into Windows-1252 (&#147;) are common
+            try:
+                data = bytes([code_point]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(code_point)
+            except (ValueError, OverflowError):
+                pass
+        self._add_node_text(data or '\N{REPLACEMENT CHARACTER}')
+
+    def handle_entityref(self, name):
+        character = html.entities.html5.get(f'{name};')
+        self._add_node_text(character if character is not None else f'&{name}')
+
+    def handle_comment(self, data):
+        self._end_node()
+
+    def handle_decl(self, decl):
+        self._end_node()
+
+    def handle_pi(self, data):
+        self._end_node()
+
+    def unknown_decl(self, data):
+        self._end_node()
+        # CDATA sections are text, as BeautifulSoup's CData strings
+        if data.upper().startswith('CDATA['):
+            self._add_node_text(data[len('CDATA['):])
+            self._end_node()
+
+    def _add_node_text(self, data):
+        """Adds a piece of the current text node unless its parent is a script or style."""
+        if self._open_tags and self._open_tags[-1] in _NON_CONTENT_TAGS:
+            return
+        if self._node_has_text or self._preserve_whitespace_depth or data.strip(_ASCII_SPACES):
+            # The node will not be collapsed, so it need not be held until it ends
+            self._node_has_text = True
+            self._node.append(data)
+            self._add_text(''.join(self._node))
+            self._node = []
+        else:
+            self._node.append(data)
+
+    def _end_node(self):
+        """Ends the current text node; a node of only ASCII whitespace becomes one space or newline."""
+        if self._node:
+            self._add_text('\n' if '\n' in ''.join(self._node) else ' ')
+            self._node = []
+        self._node_has_text = False
+
+    # --- Text normalization ---
+
+    def _add_text(self, text):
+        self._pending.append(text)
+        self._pending_chars += len(text)
+        if not _LINE_BREAKS.isdisjoint(text):
+            self._emit_complete_lines()
+        elif self._pending_chars > _MAX_PENDING_CHARS:
+            self._emit_complete_lines(force=True)
+
+    def _emit_complete_lines(self, force=False):
+        lines = ''.join(self._pending).splitlines(keepends=True)
+        rest = ''
+        if lines and lines[-1].splitlines()[0] == lines[-1]:
+            rest = lines.pop()  # Not terminated yet
+        if force and rest and '  ' in rest:
+            # Phrases end at double spaces anyway, so the line can be split there
+            cut = rest.rindex('  ')
+            lines.append(rest[:cut])
+            rest = rest[cut:]
+        for line in lines:
+            self._add_line(line)
+        self._pending = [rest] if rest else []
+        self._pending_chars = len(rest)
+
+    def _add_line(self, line):
+        for phrase in line.strip().split('  '):
+            phrase = phrase.strip()
+            if phrase:
+                self._phrases.append(phrase)
+
+    def _take_phrases(self) -> list[str]:
+        phrases, self._phrases = self._phrases, []
+        return phrases
+
+    def feed_chunk(self, chunk: str) -> list[str]:
+        """Parses the next piece of the document; returns the phrases it completed."""
+        self.feed(chunk)
+        return self._take_phrases()
+
+    def finish(self) -> list[str]:
+        """Flushes the parser and the last line; returns the remaining phrases."""
+        self.close()
+        self._end_node()
+        for line in ''.join(self._pending).splitlines() or ['']:
+            self._add_line(line)
+        self._pending, self._pending_chars = [], 0
+        return self._take_phrases()
+
+def _iter_chunks(html_source: str | io.TextIOBase | Iterable[str], chunk_size: int) -> Iterator[str]:
+    if isinstance(html_source, str):
+        for start in range(0, len(html_source), chunk_size):
+            yield html_source[start:start + chunk_size]
+    elif hasattr(html_source, 'read'):
+        while chunk := html_source.read(chunk_size):
+            yield chunk
+    else:
+        yield from html_source
+
+def iter_text_chunks(html_source: str | io.TextIOBase | Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yields the normalized text phrases of an HTML document, reading it chunk by chunk.
+
+    Args:
+        html_source: The HTML as a string, an open text file or an iterable of string chunks.
+        chunk_size (int): Characters parsed at a time when reading strings and files.
+    """
+    extractor = TextExtractor()
+    for chunk in _iter_chunks(html_source, chunk_size):
+        yield from extractor.feed_chunk(chunk)
+    yield from extractor.finish()
+
+def extract_text(html_source: str | io.TextIOBase | Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """The text of an HTML document as ParsedPage.text returns it, without building a tree."""
+    return '\n'.join(iter_text_chunks(html_source, chunk_size))
+
+def extract_text_from_file(html_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """The text of a saved HTML snapshot, read from disk chunk by chunk."""
+    with open(html_path, 'r', encoding='utf-8', errors='replace') as f:
+        return extract_text(f, chunk_size)
@@ -0,0 +1,143 @@
+"""
+Per-tile content hashes for snapshots.
+
+At capture time every snapshot is cut into fixed-size tiles and each tile gets an exact hash
+(BLAKE2b of its pixels) and a perceptual difference hash (dHash). The hashes are stored in a
+JSON sidecar next to the snapshot. Comparing two snapshots then starts by comparing the tile
+hashes: identical pages finish without decoding either image, and the pixel diff only runs
+on the tiles whose hashes differ.
+"""
+import hashlib
+import json
+import os
+
+from PIL import Image
+
+from src.logger_setup import setup_logging
+from src.tiled_screenshot import SnapshotReader
+
+logger = setup_logging()
+
+TILE_HASH_VERSION = 1
+DEFAULT_TILE_SIZE = 256
+HASH_SIDECAR_SUFFIX = ".hashes.json"
+
+def get_hash_sidecar_path(image_path: str) -> str:
+    """Returns the path of the tile hash sidecar of a snapshot, e.g. 'x_utc.png' -> 'x_utc.png.hashes.json'."""
+    return f"{image_path}{HASH_SIDECAR_SUFFIX}"
+
+def exact_hash(tile: Image.Image) -> str:
+    """Hash of the tile's raw RGB pixels; equal hashes mean identical pixels."""
+    return hashlib.blake2b(tile.tobytes(), digest_size=16).hexdigest()
+
+def difference_hash(tile: Image.Image, hash_size: int = 8) -> str:
+    """64-bit perceptual dHash: compares horizontally adjacent pixels of a downscaled grayscale tile."""
+    small = tile.convert('L').resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+def hamming_distance(hash1: str, hash2: str) -> int:
+    """Number of differing bits between two hex hashes."""
+    return bin(int(hash1, 16) ^ int(hash2, 16)).count('1')
+
+def compute_tile_hashes(image_path: str, tile_size: int = DEFAULT_TILE_SIZE) -> dict:
+    """
+    Computes exact and perceptual hashes for every tile of a snapshot, reading it one row of
+    tiles at a time (tiled snapshots are never fully decoded).
+
+    Returns:
+        dict: {'width', 'height', 'tile_size', 'rows', 'columns', 'exact': [[...]], 'perceptual': [[...]]}
+    """
+    reader = SnapshotReader(image_path)
+    try:
+        exact_rows, perceptual_rows = [], []
+        for y in range(0, reader.height, tile_size):
+            band = reader.read_band(y, min(tile_size, reader.height - y))
+            exact_row, perceptual_row = [], []
+            for x in range(0, reader.width, tile_size):
+                tile = band.crop((x, 0, min(x + tile_size, reader.width), band.height))
+                exact_row.append(exact_hash(tile))
+                perceptual_row.append(difference_hash(tile))
+            exact_rows.append(exact_row)
+            perceptual_rows.append(perceptual_row)
+    finally:
+        reader.close()
+
+    return {
+        'version': TILE_HASH_VERSION,
+        'width': reader.width,
+        'height': reader.height,
+        'tile_size': tile_size,
+        'rows': len(exact_rows),
+        'columns': len(exact_rows[0]) if exact_rows else 0,
+        'exact': exact_rows,
+        'perceptual': perceptual_rows
+    }
+
+def write_tile_hashes(image_path: str, tile_size: int = DEFAULT_TILE_SIZE) -> dict | None:
+    """Computes the tile hashes of a snapshot and stores them in its sidecar file."""
+    try:
+        hashes = compute_tile_hashes(image_path, tile_size)
+        # Ties the sidecar to this exact file, so a snapshot rewritten later is never matched against stale hashes
+        stat = os.stat(image_path)
+        hashes['source_size'] = stat.st_size
+        hashes['source_mtime_ns'] = stat.st_mtime_ns
+        with open(get_hash_sidecar_path(image_path), 'w', encoding='utf-8') as f:
+            json.dump(hashes, f)
+        return hashes
+    except Exception as e:
+        logger.error(f"Could not compute tile hashes for {image_path}: {e}", exc_info=True)
+        return None
+
+def load_tile_hashes(image_path: str) -> dict | None:
+    """Loads the tile hashes of a snapshot, or None if there is no sidecar or it no longer matches the file."""
+    sidecar_path = get_hash_sidecar_path(image_path)
+    if not os.path.exists(sidecar_path):
+        return None
+    try:
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            hashes = json.load(f)
+        stat = os.stat(image_path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read tile hashes {sidecar_path}: {e}")
+        return None
+
+    if (hashes.get('version') != TILE_HASH_VERSION or hashes.get('source_size') != stat.st_size or
+            hashes.get('source_mtime_ns') != stat.st_mtime_ns):
+        logger.debug(f"Ignoring stale tile hashes for {image_path}")
+        return None
+    return hashes
+
+def remove_tile_hashes(image_path: str):
+    """Deletes the tile hash sidecar of a snapshot, if any."""
+    sidecar_path = get_hash_sidecar_path(image_path)
+    if os.path.exists(sidecar_path):
+        os.remove(sidecar_path)
+
+def find_changed_tiles(hashes1: dict, hashes2: dict, perceptual_threshold: int | None = None) -> list[tuple[int, int]] | None:
+    """
+    Returns the (row, column) of every tile whose exact hash differs, or None when the two hash
+    sets cannot be compared (different size or tile size).
+
+    With a perceptual_threshold, tiles whose dHashes are within that many bits are treated as
+    unchanged, which skips rendering noise such as anti-aliasing differences.
+    """
+    if (hashes1['width'], hashes1['height'], hashes1['tile_size']) != (hashes2['width'], hashes2['height'], hashes2['tile_size']):
+        return None
+
+    changed = []
+    for row, (exact_row1, exact_row2) in enumerate(zip(hashes1['exact'], hashes2['exact'])):
+        for column, (hash1, hash2) in enumerate(zip(exact_row1, exact_row2)):
+            if hash1 == hash2:
+                continue
+            if perceptual_threshold is not None and hamming_distance(
+                    hashes1['perceptual'][row][column], hashes2['perceptual'][row][column]) <= perceptual_threshold:
+                continue
+            changed.append((row, column))
+    return changed
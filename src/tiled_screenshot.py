@@ -0,0 +1,149 @@
+"""
+Helpers for tiled snapshots of very tall pages.
+
+In tiled capture mode a page is saved as fixed-height tiles in a directory next to the
+snapshot path, described by a manifest.json. The snapshot path itself holds a small preview
+assembled tile by tile. SnapshotReader reads any horizontal band of a snapshot, whether it was
+saved whole or as tiles, so comparison and diff code can walk a page band by band and only
+ever hold one band of each image in memory.
+"""
+import json
+import math
+import os
+import shutil
+
+from PIL import Image
+
+from src.logger_setup import setup_logging
+
+logger = setup_logging()
+
+TILE_MANIFEST_NAME = "manifest.json"
+TILE_MANIFEST_VERSION = 1
+
+def get_tiles_directory(image_path: str) -> str:
+    """Returns the tile directory that belongs to a snapshot path, e.g. 'visual/x_utc.png' -> 'visual/x_utc_tiles'."""
+    return f"{os.path.splitext(image_path)[0]}_tiles"
+
+def load_tile_manifest(image_path: str) -> dict | None:
+    """Loads the tile manifest of a snapshot, or returns None if the snapshot was not captured in tiles."""
+    manifest_path = os.path.join(get_tiles_directory(image_path), TILE_MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read tile manifest {manifest_path}: {e}")
+        return None
+
+def is_tiled_snapshot(image_path: str) -> bool:
+    """Returns True if the snapshot was captured in tiles."""
+    return os.path.exists(os.path.join(get_tiles_directory(image_path), TILE_MANIFEST_NAME))
+
+def write_tile_manifest(image_path: str, width: int, height: int, page_height: int, tile_height: int,
+                        tiles: list[dict], image_format: str) -> dict:
+    """
+    Writes the manifest for a tiled snapshot.
+
+    Args:
+        width, height: Size of the captured area; height is capped at the maximum page height.
+        page_height: Full document height reported by the browser.
+        tiles: One {'file', 'y', 'height'} entry per tile, top to bottom.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    manifest = {
+        'version': TILE_MANIFEST_VERSION,
+        'width': width,
+        'height': height,
+        'page_height': page_height,
+        'truncated': page_height > height,
+        'tile_height': tile_height,
+        'format': image_format,
+        'tiles': tiles
+    }
+    manifest_path = os.path.join(get_tiles_directory(image_path), TILE_MANIFEST_NAME)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def remove_tiles(image_path: str):
+    """Deletes the tile directory of a snapshot path, e.g. before a baseline is recaptured."""
+    tiles_dir = get_tiles_directory(image_path)
+    if os.path.isdir(tiles_dir):
+        shutil.rmtree(tiles_dir, ignore_errors=True)
+
+def create_preview_from_tiles(image_path: str, manifest: dict, preview_width: int = 480) -> str:
+    """Builds a downscaled preview of a tiled snapshot at image_path, one tile at a time."""
+    scale = min(1.0, preview_width / manifest['width'])
+    preview_size = (max(1, round(manifest['width'] * scale)), max(1, math.ceil(manifest['height'] * scale)))
+    preview = Image.new('RGB', preview_size, (255, 255, 255))
+
+    tiles_dir = get_tiles_directory(image_path)
+    for tile in manifest['tiles']:
+        with Image.open(os.path.join(tiles_dir, tile['file'])) as tile_img:
+            scaled_height = max(1, round(tile['height'] * scale))
+            scaled = tile_img.convert('RGB').resize((preview_size[0], scaled_height), Image.LANCZOS)
+        preview.paste(scaled, (0, round(tile['y'] * scale)))
+
+    preview.save(image_path)
+    return image_path
+
+class SnapshotReader:
+    """
+    Reads horizontal bands of a snapshot, whether it was saved as one image or as tiles.
+
+    For tiled snapshots only the tiles overlapping the requested band are decoded. Whole
+    images are decoded once on first use.
+    """
+
+    def __init__(self, image_path: str):
+        self.image_path = image_path
+        self.manifest = load_tile_manifest(image_path)
+        self._image = None
+        if self.manifest:
+            self.width = self.manifest['width']
+            self.height = self.manifest['height']
+            self.tile_height = self.manifest['tile_height']
+        else:
+            with Image.open(image_path) as img:
+                self.width, self.height = img.size
+            self.tile_height = None
+
+    @property
+    def is_tiled(self) -> bool:
+        return self.manifest is not None
+
+    def read_band(self, y: int, height: int, width: int | None = None) -> Image.Image:
+        """
+        Returns rows [y, y + height) as an RGB image of the given width.
+        Areas outside the snapshot are white, matching how whole-image comparison pads size differences.
+        """
+        width = width or self.width
+        band = Image.new('RGB', (width, height), (255, 255, 255))
+
+        if not self.is_tiled:
+            if self._image is None:
+                self._image = Image.open(self.image_path).convert('RGB')
+            if y < self.height:
+                band.paste(self._image.crop((0, y, min(width, self.width), min(y + height, self.height))), (0, 0))
+            return band
+
+        tiles_dir = get_tiles_directory(self.image_path)
+        for tile in self.manifest['tiles']:
+            tile_top, tile_bottom = tile['y'], tile['y'] + tile['height']
+            if tile_bottom <= y or tile_top >= y + height:
+                continue
+            with Image.open(os.path.join(tiles_dir, tile['file'])) as tile_img:
+                top = max(y, tile_top) - tile_top
+                bottom = min(y + height, tile_bottom) - tile_top
+                rows = tile_img.convert('RGB').crop((0, top, min(width, tile_img.width), bottom))
+            band.paste(rows, (0, tile_top + top - y))
+        return band
+
+    def close(self):
+        if self._image is not None:
+            self._image.close()
+            self._image = None
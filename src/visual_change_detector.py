@@ -2,12 +2,13 @@ from PIL import Image, ImageChops, ImageDraw, ImageFont
 import os
 from datetime import datetime
 from src.logger_setup import setup_logging
+from src.visual_diff import compare_image_files
 
 logger = setup_logging()
 
 def get_change_region_with_labels(base_path, latest_path, output_path=None):
     """
-    Analyze two images to detect changes, crop to the changed region, and create a before/after comparison image.
+    Analyze two images to detect changes, crop to each changed region, and create a before/after comparison image.
     
     Args:
         base_path (str): Path to the baseline/before image
@@ -28,82 +29,29 @@ def get_change_region_with_labels(base_path, latest_path, output_path=None):
             logger.error(f"Latest image not found: {latest_path}")
             return None, None
             
-        # Open and convert images to RGB
-        base = Image.open(base_path).convert('RGB')
-        latest = Image.open(latest_path).convert('RGB')
-        
-        # Calculate pixel difference
-        diff = ImageChops.difference(base, latest)
-        
-        # Convert to grayscale and threshold
-        diff_gray = diff.convert('L')
-        diff_thresh = diff_gray.point(lambda p: 255 if p > 30 else 0)
-        
-        # Get bounding box of changes
-        bbox = diff_thresh.getbbox()
-        
-        if not bbox:
-            logger.info("No changes detected between the images")
-            return None, None
-            
         # Generate an output path if none provided
         if output_path is None:
             # Get directory from latest image
             output_dir = os.path.dirname(latest_path)
-            # Create 'diffs' subdirectory if it doesn't exist
             diff_dir = os.path.join(output_dir, "diffs")
-            os.makedirs(diff_dir, exist_ok=True)
-            
+
             # Create filename based on timestamp
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             base_filename = os.path.basename(base_path)
             name_without_ext = os.path.splitext(base_filename)[0]
             output_path = os.path.join(diff_dir, f"{name_without_ext}_change_{timestamp}.png")
-        
-        # Crop changed regions from both images
-        base_region = base.crop(bbox)
-        latest_region = latest.crop(bbox)
-        
-        # Dimensions for combined image
-        width, height = base_region.size
-        label_height = 40  # Height for label area above images
-        combined = Image.new('RGB', (width * 2, height + label_height), 'white')
-        
-        # Paste base and latest cropped images below the label area
-        combined.paste(base_region, (0, label_height))
-        combined.paste(latest_region, (width, label_height))
-        
-        # Draw elements
-        draw = ImageDraw.Draw(combined)
-        
-        # Draw vertical divider line between before and after images
-        draw.line((width, label_height, width, height + label_height), fill='gray', width=1)
-        
-        # Draw white horizontal line above images (separator)
-        draw.line((0, label_height, width * 2, label_height), fill='white', width=2)
-        
-        # Load a bold font, fallback to default if not found
-        try:
-            font = ImageFont.truetype("arialbd.ttf", 24)  # Arial Bold
-        except IOError:
-            try:
-                font = ImageFont.truetype("arial.ttf", 24)  # Regular Arial as fallback
-            except IOError:
-                font = ImageFont.load_default()
-        
-        # Calculate text positions (centered above each image)
-        before_text_pos = (width // 4 - 30, 5)
-        after_text_pos = (width + width // 4 - 20, 5)
-        
-        # Draw bold text labels
-        draw.text(before_text_pos, "BEFORE", fill="black", font=font)
-        draw.text(after_text_pos, "AFTER", fill="black", font=font)
-        
-        # Save combined image
-        combined.save(output_path)
+
+        # One decode of each image gives the changed regions and their before/after crops
+        comparison = compare_image_files(base_path, latest_path, report_path=output_path)
+        bbox = comparison['bbox']
+
+        if not comparison['diff_image_path']:
+            logger.info("No changes detected between the images")
+            return None, None
+
         logger.info(f"Before/After comparison saved to: {output_path}")
-        logger.info(f"Changed region coordinates: {bbox}")
-        
+        logger.info(f"Changed region coordinates: {bbox} ({len(comparison['regions'])} separate regions)")
+
         # Get path relative to the data directory for web UI display
         try:
             # Try to make the path relative to data directory
@@ -0,0 +1,553 @@
+"""
+Single-pass visual comparison engine.
+
+A visual check used to decode the same two screenshots several times: once for the diff
+percentage, again for the before/after report and once more for SSIM. compare_image_files
+decodes each image once into a NumPy array and derives everything from those two arrays with
+vectorized operations: the changed-value percentage, the thresholded change mask, the bounding
+box of the change, the optional SSIM score and the before/after report.
+"""
+import math
+import os
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from src.ignore_masks import get_ignore_mask
+from src.logger_setup import setup_logging
+from src.screenshot_alignment import align_screenshots
+
+# SSIM and OpenCV are optional, as in comparators
+try:
+    from skimage.metrics import structural_similarity
+    SSIM_AVAILABLE = True
+except ImportError:
+    structural_similarity = None
+    SSIM_AVAILABLE = False
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+logger = setup_logging()
+
+# Grayscale difference above which a pixel counts as changed in the mask and the report
+DEFAULT_DIFF_THRESHOLD = 30
+# Rows converted to grayscale per step, which bounds the temporary arrays on very tall pages
+_GRAYSCALE_CHUNK_ROWS = 1024
+# SSIM needs at least one 7x7 window
+_SSIM_MIN_DIMENSION = 7
+# Pyramid mode: edge length of the coarse blocks, the mean channel difference from which a block
+# is counted as fully changed without refinement, and the largest overestimate allowed (percentage points)
+DEFAULT_PYRAMID_BLOCK_SIZE = 8
+DEFAULT_PYRAMID_SATURATION = 48
+DEFAULT_PYRAMID_MAX_ERROR_PERCENT = 1.0
+# Blocks refined per vectorized step
+_PYRAMID_REFINE_CHUNK = 16384
+# Changes closer than this many pixels are reported as one region; at most this many regions are reported
+DEFAULT_REGION_MERGE_DISTANCE = 24
+DEFAULT_MAX_REGIONS = 8
+
+def load_image_array(image_path: str) -> np.ndarray:
+    """Decodes an image once into an RGB uint8 array of shape (height, width, 3)."""
+    with Image.open(image_path) as img:
+        return np.asarray(img.convert('RGB'))
+
+def apply_ignore_regions(array: np.ndarray, regions: list[list[int]] | None) -> np.ndarray:
+    """
+    Blacks out [x, y, width, height] regions of an image array.
+
+    Matches comparators._apply_ignore_regions, whose PIL rectangles include their right and bottom
+    edges. The comparison itself applies the ignore mask to the difference instead (see
+    diff_arrays); this is for callers that need the painted image. The input array is never
+    modified; a copy is made only when a region applies.
+    """
+    ignore_mask = get_ignore_mask(regions, array.shape[0], array.shape[1])
+    if ignore_mask is None:
+        return array
+    masked = array.copy()
+    masked[ignore_mask] = 0
+    return masked
+
+def pad_to_size(array: np.ndarray, height: int, width: int) -> np.ndarray:
+    """Pads an image array with white up to the given size, as the comparison does for size changes."""
+    if array.shape[0] == height and array.shape[1] == width:
+        return array
+    padded = np.full((height, width, 3), 255, dtype=np.uint8)
+    padded[:array.shape[0], :array.shape[1]] = array
+    return padded
+
+def to_grayscale(array: np.ndarray) -> np.ndarray:
+    """Converts an RGB array to 8-bit grayscale with the same integer weights as PIL's convert('L')."""
+    gray = np.empty(array.shape[:2], dtype=np.uint8)
+    for start in range(0, array.shape[0], _GRAYSCALE_CHUNK_ROWS):
+        chunk = array[start:start + _GRAYSCALE_CHUNK_ROWS].astype(np.uint32)
+        gray[start:start + _GRAYSCALE_CHUNK_ROWS] = (
+            chunk[..., 0] * 19595 + chunk[..., 1] * 38470 + chunk[..., 2] * 7471 + 0x8000) >> 16
+    return gray
+
+def _masked_grayscale(array: np.ndarray, ignore_mask: np.ndarray | None) -> np.ndarray:
+    """Grayscale of an image array with the ignored pixels black, as if they had been painted over."""
+    gray = to_grayscale(array)
+    if ignore_mask is not None:
+        gray[ignore_mask] = 0
+    return gray
+
+def mask_bounding_box(mask: np.ndarray) -> tuple[int, int, int, int] | None:
+    """Returns the (left, top, right, bottom) box of the True pixels of a mask, like PIL's getbbox()."""
+    rows = np.flatnonzero(mask.any(axis=1))
+    if rows.size == 0:
+        return None
+    columns = np.flatnonzero(mask.any(axis=0))
+    return int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1
+
+def diff_arrays(base: np.ndarray, latest: np.ndarray, threshold: int = DEFAULT_DIFF_THRESHOLD,
+                compute_ssim: bool = False, ignore_mask: np.ndarray | None = None) -> dict:
+    """
+    Compares two RGB arrays of the same size.
+
+    Pixels set in ignore_mask (see ignore_masks.get_ignore_mask) count as unchanged, exactly as if
+    they had been blacked out in both images, but neither image is copied.
+
+    Returns:
+        dict: {
+            'percent': share of channel values that differ at all (0-100),
+            'changed_values': number of differing channel values,
+            'mask': boolean (height, width) array of pixels whose grayscale difference exceeds threshold,
+            'mask_scale': pixels per mask cell (1 here),
+            'bbox': (left, top, right, bottom) of the mask, or None,
+            'ssim': SSIM of the two grayscale images when requested and available, else None
+        }
+    """
+    # |a - b| without widening to a larger dtype
+    diff = np.maximum(base, latest)
+    diff -= np.minimum(base, latest)
+    if ignore_mask is not None:
+        diff[ignore_mask] = 0
+
+    changed_values = int(np.count_nonzero(diff))
+    percent = (changed_values / diff.size) * 100 if diff.size > 0 else 0
+    mask = to_grayscale(diff) > threshold if changed_values else np.zeros(diff.shape[:2], dtype=bool)
+    del diff
+
+    ssim_score = None
+    if compute_ssim:
+        if not changed_values:
+            ssim_score = 1.0
+        elif not SSIM_AVAILABLE:
+            logger.warning("scikit-image not available. Cannot compute SSIM.")
+        elif min(base.shape[:2]) < _SSIM_MIN_DIMENSION:
+            logger.warning(f"Images are too small for SSIM calculation (min dimension {_SSIM_MIN_DIMENSION}).")
+        else:
+            ssim_score = float(structural_similarity(_masked_grayscale(base, ignore_mask),
+                                                     _masked_grayscale(latest, ignore_mask), data_range=255))
+
+    return {
+        'percent': percent,
+        'changed_values': changed_values,
+        'mask': mask,
+        'mask_scale': 1,
+        'bbox': mask_bounding_box(mask),
+        'ssim': ssim_score
+    }
+
+def _scale_bbox(bbox: tuple | None, scale: int, width: int, height: int) -> tuple | None:
+    """Converts a bbox in mask cells of scale x scale pixels to pixels, clipped to the image."""
+    if bbox is None or scale == 1:
+        return bbox
+    left, top, right, bottom = bbox
+    return left * scale, top * scale, min(right * scale, width), min(bottom * scale, height)
+
+def _block_view(array: np.ndarray, block_size: int) -> np.ndarray:
+    """(rows, columns, block_size, block_size, 3) view of the whole blocks of an array, without copying."""
+    rows, columns = array.shape[0] // block_size, array.shape[1] // block_size
+    s0, s1, s2 = array.strides
+    return np.lib.stride_tricks.as_strided(
+        array, shape=(rows, columns, block_size, block_size, 3),
+        strides=(s0 * block_size, s1 * block_size, s0, s1, s2), writeable=False)
+
+def _changed_block_map(base: np.ndarray, latest: np.ndarray, block_size: int) -> np.ndarray:
+    """
+    Exact map of the whole blocks that contain any changed byte, shape (rows, columns).
+
+    Rows are compared as machine words rather than bytes, which is several times cheaper than
+    computing the difference image.
+    """
+    height, width = base.shape[:2]
+    block_rows, block_columns = height // block_size, width // block_size
+    # Widest word that splits both an image row and a block row evenly
+    word_size = math.gcd(math.gcd(width * 3, block_size * 3), 8)
+    word_type = np.dtype(f'u{word_size}')
+    base_words = np.ascontiguousarray(base).reshape(height, -1).view(word_type)
+    latest_words = np.ascontiguousarray(latest).reshape(height, -1).view(word_type)
+
+    words_per_block = block_size * 3 // word_size
+    changed = base_words[:block_rows * block_size] != latest_words[:block_rows * block_size]
+    changed = changed[:, :block_columns * words_per_block].reshape(block_rows * block_size, block_columns, words_per_block)
+    return changed.any(axis=2).reshape(block_rows, block_size, block_columns).any(axis=1)
+
+def _block_means(array: np.ndarray, block_size: int) -> np.ndarray:
+    """Downscaled image whose pixels are the rounded means of the whole blocks, shape (rows, columns, 3)."""
+    rows, columns = array.shape[0] // block_size, array.shape[1] // block_size
+    core = array[:rows * block_size, :columns * block_size]
+    if cv2 is not None:
+        return cv2.resize(np.ascontiguousarray(core), (columns, rows), interpolation=cv2.INTER_AREA)
+    return np.asarray(Image.fromarray(np.ascontiguousarray(core)).reduce(block_size))
+
+def _diff_region(base: np.ndarray, latest: np.ndarray, threshold: int,
+                 ignore_mask: np.ndarray | None = None) -> tuple[int, np.ndarray | None]:
+    """Changed channel values and threshold mask (None if unchanged) of two equally sized arrays."""
+    if base.size == 0:
+        return 0, None
+    diff = np.maximum(base, latest)
+    diff -= np.minimum(base, latest)
+    if ignore_mask is not None:
+        diff[ignore_mask] = 0
+    changed = int(np.count_nonzero(diff))
+    return changed, (to_grayscale(diff) > threshold if changed else None)
+
+def _reduce_mask(mask: np.ndarray, cell_size: int) -> np.ndarray:
+    """Marks every cell_size x cell_size cell of a mask that contains a True pixel; partial cells included."""
+    if cell_size == 1:
+        return mask
+    rows, columns = -(-mask.shape[0] // cell_size), -(-mask.shape[1] // cell_size)
+    padded = np.zeros((rows * cell_size, columns * cell_size), dtype=bool)
+    padded[:mask.shape[0], :mask.shape[1]] = mask
+    return padded.reshape(rows, cell_size, columns, cell_size).any(axis=(1, 3))
+
+def diff_arrays_pyramid(base: np.ndarray, latest: np.ndarray, threshold: int = DEFAULT_DIFF_THRESHOLD,
+                        compute_ssim: bool = False, block_size: int = DEFAULT_PYRAMID_BLOCK_SIZE,
+                        saturation: int = DEFAULT_PYRAMID_SATURATION,
+                        max_error_percent: float = DEFAULT_PYRAMID_MAX_ERROR_PERCENT,
+                        decision_threshold: float | None = None, ignore_mask: np.ndarray | None = None) -> dict:
+    """
+    Coarse-to-fine variant of diff_arrays.
+
+    1. An exact word-wise comparison finds the block_size x block_size blocks that changed at all;
+       every other block is skipped.
+    2. Changed blocks are compared on downscaled images (block means). Blocks whose mean channel
+       difference reaches `saturation` are counted as fully changed without looking closer.
+    3. The remaining, ambiguous blocks and the partial blocks along the right and bottom edges are
+       diffed at full resolution.
+
+    Blocks entirely inside ignore_mask are skipped; blocks partly inside it are always refined,
+    since their block means include ignored pixels.
+
+    Tolerance: a saturated block changes at least (|mean difference| - 1) * block_size^2 / 255
+    values per channel (the 1 covers rounding of the means), so the exact percentage lies between
+    percent - 'percent_error' and the returned 'percent'. If that gap would exceed
+    max_error_percent, or would leave the comparison with decision_threshold (the alert threshold,
+    compared with '>') undecided, the saturated blocks are refined too and the result is exact.
+
+    Returns:
+        dict: Like diff_arrays, plus 'percent_error'. 'mask' has one cell per block (including the
+        partial edge blocks), 'mask_scale' is the block size and 'bbox' is accurate to one block.
+    """
+    height, width = base.shape[:2]
+    total_values = base.size
+    block_rows, block_columns = height // block_size, width // block_size
+    core_height, core_width = block_rows * block_size, block_columns * block_size
+
+    changed_values = 0
+    block_mask = np.zeros((-(-height // block_size), -(-width // block_size)), dtype=bool)
+
+    # Partial blocks along the right and bottom edges are always compared exactly
+    for rows, columns in ((slice(core_height, height), slice(0, width)), (slice(0, core_height), slice(core_width, width))):
+        edge_changed, edge_mask = _diff_region(base[rows, columns], latest[rows, columns], threshold,
+                                               ignore_mask[rows, columns] if ignore_mask is not None else None)
+        changed_values += edge_changed
+        if edge_mask is not None:
+            edge_cells = _reduce_mask(edge_mask, block_size)
+            top, left = rows.start // block_size, columns.start // block_size
+            block_mask[top:top + edge_cells.shape[0], left:left + edge_cells.shape[1]] |= edge_cells
+
+    ignore_blocks = None
+    if ignore_mask is not None and block_rows and block_columns:
+        ignore_blocks = ignore_mask[:core_height, :core_width].reshape(block_rows, block_size, block_columns, block_size)
+        ignore_blocks = np.ascontiguousarray(ignore_blocks.transpose(0, 2, 1, 3))
+        fully_ignored = ignore_blocks.all(axis=(2, 3))
+        partly_ignored = ignore_blocks.any(axis=(2, 3)) & ~fully_ignored
+
+    refined_rows = refined_columns = saturated_rows = saturated_columns = np.empty(0, dtype=np.intp)
+    saturated_lower = 0
+    if block_rows and block_columns:
+        changed_blocks = _changed_block_map(base, latest, block_size)
+        if ignore_blocks is not None:
+            changed_blocks &= ~fully_ignored
+        changed_rows, changed_columns = np.nonzero(changed_blocks)
+        if len(changed_rows):
+            # Downscale only the band of rows that contains changes
+            top, bottom = int(changed_rows.min()), int(changed_rows.max()) + 1
+            band = slice(top * block_size, bottom * block_size)
+            mean_diff = np.abs(_block_means(base[band], block_size).astype(np.int16) -
+                               _block_means(latest[band], block_size).astype(np.int16))[changed_rows - top, changed_columns]
+            saturated = mean_diff.max(axis=1) >= saturation
+            if ignore_blocks is not None:
+                saturated &= ~partly_ignored[changed_rows, changed_columns]
+            refined_rows, refined_columns = changed_rows[~saturated], changed_columns[~saturated]
+            saturated_rows, saturated_columns = changed_rows[saturated], changed_columns[saturated]
+            block_pixels = block_size * block_size
+            saturated_lower = int(np.ceil(np.maximum(mean_diff[saturated] - 1, 0) * block_pixels / 255).sum())
+
+    def refine(rows, columns):
+        nonlocal changed_values
+        base_blocks, latest_blocks = _block_view(base, block_size), _block_view(latest, block_size)
+        for start in range(0, len(rows), _PYRAMID_REFINE_CHUNK):
+            r, c = rows[start:start + _PYRAMID_REFINE_CHUNK], columns[start:start + _PYRAMID_REFINE_CHUNK]
+            base_chunk, latest_chunk = base_blocks[r, c], latest_blocks[r, c]
+            diff = np.maximum(base_chunk, latest_chunk)
+            diff -= np.minimum(base_chunk, latest_chunk)
+            if ignore_blocks is not None:
+                diff[ignore_blocks[r, c]] = 0
+            changed_values += int(np.count_nonzero(diff))
+            masked = (to_grayscale(diff.reshape(-1, block_size, 3)) > threshold).reshape(len(r), -1).any(axis=1)
+            block_mask[r[masked], c[masked]] = True
+
+    refine(refined_rows, refined_columns)
+
+    saturated_upper = len(saturated_rows) * block_size * block_size * 3
+    refine_saturated = (saturated_upper - saturated_lower) / total_values * 100 > max_error_percent if total_values else False
+    if not refine_saturated and decision_threshold is not None and len(saturated_rows):
+        # The estimate must not flip the alert decision: refine if the bounds straddle the threshold
+        lower = (changed_values + saturated_lower) / total_values * 100
+        upper = (changed_values + saturated_upper) / total_values * 100
+        refine_saturated = lower <= decision_threshold < upper
+
+    percent_error = 0.0
+    if refine_saturated:
+        refine(saturated_rows, saturated_columns)
+    elif len(saturated_rows):
+        changed_values += saturated_upper
+        percent_error = (saturated_upper - saturated_lower) / total_values * 100
+        block_mask[saturated_rows, saturated_columns] = True
+
+    ssim_score = None
+    if compute_ssim:
+        if not changed_values:
+            ssim_score = 1.0
+        elif SSIM_AVAILABLE and min(height, width) >= _SSIM_MIN_DIMENSION:
+            ssim_score = float(structural_similarity(_masked_grayscale(base, ignore_mask),
+                                                     _masked_grayscale(latest, ignore_mask), data_range=255))
+
+    logger.debug(f"Pyramid comparison: {len(refined_rows)} blocks refined, {len(saturated_rows)} saturated "
+                 f"({'refined' if refine_saturated else 'estimated'}), error <= {percent_error:.4f}%")
+    return {
+        'percent': (changed_values / total_values) * 100 if total_values else 0,
+        'percent_error': percent_error,
+        'changed_values': changed_values,
+        'mask': block_mask,
+        'mask_scale': block_size,
+        'bbox': _scale_bbox(mask_bounding_box(block_mask), block_size, width, height),
+        'ssim': ssim_score
+    }
+
+def _label_components(grid: np.ndarray) -> tuple[int, np.ndarray]:
+    """8-connected component labels of a boolean grid: (count, labels with 0 as background)."""
+    if cv2 is not None:
+        count, labels = cv2.connectedComponents(grid.astype(np.uint8), connectivity=8)
+        return count - 1, labels
+
+    # Flood fill over the set cells only; the grid is already reduced to merge-distance cells
+    labels = np.zeros(grid.shape, dtype=np.int32)
+    count = 0
+    for start in zip(*np.nonzero(grid)):
+        if labels[start]:
+            continue
+        count += 1
+        labels[start] = count
+        stack = [start]
+        while stack:
+            row, column = stack.pop()
+            for neighbour in ((row + dr, column + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1)):
+                if (0 <= neighbour[0] < grid.shape[0] and 0 <= neighbour[1] < grid.shape[1]
+                        and grid[neighbour] and not labels[neighbour]):
+                    labels[neighbour] = count
+                    stack.append(neighbour)
+    return count, labels
+
+def _merge_closest_regions(regions: list[tuple], max_regions: int) -> list[tuple]:
+    """Repeatedly merges the two regions whose union adds the least area, until max_regions remain."""
+    regions = list(regions)
+    area = lambda box: (box[2] - box[0]) * (box[3] - box[1])
+    while len(regions) > max_regions:
+        best = None
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                union = _union_bbox(regions[i], regions[j])
+                cost = area(union) - area(regions[i]) - area(regions[j])
+                if best is None or cost < best[0]:
+                    best = (cost, i, j, union)
+        _, i, j, union = best
+        regions[i] = union
+        del regions[j]
+    return regions
+
+def _union_bbox(bbox1: tuple, bbox2: tuple) -> tuple:
+    return min(bbox1[0], bbox2[0]), min(bbox1[1], bbox2[1]), max(bbox1[2], bbox2[2]), max(bbox1[3], bbox2[3])
+
+def find_change_regions(mask: np.ndarray, mask_scale: int = 1, image_size: tuple[int, int] | None = None,
+                        merge_distance: int = DEFAULT_REGION_MERGE_DISTANCE,
+                        max_regions: int = DEFAULT_MAX_REGIONS) -> list[tuple[int, int, int, int]]:
+    """
+    Splits a change mask into separate changed regions.
+
+    The mask is reduced to cells of about merge_distance pixels and the cells are grouped into
+    8-connected components, so changes less than roughly one cell apart become one region. Each
+    region is then tightened to the mask pixels it contains. If there are more than max_regions,
+    the merge distance is doubled until few enough remain, and the last excess regions are merged
+    with their cheapest neighbour.
+
+    Args:
+        mask: Boolean change mask with one cell per mask_scale x mask_scale pixels.
+        image_size: (width, height) in pixels, used to clip regions of a scaled mask.
+
+    Returns:
+        list: (left, top, right, bottom) pixel boxes, top to bottom.
+    """
+    if not mask.any():
+        return []
+    width, height = image_size or (mask.shape[1] * mask_scale, mask.shape[0] * mask_scale)
+
+    cell_size = max(1, -(-merge_distance // mask_scale))
+    while True:
+        grid = _reduce_mask(mask, cell_size)
+        count, labels = _label_components(grid)
+        if count <= max_regions * 4 or cell_size >= max(mask.shape):
+            break
+        cell_size *= 2
+
+    regions = []
+    for label in range(1, count + 1):
+        rows, columns = np.nonzero(labels == label)
+        top, left = int(rows.min()) * cell_size, int(columns.min()) * cell_size
+        bottom, right = (int(rows.max()) + 1) * cell_size, (int(columns.max()) + 1) * cell_size
+        tight = mask_bounding_box(mask[top:bottom, left:right])
+        if tight:
+            regions.append((left + tight[0], top + tight[1], left + tight[2], top + tight[3]))
+
+    regions = _merge_closest_regions(regions, max_regions)
+    return sorted((_scale_bbox(region, mask_scale, width, height) for region in regions), key=lambda r: (r[1], r[0]))
+
+def _load_label_font():
+    """Bold font if available, falling back to the default font."""
+    try:
+        return ImageFont.truetype("arialbd.ttf", 24)
+    except IOError:
+        try:
+            return ImageFont.truetype("arial.ttf", 24)
+        except IOError:
+            return ImageFont.load_default()
+
+def _render_before_after(base: np.ndarray, latest: np.ndarray, bbox: tuple[int, int, int, int],
+                         font, title: str | None = None) -> Image.Image:
+    """Labelled side-by-side "BEFORE"/"AFTER" crop of one region."""
+    left, top, right, bottom = bbox
+    base_region = Image.fromarray(np.ascontiguousarray(base[top:bottom, left:right]))
+    latest_region = Image.fromarray(np.ascontiguousarray(latest[top:bottom, left:right]))
+
+    width, height = base_region.size
+    label_height = 40  # Height for label area above images
+    combined = Image.new('RGB', (width * 2, height + label_height), 'white')
+    combined.paste(base_region, (0, label_height))
+    combined.paste(latest_region, (width, label_height))
+
+    draw = ImageDraw.Draw(combined)
+    # Vertical divider between the images and a separator above them
+    draw.line((width, label_height, width, height + label_height), fill='gray', width=1)
+    draw.line((0, label_height, width * 2, label_height), fill='white', width=2)
+
+    # Labels roughly centred above each image
+    draw.text((width // 4 - 30, 5), f"{title} BEFORE" if title else "BEFORE", fill="black", font=font)
+    draw.text((width + width // 4 - 20, 5), "AFTER", fill="black", font=font)
+    return combined
+
+def render_diff_report(base: np.ndarray, latest: np.ndarray, regions: list[tuple[int, int, int, int]],
+                       output_path: str) -> str:
+    """
+    Saves before/after crops of the changed regions of two image arrays as one image.
+
+    A single region gives the classic side-by-side report; several regions are stacked top to
+    bottom, each with its own labels, instead of one crop spanning everything in between.
+    """
+    font = _load_label_font()
+    if len(regions) == 1:
+        report = _render_before_after(base, latest, regions[0], font)
+    else:
+        spacing = 10
+        crops = [_render_before_after(base, latest, region, font, title=f"#{index}")
+                 for index, region in enumerate(regions, start=1)]
+        report = Image.new('RGB', (max(crop.width for crop in crops),
+                                   sum(crop.height for crop in crops) + spacing * (len(crops) - 1)), 'white')
+        y = 0
+        for crop in crops:
+            report.paste(crop, (0, y))
+            y += crop.height + spacing
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    report.save(output_path)
+    logger.debug(f"Before/after report for regions {regions} saved to: {output_path}")
+    return output_path
+
+def compare_image_files(image_path1: str, image_path2: str, ignore_regions: list[list[int]] = None,
+                        threshold: int = DEFAULT_DIFF_THRESHOLD, compute_ssim: bool = False,
+                        report_path: str | None = None, base_array: np.ndarray | None = None,
+                        pyramid: dict | None = None, merge_distance: int = DEFAULT_REGION_MERGE_DISTANCE,
+                        max_regions: int = DEFAULT_MAX_REGIONS, align: bool = False) -> dict:
+    """
+    Compares two image files, decoding each exactly once.
+
+    Ignore regions are compiled into a cached mask of the compared size and applied to the
+    difference, which counts as if they had been blacked out in both images; sizes are padded
+    with white to a common size, like the previous PIL comparison. When report_path is given and any pixel exceeds the
+    threshold, before/after crops of each changed region are written there. An already decoded
+    first image (e.g. a cached baseline) can be passed as base_array, in which case image_path1
+    is not read. With pyramid set to a dict of diff_arrays_pyramid options, the coarse-to-fine
+    comparison is used.
+
+    With align set, blocks of rows that merely moved (see screenshot_alignment) are compared at
+    their new position. Inserted and removed rows still count as changed, but the content below
+    them does not, and the moved blocks are listed in 'shifted_regions'.
+
+    Returns:
+        dict: The diff_arrays result plus 'size' (width, height), 'regions' (see find_change_regions),
+        'shifted_regions' and 'diff_image_path'. Regions are in the latest image's coordinates.
+    """
+    base = base_array if base_array is not None else load_image_array(image_path1)
+    latest = load_image_array(image_path2)
+
+    alignment = None
+    if align:
+        height, width = max(base.shape[0], latest.shape[0]), max(base.shape[1], latest.shape[1])
+        alignment = align_screenshots(base, latest, ignore_mask=get_ignore_mask(ignore_regions, height, width))
+    removed_values = 0
+    if alignment:
+        base = alignment['aligned_base']
+        removed_values = alignment['removed_rows'] * latest.shape[1] * 3
+
+    if base.shape != latest.shape:
+        logger.warning(f"Image sizes differ. Base: {base.shape[1::-1]}, Latest: {latest.shape[1::-1]}. "
+                       f"Padding to common dimensions for comparison.")
+        height = max(base.shape[0], latest.shape[0])
+        width = max(base.shape[1], latest.shape[1])
+        base = pad_to_size(base, height, width)
+        latest = pad_to_size(latest, height, width)
+
+    ignore_mask = get_ignore_mask(ignore_regions, base.shape[0], base.shape[1])
+    if pyramid is not None:
+        result = diff_arrays_pyramid(base, latest, threshold=threshold, compute_ssim=compute_ssim,
+                                     ignore_mask=ignore_mask, **pyramid)
+    else:
+        result = diff_arrays(base, latest, threshold=threshold, compute_ssim=compute_ssim, ignore_mask=ignore_mask)
+    if removed_values:
+        # Removed baseline rows are changes too; measure against the union of both pages' rows
+        result['changed_values'] += removed_values
+        result['percent'] = result['changed_values'] / (latest.size + removed_values) * 100
+    result['shifted_regions'] = alignment['shifted_regions'] if alignment else []
+    result['size'] = (base.shape[1], base.shape[0])
+    result['regions'] = find_change_regions(result['mask'], result['mask_scale'], result['size'],
+                                            merge_distance=merge_distance, max_regions=max_regions)
+    result['diff_image_path'] = None
+    if report_path and result['regions']:
+        result['diff_image_path'] = render_diff_report(base, latest, result['regions'], report_path)
+    return result
@@ -0,0 +1,59 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+from unittest.mock import patch
+from PIL import Image
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import baseline_cache
+
+
+class TestBaselineArrayCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'baseline_home.png')
+        self.image = Image.new('RGB', (40, 30), (10, 20, 30))
+        self.image.save(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_second_load_skips_png_decoding(self):
+        cache = baseline_cache.BaselineArrayCache(max_bytes=1024 * 1024)
+        first = cache.get(self.path)
+        np.testing.assert_array_equal(first, np.asarray(self.image))
+        self.assertTrue(os.path.exists(baseline_cache.get_decoded_cache_path(self.path)))
+
+        with patch.object(baseline_cache.Image, 'open', side_effect=AssertionError("decoded")):
+            self.assertIs(cache.get(self.path), first)
+            # A fresh process memory-maps the decoded file instead
+            np.testing.assert_array_equal(baseline_cache.BaselineArrayCache(1024 * 1024).get(self.path), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_rewritten_baseline_is_decoded_again(self):
+        cache = baseline_cache.BaselineArrayCache(max_bytes=1024 * 1024)
+        cache.get(self.path)
+        Image.new('RGB', (40, 30), (200, 0, 0)).save(self.path)
+        cache.invalidate(self.path)
+        self.assertFalse(os.path.exists(baseline_cache.get_decoded_cache_path(self.path)))
+        self.assertEqual(tuple(cache.get(self.path)[0, 0]), (200, 0, 0))
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        other = os.path.join(self.temp_dir, 'baseline_about.png')
+        self.image.save(other)
+        cache = baseline_cache.BaselineArrayCache(max_bytes=40 * 30 * 3 + 10, write_decoded_files=False)
+        cache.get(self.path)
+        cache.get(other)
+        cache.get(other)
+        cache.get(self.path)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from PIL import Image, ImageDraw
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import batch_comparison
+from src import comparators
+from src import tile_hashing
+
+
+class TestBatchComparison(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.jobs = []
+        for index in range(3):
+            base = Image.new('RGB', (160, 120), (245, 245, 245))
+            ImageDraw.Draw(base).rectangle([10, 10, 60, 40], fill=(0, 0, 200))
+            latest = base.copy()
+            if index:
+                ImageDraw.Draw(latest).rectangle([20 * index, 60, 20 * index + 30, 90], fill=(200, 0, 0))
+            self.jobs.append({'baseline_path': self._save(base, f'base_{index}.png'),
+                              'snapshot_path': self._save(latest, f'latest_{index}.png'),
+                              'compute_ssim': True})
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _save(self, image, name):
+        path = os.path.join(self.temp_dir, name)
+        image.save(path)
+        tile_hashing.write_tile_hashes(path, 64)
+        return path
+
+    def _summary(self, result):
+        return result['percent'], result['bbox'], result['regions'], result['ssim'], bool(result['diff_image_path'])
+
+    def test_pool_results_match_inline_comparison(self):
+        expected = [comparators.compare_screenshots_detailed(job['baseline_path'], job['snapshot_path'], compute_ssim=True)
+                    for job in self.jobs]
+        results = batch_comparison.compare_screenshot_pairs(self.jobs, max_workers=2)
+
+        self.assertEqual([self._summary(r) for r in results], [self._summary(r) for r in expected])
+        self.assertEqual(results[0]['percent'], 0.0)
+        self.assertGreater(results[2]['percent'], 0)
+
+    def test_unchanged_pairs_need_no_decoded_baseline(self):
+        self.assertFalse(batch_comparison._needs_decoded_baseline(self.jobs[0]))
+        self.assertTrue(batch_comparison._needs_decoded_baseline(self.jobs[1]))
+
+    def test_missing_latest_snapshot_in_batch(self):
+        jobs = self.jobs[1:] + [{'baseline_path': self.jobs[0]['baseline_path'],
+                                 'snapshot_path': os.path.join(self.temp_dir, 'missing.png')}]
+        results = batch_comparison.compare_screenshot_pairs(jobs, max_workers=2)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[2]['percent'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
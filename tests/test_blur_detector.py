@@ -0,0 +1,285 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest.mock import MagicMock, patch
+
+import cv2
+import numpy as np
+from PIL import Image
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.blur_detector import BlurDetector
+
+
+def _png_bytes(seed, size=300, blurred=False):
+    pixels = np.random.default_rng(seed).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    if blurred:
+        pixels = cv2.GaussianBlur(pixels, (0, 0), 8)
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _photo_jpeg(width, height, sigma=0.0, seed=0):
+    """JPEG with detail at several scales, closer to a photo than plain noise."""
+    rng = np.random.default_rng(seed)
+    gray = np.zeros((height, width), np.float32)
+    for step in (1, 3, 9, 27):
+        noise = rng.standard_normal((height // step + 1, width // step + 1)).astype(np.float32)
+        gray += cv2.resize(noise, (width, height), interpolation=cv2.INTER_LINEAR) * step ** 0.8
+    gray = (gray - gray.min()) / (gray.max() - gray.min()) * 255
+    if sigma:
+        gray = cv2.GaussianBlur(gray, (0, 0), sigma)
+    pixels = np.stack([gray, np.roll(gray, 5, 1), np.roll(gray, 9, 0)], -1).clip(0, 255).astype(np.uint8)
+    return cv2.imencode('.jpg', pixels, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+class BlurDetectorTestCase(unittest.TestCase):
+    """Detector on a temporary database and snapshot directory, with downloads served from self.served."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.patches = [
+            patch('src.blur_detector.get_database_path', return_value=os.path.join(self.temp_dir, 'test.db')),
+            patch('src.blur_detector.get_snapshots_directory', return_value=os.path.join(self.temp_dir, 'snapshots')),
+            # Threads instead of processes, so the analysis can be observed
+            patch('src.blur_detector.ProcessPoolExecutor', ThreadPoolExecutor),
+            patch('src.blur_detector.time.sleep'),
+        ]
+        for p in self.patches:
+            p.start()
+        self.detector = BlurDetector()
+        self.detector.analysis_cache_enabled = True
+        self.detector.probe_enabled = False
+        self.served = {}  # image URL -> (bytes, etag)
+        self.requests = []
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _fake_download(self, image_url, page_url, max_retries=3, validators=None, response_info=None):
+        self.requests.append((image_url, validators))
+        data, etag = self.served[image_url]
+        if validators and validators.get('etag') == etag:
+            response_info['not_modified'] = True
+            return None
+        if response_info is not None:
+            response_info.update(etag=etag, last_modified=None)
+        return data
+
+    def _run(self, image_urls):
+        images = [{'page_url': 'https://example.com/', 'image_url': url} for url in image_urls]
+        with patch.object(self.detector, '_download_image', side_effect=self._fake_download), \
+                patch.object(self.detector, '_analyze_image_data', wraps=self.detector._analyze_image_data) as analyze:
+            results = self.detector.analyze_website_images('site-1', images, crawl_id=1)
+        return results, analyze.call_count
+
+
+class TestBlurAnalysisCache(BlurDetectorTestCase):
+
+    def test_unchanged_image_is_revalidated_and_not_analyzed(self):
+        self.served['https://example.com/a.png'] = (_png_bytes(1), '"v1"')
+        first, analyzed = self._run(['https://example.com/a.png'])
+        self.assertEqual(analyzed, 1)
+        self.assertFalse(first[0]['is_blurry'])
+
+        self.requests.clear()
+        second, analyzed = self._run(['https://example.com/a.png'])
+        self.assertEqual(analyzed, 0)
+        self.assertEqual(self.requests[0][1]['etag'], '"v1"')
+        self.assertTrue(second[0]['from_cache'])
+        for key in ('laplacian_score', 'blur_percentage', 'is_blurry', 'image_width', 'image_local_path'):
+            self.assertEqual(second[0][key], first[0][key], key)
+        # Sharp images are analyzed in memory only
+        self.assertIsNone(second[0]['image_local_path'])
+
+    def test_unchanged_blurry_image_keeps_its_thumbnail(self):
+        self.served['https://example.com/a.png'] = (_png_bytes(9, blurred=True), '"v1"')
+        first, _ = self._run(['https://example.com/a.png'])
+        self.assertTrue(first[0]['is_blurry'])
+        second, analyzed = self._run(['https://example.com/a.png'])
+        self.assertEqual(analyzed, 0)
+        self.assertEqual(second[0]['image_local_path'], first[0]['image_local_path'])
+        self.assertTrue(os.path.exists(os.path.join('data', second[0]['image_local_path'])))
+
+    def test_same_bytes_under_another_url_reuse_the_analysis(self):
+        data = _png_bytes(2)
+        self.served['https://example.com/a.png'] = (data, None)
+        self._run(['https://example.com/a.png'])
+        self.served['https://cdn.example.com/a.png'] = (data, None)
+        results, analyzed = self._run(['https://cdn.example.com/a.png'])
+        self.assertEqual(analyzed, 0)
+        self.assertEqual(len(results), 1)
+
+    def test_downloader_is_closed_after_each_run(self):
+        self.served['https://example.com/a.png'] = (_png_bytes(1), None)
+        with patch('src.blur_detector.ImageDownloader.close') as close:
+            self._run(['https://example.com/a.png'])
+            self._run(['https://example.com/a.png'])
+        self.assertEqual(close.call_count, 2)
+        self.assertIsNone(self.detector._downloader)
+
+    def test_changed_image_is_analyzed_again(self):
+        self.served['https://example.com/a.png'] = (_png_bytes(3, blurred=True), '"v1"')
+        first, _ = self._run(['https://example.com/a.png'])
+        self.served['https://example.com/a.png'] = (_png_bytes(4, blurred=True), '"v2"')
+        second, analyzed = self._run(['https://example.com/a.png'])
+        self.assertEqual(analyzed, 1)
+        self.assertNotEqual(second[0]['image_local_path'], first[0]['image_local_path'])
+        # The replaced image's file is removed
+        self.assertFalse(os.path.exists(os.path.join('data', first[0]['image_local_path'])))
+        self.assertTrue(os.path.exists(os.path.join('data', second[0]['image_local_path'])))
+
+    def test_cached_results_follow_current_thresholds(self):
+        self.served['https://example.com/a.png'] = (_png_bytes(5), '"v1"')
+        first, _ = self._run(['https://example.com/a.png'])
+        self.detector.threshold = first[0]['laplacian_score'] + 1
+        second, analyzed = self._run(['https://example.com/a.png'])
+        self.assertEqual(analyzed, 0)
+        self.assertTrue(second[0]['is_blurry'])
+
+
+class TestPageImages(BlurDetectorTestCase):
+
+    def test_page_images_use_captured_bytes_and_download_the_rest(self):
+        self.served['https://example.com/b.png'] = (_png_bytes(14), None)
+        images = [{'src': 'https://example.com/a.png', 'image_bytes': _png_bytes(15)},
+                  {'src': 'https://example.com/b.png'}]
+        with patch.object(self.detector, '_download_image', side_effect=self._fake_download):
+            results = self.detector.analyze_page_images('site-1', 'https://example.com/', images, crawl_id=1)
+        self.assertEqual(sorted(result['image_url'] for result in results),
+                         ['https://example.com/a.png', 'https://example.com/b.png'])
+        # Only the image the browser did not capture is downloaded
+        self.assertEqual([url for url, _ in self.requests], ['https://example.com/b.png'])
+        self.assertEqual(len(self.detector.get_blur_results_for_crawl(1)), 2)
+
+
+class TestHeaderProbe(BlurDetectorTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.detector.probe_enabled = True
+        self.detector.analysis_cache_enabled = False
+
+    def _ranged_get(self, url, headers=None, **kwargs):
+        data, _ = self.served[url]
+        self.assertEqual(headers['Range'], f'bytes=0-{self.detector.probe_bytes - 1}')
+        content_type = 'image/svg+xml' if url.endswith('.svg') else 'image/png'
+        return MagicMock(status_code=206, content=data[:self.detector.probe_bytes],
+                         headers={'content-type': content_type, 'Content-Range': f'bytes 0-99/{len(data)}'})
+
+    def test_small_images_and_pixels_are_not_downloaded(self):
+        self.served['https://example.com/icon.png'] = (_png_bytes(6, size=32), None)
+        self.served['https://example.com/p.png'] = (_png_bytes(7, size=1), None)
+        self.served['https://example.com/photo.png'] = (_png_bytes(8), None)
+        with patch('src.blur_detector.ImageDownloader.get', side_effect=self._ranged_get):
+            results, analyzed = self._run(['https://example.com/icon.png', 'https://example.com/p.png',
+                                           'https://example.com/photo.png'])
+        self.assertEqual([url for url, _ in self.requests], ['https://example.com/photo.png'])
+        self.assertEqual(analyzed, 1)
+        by_url = {result['image_url']: result for result in results}
+        self.assertEqual(by_url['https://example.com/icon.png']['skip_reason'], 'Image too small')
+        self.assertEqual(by_url['https://example.com/icon.png']['image_width'], 32)
+        self.assertEqual(by_url['https://example.com/p.png']['skip_reason'], 'Tracking pixel')
+        self.assertIsNone(by_url['https://example.com/p.png']['image_local_path'])
+        self.assertFalse(by_url['https://example.com/photo.png']['skipped'])
+
+        stored = {row['image_url']: row['skip_reason'] for row in self.detector.get_blur_results_for_crawl(1)}
+        self.assertEqual(stored['https://example.com/icon.png'], 'Image too small')
+
+    def test_svg_is_skipped(self):
+        self.served['https://example.com/logo.svg'] = (b'<svg xmlns="http://www.w3.org/2000/svg"></svg>', None)
+        with patch('src.blur_detector.ImageDownloader.get', side_effect=self._ranged_get), \
+                patch.object(self.detector, '_normalize_image_url', side_effect=lambda url, page_url: url):
+            results, analyzed = self._run(['https://example.com/logo.svg'])
+        self.assertEqual(results[0]['skip_reason'], 'SVG image')
+        self.assertEqual(self.requests, [])
+
+
+class TestInMemoryAnalysis(BlurDetectorTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.detector.analysis_cache_enabled = False
+
+    def test_large_jpeg_is_decoded_at_reduced_size(self):
+        pixels = np.random.default_rng(10).integers(0, 256, (2000, 2600, 3), dtype=np.uint8)
+        buffer = BytesIO()
+        Image.fromarray(pixels).save(buffer, format='JPEG')
+        self.detector.resize_dimensions = (320, 180)
+        self.assertEqual(self.detector._reduction_factor(2600, 2000), 2)
+        img = self.detector._decode_image(buffer.getvalue(), 2600, 2000)
+        self.assertEqual(img.shape[:2], (1000, 1300))
+        # The reduced decode stays well above the resize target
+        self.detector.resize_dimensions = (1280, 720)
+        self.assertEqual(self.detector._reduction_factor(2600, 2000), 1)
+        self.assertEqual(self.detector._reduction_factor(8000, 6000), 2)
+        # At the default target common photos are decoded in full, only 7680 px wide or 4320 px tall images are reduced
+        self.assertEqual(self.detector._reduction_factor(4000, 3000), 1)
+        self.assertEqual(self.detector._reduction_factor(7679, 4319), 1)
+        self.assertEqual(self.detector._reduction_factor(7680, 3000), 2)
+        self.assertEqual(self.detector._reduction_factor(3000, 4320), 2)
+
+        result = self.detector._analyze_image_data(buffer.getvalue(), 'https://example.com/big.jpg')
+        self.assertEqual((result['image_width'], result['image_height']), (2600, 2000))
+        self.assertIsNone(result['image_local_path'])
+
+    def test_reduced_decode_scores_match_full_decode(self):
+        self.detector.resize_dimensions = (320, 240)
+        for sigma in (0.0, 1.0, 2.5):
+            data = _photo_jpeg(2400, 1800, sigma)
+            self.assertGreater(self.detector._reduction_factor(2400, 1800), 1)
+            reduced = self.detector._analyze_image_data(data, 'https://example.com/photo.jpg')['laplacian_score']
+            full_img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            full = self.detector._analyze_image_array(full_img, 'https://example.com/photo.jpg', None,
+                                                      2400, 1800, len(data))['laplacian_score']
+            self.assertAlmostEqual(reduced / full, 1.0, delta=0.06, msg=f"sigma={sigma}")
+
+    def test_saved_and_downloaded_images_are_measured_alike(self):
+        self.detector.resize_dimensions = (320, 240)
+        data = _photo_jpeg(2400, 1800, 1.0)
+        path = os.path.join(self.temp_dir, 'photo.jpg')
+        with open(path, 'wb') as f:
+            f.write(data)
+        from_file = self.detector._analyze_single_image(path, 'https://example.com/photo.jpg')
+        from_memory = self.detector._analyze_image_data(data, 'https://example.com/photo.jpg')
+        self.assertEqual(from_file['laplacian_score'], from_memory['laplacian_score'])
+        self.assertEqual(from_file['image_local_path'], path)
+
+    def test_cache_key_includes_decode_mode(self):
+        self.detector.resize_dimensions = (1280, 720)
+        # Entries measured before reduced decoding (keyed '1280x720') are not reused
+        self.assertNotEqual(self.detector._resize_key(), '1280x720')
+        self.assertTrue(self.detector._resize_key().startswith('1280x720'))
+
+    def test_gif_is_decoded(self):
+        buffer = BytesIO()
+        Image.fromarray(np.random.default_rng(11).integers(0, 256, (200, 300, 3), dtype=np.uint8)).save(buffer, format='GIF')
+        result = self.detector._analyze_image_data(buffer.getvalue(), 'https://example.com/a.gif')
+        self.assertEqual((result['image_width'], result['image_height']), (300, 200))
+
+    def test_only_blurry_images_are_saved_as_thumbnails(self):
+        self.detector.thumbnail_size = 120
+        self.served['https://example.com/sharp.png'] = (_png_bytes(12), None)
+        self.served['https://example.com/soft.png'] = (_png_bytes(13, blurred=True), None)
+        results, _ = self._run(['https://example.com/sharp.png', 'https://example.com/soft.png'])
+        by_url = {result['image_url']: result for result in results}
+        self.assertIsNone(by_url['https://example.com/sharp.png']['image_local_path'])
+        thumbnail = os.path.join('data', by_url['https://example.com/soft.png']['image_local_path'])
+        self.assertTrue(thumbnail.endswith('.jpg'))
+        with Image.open(thumbnail) as img:
+            self.assertEqual(img.size, (120, 120))
+        blur_dir = os.path.dirname(thumbnail)
+        self.assertEqual(os.listdir(blur_dir), [os.path.basename(thumbnail)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+from unittest.mock import patch
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import capture_worker
+
+
+def _fake_capture_task(task, sessions):
+    """Stands in for the Playwright capture in the worker; the URL selects the behaviour."""
+    url = task['url']
+    if url.endswith('/raise'):
+        raise RuntimeError('capture failed')
+    if url.endswith('/exit'):
+        os._exit(3)
+    if url.endswith('/hang'):
+        # Like Chromium, a child process in the worker's process group
+        subprocess.Popen(['sleep', '60'])
+        time.sleep(60)
+    return {'url': url, 'pid': os.getpid()}
+
+
+class TestCaptureWorker(unittest.TestCase):
+
+    @unittest.skipUnless(os.path.isdir('/proc') and hasattr(os, 'getpgrp'), "requires /proc")
+    def test_process_group_rss_includes_current_process(self):
+        rss_mb = capture_worker.get_process_group_rss_mb(os.getpgrp())
+        self.assertIsNotNone(rss_mb)
+        self.assertGreater(rss_mb, 0)
+
+    @unittest.skipUnless(os.path.isdir('/proc'), "requires /proc")
+    def test_process_group_rss_for_unknown_group_is_zero(self):
+        self.assertEqual(capture_worker.get_process_group_rss_mb(2 ** 22 + 12345), 0)
+
+    def test_recycles_after_page_limit(self):
+        worker = capture_worker.CaptureWorker('site1', 'https://example.com/')
+        worker.max_pages_per_worker = 2
+        closed = []
+        worker.close = lambda: closed.append(True)
+        worker._process = type('FakeProcess', (), {'pid': os.getpid()})()
+
+        worker.pages_on_worker = 1
+        worker._recycle_if_needed()
+        self.assertEqual(closed, [])
+
+        worker.pages_on_worker = 2
+        worker._recycle_if_needed()
+        self.assertEqual(closed, [True])
+
+
+@unittest.skipUnless(hasattr(os, 'killpg') and os.path.isdir('/proc') and 'fork' in multiprocessing.get_all_start_methods(),
+                     "requires process groups, /proc and fork")
+class TestCaptureWorkerProcess(unittest.TestCase):
+    """Runs a real worker process; 'fork' lets it inherit the patched capture task."""
+
+    def setUp(self):
+        patcher = patch.object(capture_worker, '_run_capture_task', _fake_capture_task)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.worker = capture_worker.CaptureWorker('site1', 'https://example.com/')
+        self.worker._mp_context = multiprocessing.get_context('fork')
+        self.worker.max_rss_mb = 10 ** 6
+        self.addCleanup(self.worker.close)
+
+    def _wait_for_group_exit(self, pgid):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            # Killed processes that are not reaped yet hold no memory
+            if capture_worker.get_process_group_rss_mb(pgid) == 0:
+                return True
+            time.sleep(0.1)
+        return False
+
+    def test_returns_results_and_errors(self):
+        result = self.worker.save_visual_snapshot('site1', 'https://example.com/ok')
+        self.assertEqual(result['url'], 'https://example.com/ok')
+        self.assertEqual(result['pid'], self.worker._process.pid)
+
+        self.assertIsNone(self.worker.save_visual_snapshot('site1', 'https://example.com/raise'))
+        # A failed capture does not cost the worker
+        self.assertEqual(self.worker.save_visual_snapshot('site1', 'https://example.com/ok')['pid'], result['pid'])
+        self.assertEqual(self.worker.workers_started, 1)
+        self.assertEqual(self.worker.pages_on_worker, 3)
+
+    def test_discards_late_results(self):
+        self.worker.start()
+        # A result of a task the worker handle no longer waits for
+        self.worker._result_queue.put((0, {'url': 'stale'}, None))
+        result = self.worker.save_visual_snapshot('site1', 'https://example.com/ok')
+        self.assertEqual(result['url'], 'https://example.com/ok')
+
+    def test_timeout_kills_process_group_and_restarts(self):
+        self.worker.capture_timeout = 2
+        self.worker.start()
+        pgid = self.worker._process.pid
+
+        self.assertIsNone(self.worker.save_visual_snapshot('site1', 'https://example.com/hang'))
+        self.assertIsNone(self.worker._process)
+        self.assertTrue(self._wait_for_group_exit(pgid))
+
+        result = self.worker.save_visual_snapshot('site1', 'https://example.com/ok')
+        self.assertEqual(result['url'], 'https://example.com/ok')
+        self.assertNotEqual(result['pid'], pgid)
+        self.assertEqual(self.worker.workers_started, 2)
+
+    def test_restarts_after_worker_died(self):
+        self.worker.capture_timeout = 2
+        self.assertIsNone(self.worker.save_visual_snapshot('site1', 'https://example.com/exit'))
+        self.assertIsNone(self.worker._process)
+
+        result = self.worker.save_visual_snapshot('site1', 'https://example.com/ok')
+        self.assertEqual(result['url'], 'https://example.com/ok')
+        self.assertEqual(self.worker.workers_started, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
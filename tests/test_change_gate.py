@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import change_gate
+from src.crawler_module import CrawlerModule
+
+
+PAGE = """<html><head><link rel="stylesheet" href="/style.css?ver={version}">
+<script nonce="{nonce}" src="/app.js"></script></head>
+<body><img src="/logo.png" srcset="/logo-2x.png 2x, /logo-3x.png 3x"><p>{text}</p></body></html>"""
+
+
+class TestChangeGate(unittest.TestCase):
+
+    def _gate(self, version='1', nonce='a1', text='Hello'):
+        return change_gate.compute_gate_value(PAGE.format(version=version, nonce=nonce, text=text))
+
+    def test_gate_value_follows_content_and_assets(self):
+        gate = self._gate()
+        self.assertEqual(self._gate(nonce='b2'), gate)
+        # A new stylesheet version or new text opens the gate
+        self.assertNotEqual(self._gate(version='2'), gate)
+        self.assertNotEqual(self._gate(text='Goodbye'), gate)
+
+    def test_asset_urls(self):
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(PAGE.format(version='1', nonce='a', text=''), 'html.parser')
+        self.assertEqual(change_gate.referenced_asset_urls(soup),
+                         ['/app.js', '/logo-2x.png', '/logo-3x.png', '/logo.png', '/style.css?ver=1'])
+
+    def test_should_capture(self):
+        baseline = {'path': 'b.png', 'gate_value': 'g1'}
+        self.assertTrue(change_gate.should_capture(None, baseline))
+        self.assertTrue(change_gate.should_capture('g1', None))
+        self.assertFalse(change_gate.should_capture('g1', baseline, 10))
+        self.assertTrue(change_gate.should_capture('g2', baseline, 10))
+        # The last confirmed check replaces the baseline's value
+        confirmed = dict(baseline, confirmed_gate_value='g2', gate_skipped_checks=3)
+        self.assertFalse(change_gate.should_capture('g2', confirmed, 10))
+        self.assertTrue(change_gate.should_capture('g1', confirmed, 10))
+        # Periodic forced capture
+        self.assertTrue(change_gate.should_capture('g2', confirmed, 4))
+        self.assertFalse(change_gate.should_capture('g2', confirmed, 0))
+
+    def _crawler(self):
+        crawler = MagicMock()
+        crawler.config = {}
+        for name in ('_find_baseline_entry', '_normalize_url', '_capture_matches_baseline'):
+            method = getattr(CrawlerModule, name)
+            getattr(crawler, name).side_effect = lambda *args, method=method: method(crawler, *args)
+        return crawler
+
+    def test_crawler_records_gate_outcomes(self):
+        crawler = self._crawler()
+        all_baselines = {'https://example.com/': {'path': 'a.png', 'gate_value': 'g1'},
+                         'https://example.com/about': {'path': 'b.png', 'gate_value': 'g2'}}
+        crawler.website_manager.get_website.return_value = {'all_baselines': all_baselines}
+        results = {'website_id': 'site1', 'gate_values': {'https://example.com/': 'g1', 'https://example.com/about': 'g3'}}
+
+        self.assertFalse(CrawlerModule._gate_allows_capture(crawler, 'https://example.com/', results, all_baselines))
+        self.assertTrue(CrawlerModule._gate_allows_capture(crawler, 'https://example.com/about', results, all_baselines))
+
+        page_results = {'https://example.com/': {'capture_skipped': True},
+                        'https://example.com/about': {'visual_diff_percent': 0.0, 'structure_diff_score': 1.0}}
+        CrawlerModule._record_gate_outcomes(crawler, results, {'https://example.com/about': 'b_latest.png'}, page_results)
+        self.assertEqual(all_baselines['https://example.com/']['gate_skipped_checks'], 1)
+        self.assertEqual(all_baselines['https://example.com/about']['confirmed_gate_value'], 'g3')
+        self.assertEqual(all_baselines['https://example.com/about']['gate_skipped_checks'], 0)
+        crawler.website_manager.update_website.assert_called_once_with('site1', {'all_baselines': all_baselines})
+
+    def test_changed_capture_keeps_the_gate_open(self):
+        crawler = self._crawler()
+        url = 'https://example.com/about'
+        all_baselines = {url: {'path': 'b.png', 'gate_value': 'g1'}}
+        crawler.website_manager.get_website.return_value = {'all_baselines': all_baselines}
+        results = {'website_id': 'site1', 'gate_values': {url: 'g2'}}
+
+        # The page changed and its capture shows a visual difference from the baseline
+        self.assertTrue(CrawlerModule._gate_allows_capture(crawler, url, results, all_baselines))
+        page_results = {url: {'visual_diff_percent': 12.5, 'structure_diff_score': 1.0}}
+        CrawlerModule._record_gate_outcomes(crawler, results, {url: 'b_latest.png'}, page_results)
+        self.assertNotIn('confirmed_gate_value', all_baselines[url])
+
+        # The next check with the same content is still captured
+        self.assertTrue(CrawlerModule._gate_allows_capture(crawler, url, results, all_baselines))
+
+        # A structural difference alone also keeps the gate open
+        all_baselines[url]['confirmed_gate_value'] = 'g2'
+        page_results = {url: {'visual_diff_percent': 0.0, 'structure_diff_score': 0.5}}
+        CrawlerModule._record_gate_outcomes(crawler, results, {url: 'b_latest.png'}, page_results)
+        self.assertTrue(CrawlerModule._gate_allows_capture(crawler, url, results, all_baselines))
+
+    def test_gate_finds_baselines_under_a_normalized_url(self):
+        crawler = self._crawler()
+        all_baselines = {'https://example.com/about/': {'path': 'b.png', 'gate_value': 'g1'}}
+        crawler.website_manager.get_website.return_value = {'all_baselines': all_baselines}
+        results = {'website_id': 'site1', 'gate_values': {'https://example.com/about': 'g1'}}
+
+        self.assertFalse(CrawlerModule._gate_allows_capture(crawler, 'https://example.com/about', results, all_baselines))
+        CrawlerModule._record_gate_outcomes(crawler, results, {}, {'https://example.com/about': {'capture_skipped': True}})
+        self.assertEqual(all_baselines['https://example.com/about/']['gate_skipped_checks'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import sys
+import threading
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.check_pipeline import SnapshotPipeline
+from src.crawler_module import CrawlerModule
+
+
+class TestSnapshotPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.crawler_module = MagicMock()
+        self.crawler_module.website_manager.get_website.return_value = {'all_baselines': {'https://example.com/': {'path': 'b.png'}}}
+        self.crawler_module._open_capture_session.return_value = None
+        self.crawler_module._is_snapshot_candidate.side_effect = lambda page, website_id: page.get('status_code') == 200
+
+        def snapshot_page(url, results, is_baseline, all_baselines, page_results, snapshot_map, capture_session):
+            snapshot_map[url] = f"snap_{len(snapshot_map)}.png"
+        self.crawler_module._snapshot_page.side_effect = snapshot_page
+        self.results = {'website_id': 'site1', 'url': 'https://example.com/'}
+
+    def test_captures_only_candidate_pages_once(self):
+        pipeline = SnapshotPipeline(self.crawler_module, self.results).start()
+        self.assertTrue(pipeline.submit({'url': 'https://example.com/', 'status_code': 200}))
+        self.assertFalse(pipeline.submit({'url': 'https://example.com/', 'status_code': 200}))
+        self.assertFalse(pipeline.submit({'url': 'https://example.com/missing', 'status_code': 404}))
+        self.assertTrue(pipeline.submit({'url': 'https://example.com/about', 'status_code': 200}))
+        pipeline.finish(timeout=5)
+
+        self.assertEqual(self.crawler_module._snapshot_page.call_count, 2)
+        self.assertEqual(set(pipeline.snapshot_map), {'https://example.com/', 'https://example.com/about'})
+        self.crawler_module._finish_snapshots.assert_called_once_with(self.results, False, pipeline.snapshot_map, pipeline.page_results)
+
+    def test_finish_is_idempotent_and_stops_accepting_pages(self):
+        pipeline = SnapshotPipeline(self.crawler_module, self.results, is_baseline=True).start()
+        pipeline.submit({'url': 'https://example.com/', 'status_code': 200})
+        pipeline.finish(timeout=5)
+        pipeline.finish(timeout=5)
+
+        self.assertFalse(pipeline.submit({'url': 'https://example.com/late', 'status_code': 200}))
+        self.crawler_module._finish_snapshots.assert_called_once()
+
+    def test_no_candidate_pages_skips_finalization(self):
+        pipeline = SnapshotPipeline(self.crawler_module, self.results).start()
+        pipeline.submit({'url': 'https://example.com/missing', 'status_code': 404})
+        pipeline.finish(timeout=5)
+
+        self.crawler_module._finish_snapshots.assert_not_called()
+
+    def test_timed_out_pipeline_is_cancelled_and_not_finalized(self):
+        release = threading.Event()
+        captured = []
+
+        def slow_snapshot_page(url, results, is_baseline, all_baselines, page_results, snapshot_map, capture_session):
+            captured.append(url)
+            release.wait(5)
+        self.crawler_module._snapshot_page.side_effect = slow_snapshot_page
+
+        pipeline = SnapshotPipeline(self.crawler_module, self.results).start()
+        pipeline.submit({'url': 'https://example.com/', 'status_code': 200})
+        pipeline.submit({'url': 'https://example.com/about', 'status_code': 200})
+        pipeline.finish(timeout=0.1)
+
+        self.crawler_module._finish_snapshots.assert_not_called()
+        self.assertTrue(self.results['snapshot_pipeline_incomplete'])
+        release.set()
+        pipeline._thread.join(5)
+        self.assertFalse(pipeline._thread.is_alive())
+        # The page queued behind the slow one is not captured any more
+        self.assertEqual(captured, ['https://example.com/'])
+
+
+class TestCapturedImageBytes(unittest.TestCase):
+
+    def test_captured_bodies_are_handed_to_blur_detection_and_released(self):
+        crawler = MagicMock()
+        crawler._captured_images = {'https://example.com/': [{'image_url': 'https://example.com/a.png', 'body': b'png'},
+                                                             {'image_url': 'https://example.com/b.png', 'body': b''}]}
+        images = [{'image_url': 'https://example.com/a.png'}, {'image_url': 'https://example.com/b.png'}]
+        CrawlerModule._attach_captured_image_bytes(crawler, images)
+
+        self.assertEqual(images[0]['image_bytes'], b'png')
+        self.assertNotIn('image_bytes', images[1])
+        self.assertIsNone(crawler._captured_images)
+
+    def test_nothing_is_attached_without_captures(self):
+        crawler = MagicMock()
+        crawler._captured_images = None
+        images = [{'image_url': 'https://example.com/a.png'}]
+        CrawlerModule._attach_captured_image_bytes(crawler, images)
+        self.assertEqual(images, [{'image_url': 'https://example.com/a.png'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import content_normalizer
+
+
+PAGE = """<html><head>
+<meta name="csrf-token" content="{token}">
+<link rel="stylesheet" href="/style.css?ver={version}">
+<script nonce="{nonce}">var config = {{"ajax_nonce":"{nonce}"}};</script>
+</head><body>
+<form><input type="hidden" value="{token}" name="csrfmiddlewaretoken"></form>
+<p>Updated <time datetime="{timestamp}">today</time></p>
+<div data-rendered="{timestamp}"><a href="/news?page=2">More</a></div>
+<p>Opening hours: 9 to 5</p>
+</body></html>"""
+
+
+class TestContentNormalizer(unittest.TestCase):
+
+    def _page(self, token='abc123', version='6.4.2', nonce='n0nce', timestamp='2026-10-18T09:15:02Z', hours='9 to 5'):
+        return PAGE.format(token=token, version=version, nonce=nonce, timestamp=timestamp).replace('9 to 5', hours)
+
+    def test_dynamic_values_do_not_change_the_canonical_hash(self):
+        baseline = content_normalizer.canonical_hash(self._page())
+        reloaded = self._page(token='zz9', version='6.5.0', nonce='Xy+/=', timestamp='2026-10-19 10:00:00+02:00')
+        self.assertEqual(content_normalizer.canonical_hash(reloaded), baseline)
+        self.assertEqual(content_normalizer.canonical_hash(self._page().replace('\n', '\n    ')), baseline)
+        self.assertNotEqual(content_normalizer.canonical_hash(self._page(hours='9 to 6')), baseline)
+
+    def test_site_rules(self):
+        page1, page2 = self._page(hours='visitors: 120'), self._page(hours='visitors: 121')
+        self.assertNotEqual(content_normalizer.canonical_hash(page1), content_normalizer.canonical_hash(page2))
+        site_rules = [r'visitors: \d+', {'pattern': r'[', 'replacement': ''}]
+        self.assertEqual(content_normalizer.canonical_hash(page1, site_rules),
+                         content_normalizer.canonical_hash(page2, site_rules))
+
+    def test_page_text_and_page_links_are_not_normalized(self):
+        baseline = content_normalizer.canonical_hash(self._page())
+        self.assertNotEqual(content_normalizer.canonical_hash(self._page(hours='9 to 5 on 2026-10-18T09:00Z')),
+                            content_normalizer.canonical_hash(self._page(hours='9 to 5 on 2026-10-19T09:00Z')))
+        self.assertNotEqual(content_normalizer.canonical_hash(self._page(hours='version ?v=1')),
+                            content_normalizer.canonical_hash(self._page(hours='version ?v=2')))
+        self.assertNotEqual(content_normalizer.canonical_hash(self._page().replace('/news?page=2', '/news?page=3')), baseline)
+        # Query strings of assets are cache-busting, whatever the parameter is called
+        self.assertEqual(content_normalizer.canonical_hash(self._page().replace('/style.css?ver=', '/style.css?build=x')),
+                         baseline)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+from PIL import Image
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import ignore_masks
+from src import visual_diff
+from src import comparators
+
+
+class TestIgnoreMasks(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(5)
+        self.base = np.full((300, 200, 3), 250, dtype=np.uint8)
+        self.base[::4, ::2] = rng.integers(0, 256, (75, 100, 3), dtype=np.uint8)
+        self.latest = self.base.copy()
+        self.latest[40:90, 30:120] = rng.integers(0, 256, (50, 90, 3), dtype=np.uint8)  # Dynamic element
+        self.latest[200:210, 10:20] = 0                                                 # Real change
+        self.regions = [[25, 35, 100, 60]]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _save(self, array, name):
+        path = os.path.join(self.temp_dir, name)
+        Image.fromarray(array).save(path)
+        return path
+
+    def test_masks_are_cached_and_read_only(self):
+        mask = ignore_masks.get_ignore_mask(self.regions, 300, 200)
+        self.assertIs(ignore_masks.get_ignore_mask([list(r) for r in self.regions], 300, 200), mask)
+        self.assertFalse(mask.flags.writeable)
+        self.assertEqual(mask.sum(), 101 * 61)
+        self.assertIsNone(ignore_masks.get_ignore_mask([[500, 500, 10, 10]], 300, 200))
+        self.assertIsNone(ignore_masks.get_ignore_mask([[1, 2, 3]], 300, 200))
+
+    def test_mask_matches_painted_images(self):
+        painted = visual_diff.diff_arrays(visual_diff.apply_ignore_regions(self.base, self.regions),
+                                          visual_diff.apply_ignore_regions(self.latest, self.regions),
+                                          compute_ssim=True)
+        mask = ignore_masks.get_ignore_mask(self.regions, 300, 200)
+        masked = visual_diff.diff_arrays(self.base, self.latest, compute_ssim=True, ignore_mask=mask)
+        self.assertEqual(masked['changed_values'], painted['changed_values'])
+        self.assertEqual(masked['bbox'], (10, 200, 20, 210))
+        self.assertEqual(masked['ssim'], painted['ssim'])
+
+        pyramid = visual_diff.diff_arrays_pyramid(self.base, self.latest, max_error_percent=0, ignore_mask=mask)
+        self.assertEqual(pyramid['changed_values'], painted['changed_values'])
+
+    def test_selector_regions_from_capture_are_ignored(self):
+        base_path = self._save(self.base, 'base.png')
+        latest_path = self._save(self.latest, 'latest.png')
+        ignore_masks.write_ignore_regions(latest_path, ['.ad-slot'], self.regions)
+        self.assertEqual(ignore_masks.load_ignore_regions(latest_path), self.regions)
+
+        result = comparators.compare_screenshots_detailed(base_path, latest_path)
+        self.assertEqual(result['regions'], [(10, 200, 20, 210)])
+
+        # A screenshot rewritten at the same path does not inherit the old element boxes
+        self._save(self.base, 'latest.png')
+        os.utime(latest_path, ns=(0, 0))
+        self.assertEqual(ignore_masks.load_ignore_regions(latest_path), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
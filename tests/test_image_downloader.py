@@ -0,0 +1,81 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.image_downloader import ImageDownloader
+
+
+class TestImageDownloader(unittest.TestCase):
+
+    def setUp(self):
+        self.active = {}
+        self.peak = {}
+        self.starts = []
+        self.lock = threading.Lock()
+
+    def _fake_get(self, url, **kwargs):
+        host = url.split('/')[2]
+        with self.lock:
+            self.starts.append((host, time.monotonic()))
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+        time.sleep(0.02)
+        with self.lock:
+            self.active[host] -= 1
+        return MagicMock(status_code=200, headers={})
+
+    def test_per_host_connection_limit(self):
+        urls = [f"https://{host}.example.com/{i}.jpg" for host in ('a', 'b') for i in range(12)]
+        with ImageDownloader(max_connections=8, max_connections_per_host=2, min_request_interval=0) as downloader, \
+                patch.object(downloader.session, 'get', side_effect=self._fake_get):
+            results = list(downloader.map(downloader.get, urls))
+        self.assertEqual(len(results), len(urls))
+        self.assertEqual(self.peak, {'a.example.com': 2, 'b.example.com': 2})
+
+    def test_requests_to_a_host_are_spaced(self):
+        with ImageDownloader(max_connections=4, max_connections_per_host=4, min_request_interval=0.05) as downloader, \
+                patch.object(downloader.session, 'get', side_effect=self._fake_get):
+            list(downloader.map(downloader.get, [f"https://a.example.com/{i}.jpg" for i in range(4)]))
+        starts = sorted(start for _, start in self.starts)
+        gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        self.assertGreaterEqual(min(gaps), 0.04)
+
+    def test_retry_after_holds_host_back(self):
+        with ImageDownloader(min_request_interval=0) as downloader, \
+                patch.object(downloader.session, 'get', return_value=MagicMock(status_code=429, headers={'Retry-After': '30'})):
+            downloader.get("https://a.example.com/1.jpg")
+            state = downloader._host_state('a.example.com')
+        self.assertGreater(state.next_start - time.monotonic(), 25)
+
+    def test_map_keeps_order_and_bounds_queued_work(self):
+        submitted = []
+
+        def work(item):
+            submitted.append(item)
+            return item * 2
+
+        with ImageDownloader(max_connections=2, max_pending=3) as downloader:
+            results = downloader.map(work, range(20))
+            self.assertEqual(next(results), 0)
+            time.sleep(0.05)
+            # Only max_pending calls are queued ahead of the consumer
+            self.assertLessEqual(len(submitted), 4)
+            self.assertEqual(list(results), [i * 2 for i in range(1, 20)])
+
+    def test_from_config(self):
+        downloader = ImageDownloader.from_config({'blur_detection_max_connections': 6,
+                                                  'blur_detection_max_connections_per_host': 10})
+        self.assertEqual(downloader.max_connections, 6)
+        # The per-host limit cannot exceed the overall limit
+        self.assertEqual(downloader.max_connections_per_host, 6)
+        downloader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import os
+import sys
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.image_probe import is_svg, read_image_header, total_size_from_headers, probe_skip_reason
+
+
+def _image_bytes(image_format, width=640, height=480, mode='RGB', **save_options):
+    pixels = np.random.default_rng(0).integers(0, 256, (height, width, len(mode)), dtype=np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels, mode).save(buffer, format=image_format, **save_options)
+    return buffer.getvalue()
+
+
+class TestImageProbe(unittest.TestCase):
+
+    def test_dimensions_from_truncated_headers(self):
+        for image_format in ('JPEG', 'PNG', 'GIF', 'BMP'):
+            header = _image_bytes(image_format)[:4096]
+            self.assertEqual(read_image_header(header), (image_format, 640, 480), image_format)
+
+    def test_webp_headers(self):
+        lossy = _image_bytes('WEBP', 321, 123)[:64]
+        lossless = _image_bytes('WEBP', 321, 123, lossless=True)[:64]
+        extended = _image_bytes('WEBP', 321, 123, mode='RGBA')[:64]
+        for header in (lossy, lossless, extended):
+            self.assertEqual(read_image_header(header), ('WEBP', 321, 123))
+
+    def test_unknown_data(self):
+        self.assertIsNone(read_image_header(b'<html>not an image</html>'))
+        self.assertIsNone(read_image_header(b''))
+
+    def test_svg_detection(self):
+        self.assertTrue(is_svg(b'', 'image/svg+xml'))
+        self.assertTrue(is_svg(b'  <?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg">', 'text/plain'))
+        self.assertFalse(is_svg(b'<?xml version="1.0"?><rss></rss>', 'application/xml'))
+        self.assertFalse(is_svg(_image_bytes('PNG')[:1024], 'image/png'))
+
+    def test_total_size(self):
+        self.assertEqual(total_size_from_headers({'Content-Range': 'bytes 0-16383/734201'}, 206, 16384), 734201)
+        self.assertIsNone(total_size_from_headers({'Content-Range': 'bytes 0-16383/*'}, 206, 16384))
+        self.assertEqual(total_size_from_headers({}, 200, 5120), 5120)
+
+    def test_skip_reasons(self):
+        self.assertEqual(probe_skip_reason(None, None, 100, svg=True), "SVG image")
+        self.assertEqual(probe_skip_reason(1, 1, 100), "Tracking pixel")
+        self.assertEqual(probe_skip_reason(64, 400, 100), "Image too small")
+        self.assertIsNone(probe_skip_reason(400, 300, 100))
+        # Unknown dimensions: downloaded in full
+        self.assertIsNone(probe_skip_reason(None, None, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
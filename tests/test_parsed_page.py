@@ -0,0 +1,66 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+from bs4 import BeautifulSoup
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import parsed_page
+from src import comparators
+
+
+class TestParsedPage(unittest.TestCase):
+
+    def setUp(self):
+        parsed_page.clear_parsed_page_cache()
+        self.old_html = """<!DOCTYPE html><html><head><title>Shop</title>
+        <meta name="description" content="Old &amp; tired"><link rel="canonical" href="https://example.com/">
+        <style>.a { color: red }</style><script>var tag = "<b>";</script></head>
+        <body class="home page"><!-- banner --><p>Welcome  to the shop<br>today</p>
+        <img src=" hero.png " alt=""><a href="/sale">Sale</a><pre> x <b>y</b></pre><textarea>note</textarea></body></html>"""
+        self.new_html = self.old_html.replace('Old &amp; tired', 'New').replace('/sale', '/offers')
+
+    def test_views_match_separate_parses(self):
+        page = parsed_page.ParsedPage(self.old_html)
+
+        soup = BeautifulSoup(self.old_html, 'html.parser')
+        for tag in soup(['script', 'style']):
+            tag.decompose()
+        lines = (line.strip() for line in soup.get_text().splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        self.assertEqual(page.text, '\n'.join(chunk for chunk in chunks if chunk))
+
+        for element in soup.find_all(string=True):
+            element.extract()
+        self.assertEqual(page.structure, soup.prettify().strip())
+
+        self.assertEqual(page.meta_tags(['description', 'keywords']), {'description': 'Old & tired', 'keywords': None})
+        self.assertEqual(page.links, {'/sale'})
+        self.assertEqual(page.image_sources, {'hero.png'})
+        self.assertEqual(page.canonical_url, 'https://example.com/')
+
+    def test_comparators_parse_each_document_once(self):
+        with patch.object(parsed_page, 'BeautifulSoup', wraps=BeautifulSoup) as soup_class:
+            comparators.compare_html_text_content(self.old_html, self.new_html)
+            comparators.compare_html_structure(self.old_html, self.new_html)
+            meta_changes = comparators.compare_meta_tags(self.old_html, self.new_html, ['description'])
+            link_changes = comparators.compare_links(self.old_html, self.new_html)
+            comparators.compare_canonical_urls(self.old_html, self.new_html)
+            comparators.compare_image_sources(self.old_html, self.new_html)
+        self.assertEqual(soup_class.call_count, 2)
+        self.assertEqual(meta_changes, {'description': {'old': 'Old & tired', 'new': 'New'}})
+        self.assertEqual(link_changes, {'added': {'/offers'}, 'removed': {'/sale'}})
+
+    def test_parsed_pages_are_accepted_and_cached(self):
+        page = parsed_page.get_parsed_page(self.old_html)
+        self.assertIs(parsed_page.get_parsed_page(self.old_html), page)
+        self.assertIs(parsed_page.get_parsed_page(page), page)
+        self.assertEqual(comparators.extract_links(page), {'/sale'})
+        self.assertEqual(comparators.extract_text_from_html(""), "")
+        self.assertEqual(comparators.compare_html_structure("", ""), (1.0, []))
+
+
+if __name__ == '__main__':
+    unittest.main()
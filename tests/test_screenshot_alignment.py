@@ -0,0 +1,98 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import screenshot_alignment
+from src import visual_diff
+
+
+def make_page(height=600, width=80, seed=3):
+    """A page of distinct rows, like text lines, with blank margins between sections."""
+    rng = np.random.default_rng(seed)
+    page = np.full((height, width, 3), 255, dtype=np.uint8)
+    for y in range(0, height, 12):
+        page[y:y + 8] = rng.integers(0, 256, (8, width, 3), dtype=np.uint8)
+    return page
+
+
+class TestScreenshotAlignment(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.base = make_page()
+        banner = np.full((40, 80, 3), (200, 30, 30), dtype=np.uint8)
+        # The banner pushes everything below row 100 down by 40px
+        self.latest = np.concatenate([self.base[:100], banner, self.base[100:]])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _save(self, array, name):
+        path = os.path.join(self.temp_dir, name)
+        Image.fromarray(array).save(path)
+        return path
+
+    def test_inserted_rows_are_found(self):
+        alignment = screenshot_alignment.align_rows(screenshot_alignment.hash_rows(self.base),
+                                                    screenshot_alignment.hash_rows(self.latest))
+        self.assertEqual(alignment['inserted'], [(100, 40)])
+        self.assertEqual(alignment['removed'], [])
+        self.assertIn((100, 140, 500), alignment['matches'])
+
+    def test_shift_is_reported_apart_from_content_changes(self):
+        self.latest[400:410, 10:30] = 0
+        base_path, latest_path = self._save(self.base, 'base.png'), self._save(self.latest, 'latest.png')
+
+        plain = visual_diff.compare_image_files(base_path, latest_path)
+        aligned = visual_diff.compare_image_files(base_path, latest_path, align=True)
+
+        self.assertGreater(plain['percent'], 50)
+        self.assertLess(aligned['percent'], 10)
+        # The content change splits the moved rows into blocks above and below it
+        self.assertEqual({r['offset'] for r in aligned['shifted_regions']}, {40})
+        self.assertGreater(sum(r['height'] for r in aligned['shifted_regions']), 450)
+        self.assertEqual([(r[1], r[3]) for r in aligned['regions']], [(100, 140), (400, 410)])
+
+    def test_removed_rows_count_as_changes(self):
+        shorter = np.concatenate([self.base[:200], self.base[260:]])
+        base_path, latest_path = self._save(self.base, 'base.png'), self._save(shorter, 'latest.png')
+
+        aligned = visual_diff.compare_image_files(base_path, latest_path, align=True)
+        self.assertAlmostEqual(aligned['percent'], 60 / 600 * 100, delta=2)
+        self.assertTrue(any(r['offset'] == -60 for r in aligned['shifted_regions']))
+
+    def test_unshifted_pages_are_not_realigned(self):
+        changed = self.base.copy()
+        changed[50:60] = 0
+        self.assertIsNone(screenshot_alignment.align_screenshots(self.base, changed))
+        self.assertIsNone(screenshot_alignment.align_screenshots(self.base, self.latest[:, :40]))
+
+    def test_tall_screenshots_align_in_bounded_time(self):
+        rng = np.random.default_rng(5)
+        banner = np.full((40, 60, 3), 7, dtype=np.uint8)
+        noise = rng.integers(0, 256, (20000, 60, 3), dtype=np.uint8)
+        stripes = np.zeros((20000, 60, 3), dtype=np.uint8)
+        stripes[::2] = 255
+        unrelated = rng.integers(0, 256, (20000, 60, 3), dtype=np.uint8)
+
+        for base, latest in ((noise, np.concatenate([noise[:100], banner, noise[100:]])),
+                             (stripes, np.concatenate([stripes[:100], banner, stripes[100:]])),
+                             (noise, unrelated)):
+            start = time.monotonic()
+            alignment = screenshot_alignment.align_rows(screenshot_alignment.hash_rows(base),
+                                                        screenshot_alignment.hash_rows(latest))
+            self.assertLess(time.monotonic() - start, 3)
+            if latest is not unrelated:
+                self.assertEqual(alignment['inserted'], [(100, 40)])
+
+
+if __name__ == '__main__':
+    unittest.main()
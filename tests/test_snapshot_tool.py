@@ -139,5 +139,85 @@ class TestSnapshotTool(unittest.TestCase):
         snapshot_tool.config = original_config # Restore
         self.mock_get_config.return_value = original_config
 
+    def test_get_capture_viewports_defaults_to_desktop(self):
+        self.assertEqual(snapshot_tool.get_capture_viewports(), [snapshot_tool.DEFAULT_VIEWPORT])
+
+        self.test_config['multi_viewport_capture'] = {'enabled': False, 'viewports': [{'name': 'mobile', 'width': 390, 'height': 844}]}
+        self.assertEqual(snapshot_tool.get_capture_viewports(), [snapshot_tool.DEFAULT_VIEWPORT])
+
+    def test_get_capture_viewports_from_config(self):
+        viewports = [
+            {'name': 'desktop', 'width': 1920, 'height': 1080},
+            {'name': 'mobile', 'width': 390, 'height': 844}
+        ]
+        self.test_config['multi_viewport_capture'] = {'enabled': True, 'viewports': viewports}
+        self.assertEqual(snapshot_tool.get_capture_viewports(), viewports)
+
+    def test_get_viewport_snapshot_path(self):
+        self.assertEqual(
+            snapshot_tool.get_viewport_snapshot_path('data/snapshots/example_com/1/baseline/baseline_home.png', 'mobile'),
+            'data/snapshots/example_com/1/baseline/baseline_home__mobile.png'
+        )
+        self.assertEqual(
+            snapshot_tool.get_viewport_snapshot_path('visual/20240101_120000_000000_utc.webp', 'tablet'),
+            'visual/20240101_120000_000000_utc__tablet.webp'
+        )
+
+class TestSiteCaptureSession(unittest.TestCase):
+
+    def setUp(self):
+        self.patches = [
+            patch.object(snapshot_tool, 'config', {'playwright_retries': 3}),
+            patch('src.snapshot_tool.sync_playwright'),
+            patch('src.snapshot_tool.time.sleep'),
+        ]
+        self.mock_config, self.mock_sync_playwright, _ = [p.start() for p in self.patches]
+        self.browser = self.mock_sync_playwright.return_value.start.return_value.chromium.launch.return_value
+        self.context = self.browser.new_context.return_value
+        self.browser.is_connected.return_value = True
+        self.session = snapshot_tool.SiteCaptureSession('site1', 'https://example.com/', persistent_profile=False)
+        self.session.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def _starts(self):
+        return self.mock_sync_playwright.return_value.start.call_count
+
+    def test_navigation_error_keeps_the_session(self):
+        capture = MagicMock(side_effect=[Exception("Timeout 30000ms exceeded navigating to page"), 'captured'])
+        result = snapshot_tool._run_with_page('site1', 'https://example.com/slow', capture, session=self.session)
+        self.assertEqual(result, 'captured')
+        self.assertEqual(self._starts(), 1)
+        self.context.close.assert_not_called()
+        self.assertEqual(self.session.pages_captured, 1)
+
+    def test_disconnected_browser_restarts_the_session(self):
+        attempts = []
+
+        def capture(page):
+            attempts.append(page)
+            if len(attempts) == 1:
+                self.browser.is_connected.return_value = False
+                raise Exception("Browser has been closed")
+            return 'captured'
+
+        def relaunch(*args, **kwargs):
+            self.browser.is_connected.return_value = True
+            return self.browser
+        self.mock_sync_playwright.return_value.start.return_value.chromium.launch.side_effect = relaunch
+
+        result = snapshot_tool._run_with_page('site1', 'https://example.com/', capture, session=self.session)
+        self.assertEqual(result, 'captured')
+        self.assertEqual(self._starts(), 2)
+
+    def test_context_that_cannot_open_pages_is_replaced(self):
+        fresh_context = MagicMock()
+        self.browser.new_context.side_effect = [fresh_context]
+        self.context.new_page.side_effect = Exception("Target page, context or browser has been closed")
+        self.assertIs(self.session.new_page(), fresh_context.new_page.return_value)
+        self.assertEqual(self._starts(), 2)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import MagicMock, patch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import structure_fingerprint
+from src import comparators
+from src.parsed_page import ParsedPage
+from src.crawler_module import CrawlerModule
+
+
+class TestStructureFingerprint(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        sections = ''.join(f'<div class="card"><h2>Title {i}</h2><p>Text {i}</p><a href="/{i}">More</a></div>'
+                           for i in range(30))
+        self.html = f'<html><head><title>T</title></head><body><div id="main">{sections}</div></body></html>'
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_tag_paths_skip_scripts(self):
+        page = ParsedPage('<html><body><div id="a" class="x y"><p>t</p><script>var a;</script></div></body></html>')
+        self.assertEqual(page.tag_paths, ('html', 'html>body', 'html>body>div#a.x.y', 'html>body>div#a.x.y>p'))
+
+    def test_distance_grows_with_structural_change(self):
+        fingerprint = structure_fingerprint.structure_fingerprint(self.html)
+        self.assertEqual(len(fingerprint), 16)
+        # Text changes leave the structure untouched
+        self.assertEqual(structure_fingerprint.structure_fingerprint(self.html.replace('Text 3', 'Changed')), fingerprint)
+
+        small_change = self.html.replace('</body>', '<footer><p>New</p></footer></body>')
+        large_change = self.html.replace('<div class="card">', '<section class="item"><ul><li>', 20)
+        small = structure_fingerprint.fingerprint_distance(fingerprint, structure_fingerprint.structure_fingerprint(small_change))
+        large = structure_fingerprint.fingerprint_distance(fingerprint, structure_fingerprint.structure_fingerprint(large_change))
+        self.assertLess(small, large)
+        self.assertGreater(large, structure_fingerprint.DEFAULT_MAX_DISTANCE)
+
+    def test_sidecar_round_trip(self):
+        html_path = os.path.join(self.temp_dir, 'page.html')
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(self.html)
+        fingerprint = structure_fingerprint.write_structure_fingerprint(html_path)
+        self.assertEqual(structure_fingerprint.load_structure_fingerprint(html_path), fingerprint)
+
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(self.html + '<p></p>')
+        os.utime(html_path, ns=(0, 0))
+        self.assertIsNone(structure_fingerprint.load_structure_fingerprint(html_path))
+
+    def test_close_fingerprints_skip_the_structural_diff(self):
+        with patch.object(comparators, 'compare_texts') as compare_texts:
+            self.assertEqual(comparators.compare_html_structure(self.html, self.html.replace('Text 3', 'Changed')), (1.0, []))
+            compare_texts.assert_not_called()
+
+        changed = self.html.replace('<div class="card">', '<section class="item"><ul><li>', 20)
+        similarity, diff_output = comparators.compare_html_structure(self.html, changed)
+        self.assertLess(similarity, 1.0)
+        self.assertIn('+   <section class="item">', diff_output)
+
+    def test_baseline_without_stored_fingerprint_uses_its_sidecar(self):
+        html_path = os.path.join(self.temp_dir, 'baseline.html')
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(self.html)
+        crawler = MagicMock()
+        crawler.config = {}
+        page_results, results = {}, {}
+        artifacts = {'structure_fingerprint': structure_fingerprint.structure_fingerprint(self.html), 'html_path': html_path}
+
+        CrawlerModule._compare_page_html(crawler, 'https://example.com/', {'path': 'b.png', 'html_path': html_path},
+                                         artifacts, results, page_results)
+        self.assertEqual(page_results['https://example.com/']['structure_fingerprint_distance'], 0)
+        self.assertEqual(results['structure_diff_score'], 1.0)
+        # The missing sidecar was created for the next check
+        self.assertEqual(structure_fingerprint.load_structure_fingerprint(html_path), artifacts['structure_fingerprint'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import os
+import sys
+import difflib
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import text_diff
+from src import comparators
+
+
+class TestTextDiff(unittest.TestCase):
+
+    def setUp(self):
+        self.old_lines = [f"Paragraph {i} of the page" for i in range(40)]
+        self.new_lines = list(self.old_lines)
+        del self.new_lines[5]
+        self.new_lines.insert(20, "A new paragraph")
+        self.new_lines[30] = "Paragraph 30 of the updated page"
+
+    def test_opcodes_rebuild_new_lines(self):
+        opcodes, exact = text_diff.diff_lines(self.old_lines, self.new_lines)
+        self.assertTrue(exact)
+        rebuilt = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                self.assertEqual(self.old_lines[i1:i2], self.new_lines[j1:j2])
+            rebuilt += self.new_lines[j1:j2]
+        self.assertEqual(rebuilt, self.new_lines)
+        self.assertEqual(sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == 'equal'), 38)
+
+    def test_unified_diff_matches_difflib(self):
+        old_text, new_text = '\n'.join(self.old_lines), '\n'.join(self.new_lines)
+        similarity, diff_output = text_diff.compare_texts(old_text, new_text)
+        expected = list(difflib.unified_diff(self.old_lines, self.new_lines, fromfile='old_version',
+                                             tofile='new_version', lineterm=''))
+        self.assertEqual(diff_output, expected)
+        reference = difflib.SequenceMatcher(None, old_text, new_text, autojunk=False).ratio()
+        self.assertAlmostEqual(similarity, reference, delta=0.01)
+        self.assertEqual(text_diff.compare_texts(old_text, old_text), (1.0, []))
+
+    def test_budget_exceeded_falls_back_to_unique_line_matching(self):
+        old_lines = [f"line {i}" for i in range(3000)]
+        new_lines = old_lines[::-1]
+        opcodes, exact = text_diff.diff_lines(old_lines, new_lines, max_edits=100)
+        self.assertFalse(exact)
+        rebuilt = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            rebuilt += old_lines[i1:i2] if tag == 'equal' else new_lines[j1:j2]
+        self.assertEqual(rebuilt, new_lines)
+
+        start = time.monotonic()
+        similarity, diff_output = text_diff.compare_texts('\n'.join(old_lines), '\n'.join(new_lines), time_budget=0.05)
+        self.assertLess(time.monotonic() - start, 2)
+        # The same lines in another order are a large change, not an unchanged page
+        self.assertLess(similarity, 0.01)
+
+    def test_rewritten_page_over_budget_is_a_large_change(self):
+        header = [f"nav item {i}" for i in range(20)]
+        footer = ["<footer>", "Contact us", "</footer>"]
+        old_lines = header + [f"old paragraph {i}" for i in range(1000)] + footer
+        new_lines = header + [f"new paragraph {i}" for i in range(1000)] + footer
+        old_text, new_text = '\n'.join(old_lines), '\n'.join(new_lines)
+
+        similarity, _ = text_diff.compare_texts(old_text, new_text, max_edits=100)
+        exact_similarity, _ = text_diff.compare_texts(old_text, new_text, time_budget=None, max_edits=3000)
+        self.assertLessEqual(similarity, exact_similarity + 1e-9)
+        self.assertLess(similarity, 0.1)
+
+    def test_budget_fallback_is_a_lower_bound(self):
+        # Mostly repeated lines, as in tag structure dumps
+        old_lines = [("div", "p", "span", "li")[i % 4] for i in range(1500)] + [f"unique {i}" for i in range(500)]
+        new_lines = [("p", "div", "li", "a")[i % 4] for i in range(1500)] + [f"unique {i}" for i in range(250, 750)]
+        old_text, new_text = '\n'.join(old_lines), '\n'.join(new_lines)
+
+        similarity, _ = text_diff.compare_texts(old_text, new_text, max_edits=50)
+        exact_similarity, _ = text_diff.compare_texts(old_text, new_text, time_budget=None, max_edits=4000)
+        self.assertLessEqual(similarity, exact_similarity + 1e-9)
+        self.assertGreater(similarity, 0)
+
+    def test_html_comparators_keep_signature(self):
+        old_html = "<html><body>" + ''.join(f"<p>{line}</p>\n" for line in self.old_lines) + "</body></html>"
+        new_html = ("<html><body>" + ''.join(f"<p>{line}</p>\n" for line in self.new_lines) +
+                    "<div><span>Footer</span></div></body></html>")
+        similarity, diff_output = comparators.compare_html_text_content(old_html, new_html, time_budget=1.0)
+        self.assertTrue(0.9 < similarity < 1.0)
+        self.assertIn('+A new paragraph', diff_output)
+
+        similarity, diff_output = comparators.compare_html_structure(old_html, new_html)
+        self.assertTrue(0.9 < similarity < 1.0)
+        self.assertEqual(diff_output[:2], ['--- old_structure', '+++ new_structure'])
+        self.assertIn('+   <span>', diff_output)
+
+
+if __name__ == '__main__':
+    unittest.main()
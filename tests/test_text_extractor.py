@@ -0,0 +1,97 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import text_extractor, parsed_page
+from src.text_extractor import TextExtractor, extract_text, extract_text_from_file, iter_text_chunks
+from src.parsed_page import ParsedPage
+
+
+SAMPLE_HTML = """<!DOCTYPE html>
+<html><head><title>Catalog</title>
+<style>body { color: red; }</style>
+<script>var products = "<p>not text</p>";</script>
+</head>
+<body>
+  <!-- navigation -->
+  <nav><a href="/">Home</a> <a href="/shop">Shop</a></nav>
+  <div id="main"><h1>Spring  sale</h1>
+    <p>Prices from &pound;10 &amp; free delivery&#8230; &#150; today only</p>
+    <pre>
+    </pre>
+    <br>tail text</br> continues
+    <p>Unknown &foo; entity</p><![CDATA[raw data]]>
+  </div>
+</body></html>
+"""
+
+
+class TestTextExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _tree_text(self, html):
+        page = ParsedPage(html)
+        page.soup  # Forces the tree-based extraction
+        return page.text
+
+    def test_matches_parsed_page_text(self):
+        text = extract_text(SAMPLE_HTML)
+        self.assertEqual(text, self._tree_text(SAMPLE_HTML))
+        self.assertIn("Spring\nsale", text)
+        self.assertIn("Prices from £10 & free delivery… – today only", text)
+        self.assertNotIn("color: red", text)
+        self.assertNotIn("not text", text)
+        self.assertNotIn("navigation", text)
+
+    def test_result_does_not_depend_on_chunk_size(self):
+        expected = extract_text(SAMPLE_HTML)
+        for chunk_size in (1, 7, 64, 4096):
+            self.assertEqual(extract_text(SAMPLE_HTML, chunk_size=chunk_size), expected, chunk_size)
+
+    def test_iter_text_chunks_yields_phrases_while_reading(self):
+        chunks = [f"<p>Item {i}</p>\n" for i in range(100)]
+        extractor = TextExtractor()
+        first = extractor.feed_chunk(''.join(chunks[:50]))
+        self.assertGreater(len(first), 40)
+        rest = extractor.feed_chunk(''.join(chunks[50:])) + extractor.finish()
+        self.assertEqual(first + rest, [f"Item {i}" for i in range(100)])
+        self.assertEqual(list(iter_text_chunks(iter(chunks))), first + rest)
+
+    def test_extract_text_from_file(self):
+        html_path = os.path.join(self.temp_dir, "page.html")
+        with open(html_path, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_HTML)
+        self.assertEqual(extract_text_from_file(html_path, chunk_size=16), self._tree_text(SAMPLE_HTML))
+
+    def test_long_single_line_is_flushed_at_double_spaces(self):
+        html = "<p>" + "word  " * 50 + "</p>"
+        with patch.object(text_extractor, '_MAX_PENDING_CHARS', 40):
+            extractor = TextExtractor()
+            phrases = extractor.feed_chunk(html[:200])
+            self.assertTrue(phrases)
+            self.assertLessEqual(extractor._pending_chars, 40)
+            phrases += extractor.feed_chunk(html[200:]) + extractor.finish()
+        self.assertEqual(phrases, ["word"] * 50)
+
+    def test_parsed_page_streams_large_documents(self):
+        html = "<html><body>" + "<div><p>Row</p><script>x()</script></div>" * 200 + "</body></html>"
+        with patch.object(parsed_page, 'STREAMING_TEXT_MIN_CHARS', 100):
+            page = ParsedPage(html)
+            text = page.text
+            self.assertNotIn('soup', page.__dict__)
+        self.assertEqual(text, self._tree_text(html))
+
+
+if __name__ == '__main__':
+    unittest.main()
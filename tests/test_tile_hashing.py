@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+from PIL import Image, ImageDraw
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import tile_hashing
+from src import comparators
+from tests.test_tiled_screenshot import save_as_tiles
+
+
+class TestTileHashing(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.base = Image.new('RGB', (100, 150), (255, 255, 255))
+        ImageDraw.Draw(self.base).rectangle([5, 5, 30, 30], fill=(0, 0, 255))
+        self.latest = self.base.copy()
+        ImageDraw.Draw(self.latest).rectangle([70, 110, 90, 130], fill=(255, 0, 0))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _save(self, image, name, tile_size=32):
+        path = os.path.join(self.temp_dir, name)
+        image.save(path)
+        tile_hashing.write_tile_hashes(path, tile_size)
+        return path
+
+    def test_hash_grid_covers_partial_edge_tiles(self):
+        path = self._save(self.base, 'base.png')
+        hashes = tile_hashing.load_tile_hashes(path)
+        self.assertEqual((hashes['rows'], hashes['columns']), (5, 4))
+        self.assertEqual(len(hashes['perceptual'][4]), 4)
+
+    def test_only_changed_tiles_are_reported(self):
+        hashes1 = tile_hashing.load_tile_hashes(self._save(self.base, 'base.png'))
+        hashes2 = tile_hashing.load_tile_hashes(self._save(self.latest, 'latest.png'))
+        self.assertEqual(tile_hashing.find_changed_tiles(hashes1, hashes2), [(3, 2), (4, 2)])
+
+    def test_identical_snapshots_skip_decoding(self):
+        base_path = self._save(self.base, 'base.png')
+        latest_path = self._save(self.base, 'latest.png')
+        with patch.object(comparators, 'SnapshotReader', side_effect=AssertionError("decoded")):
+            percent, diff_path = comparators.compare_screenshots_percentage(base_path, latest_path)
+        self.assertEqual(percent, 0.0)
+        self.assertIsNone(diff_path)
+
+    def test_stale_sidecar_is_ignored(self):
+        path = self._save(self.base, 'base.png')
+        self.latest.save(path)
+        os.utime(path, ns=(0, 0))
+        self.assertIsNone(tile_hashing.load_tile_hashes(path))
+
+    def test_hashed_comparison_matches_full_comparison(self):
+        plain_base = os.path.join(self.temp_dir, 'plain_base.png')
+        plain_latest = os.path.join(self.temp_dir, 'plain_latest.png')
+        self.base.save(plain_base)
+        self.latest.save(plain_latest)
+        expected, _ = comparators.compare_screenshots_percentage(plain_base, plain_latest)
+
+        base_path = self._save(self.base, 'base.png')
+        latest_path = os.path.join(self.temp_dir, 'visual', 'latest.png')
+        os.makedirs(os.path.dirname(latest_path))
+        self.latest.save(latest_path)
+        tile_hashing.write_tile_hashes(latest_path, 32)
+        percent, diff_path = comparators.compare_screenshots_percentage(base_path, latest_path)
+
+        self.assertGreater(percent, 0)
+        self.assertAlmostEqual(percent, expected)
+        self.assertTrue(os.path.exists(diff_path))
+
+        percent, diff_path = comparators.compare_screenshots_percentage(
+            base_path, latest_path, ignore_regions=[[60, 100, 40, 40]])
+        self.assertEqual(percent, 0)
+        self.assertIsNone(diff_path)
+
+    def test_tiled_snapshots_use_hashes(self):
+        base_path = os.path.join(self.temp_dir, 'baseline', 'base.png')
+        latest_path = os.path.join(self.temp_dir, 'visual', 'latest.png')
+        save_as_tiles(self.base, base_path, tile_height=64)
+        save_as_tiles(self.latest, latest_path, tile_height=64)
+        tile_hashing.write_tile_hashes(base_path, 32)
+        tile_hashing.write_tile_hashes(latest_path, 32)
+
+        hashes = tile_hashing.load_tile_hashes(base_path)
+        self.assertEqual((hashes['width'], hashes['height']), (100, 150))
+        percent, diff_path = comparators.compare_screenshots_percentage(base_path, latest_path)
+        self.assertGreater(percent, 0)
+        self.assertTrue(os.path.exists(diff_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from PIL import Image, ImageDraw
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import tiled_screenshot
+from src import comparators
+
+
+def save_as_tiles(image, image_path, tile_height):
+    """Writes an image the way tiled capture mode does: tiles, manifest and preview."""
+    tiles_dir = tiled_screenshot.get_tiles_directory(image_path)
+    os.makedirs(tiles_dir, exist_ok=True)
+    tiles = []
+    for index, y in enumerate(range(0, image.height, tile_height)):
+        height = min(tile_height, image.height - y)
+        tile = {'file': f'tile_{index:04d}.png', 'y': y, 'height': height}
+        image.crop((0, y, image.width, y + height)).save(os.path.join(tiles_dir, tile['file']))
+        tiles.append(tile)
+    manifest = tiled_screenshot.write_tile_manifest(image_path, image.width, image.height, image.height,
+                                                    tile_height, tiles, 'png')
+    tiled_screenshot.create_preview_from_tiles(image_path, manifest, preview_width=20)
+    return manifest
+
+
+class TestTiledScreenshot(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.base = Image.new('RGB', (40, 250), (255, 255, 255))
+        ImageDraw.Draw(self.base).rectangle([5, 20, 30, 60], fill=(0, 0, 255))
+        self.latest = self.base.copy()
+        ImageDraw.Draw(self.latest).rectangle([10, 180, 25, 210], fill=(255, 0, 0))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_manifest_and_preview(self):
+        path = os.path.join(self.temp_dir, 'baseline_home.png')
+        save_as_tiles(self.base, path, tile_height=100)
+
+        self.assertTrue(tiled_screenshot.is_tiled_snapshot(path))
+        manifest = tiled_screenshot.load_tile_manifest(path)
+        self.assertEqual([t['height'] for t in manifest['tiles']], [100, 100, 50])
+        self.assertFalse(manifest['truncated'])
+        with Image.open(path) as preview:
+            self.assertEqual(preview.size, (20, 125))
+
+        tiled_screenshot.remove_tiles(path)
+        self.assertFalse(tiled_screenshot.is_tiled_snapshot(path))
+
+    def test_read_band_spans_tiles_and_pads_with_white(self):
+        path = os.path.join(self.temp_dir, 'baseline_home.png')
+        save_as_tiles(self.base, path, tile_height=32)
+        reader = tiled_screenshot.SnapshotReader(path)
+
+        band = reader.read_band(10, 60)
+        self.assertEqual(list(band.getdata()), list(self.base.crop((0, 10, 40, 70)).getdata()))
+
+        padded = reader.read_band(240, 20, width=50)
+        self.assertEqual(padded.getpixel((45, 5)), (255, 255, 255))
+        self.assertEqual(padded.getpixel((0, 15)), (255, 255, 255))
+
+    def test_tiled_comparison_matches_whole_image_comparison(self):
+        whole_base = os.path.join(self.temp_dir, 'whole_base.png')
+        whole_latest = os.path.join(self.temp_dir, 'whole_latest.png')
+        self.base.save(whole_base)
+        self.latest.save(whole_latest)
+        expected, _ = comparators.compare_screenshots_percentage(whole_base, whole_latest)
+
+        tiled_base = os.path.join(self.temp_dir, 'baseline', 'tiled_base.png')
+        tiled_latest = os.path.join(self.temp_dir, 'visual', 'tiled_latest.png')
+        save_as_tiles(self.base, tiled_base, tile_height=64)
+        save_as_tiles(self.latest, tiled_latest, tile_height=64)
+        percent, diff_path = comparators.compare_screenshots_percentage(tiled_base, tiled_latest)
+
+        self.assertAlmostEqual(percent, expected)
+        self.assertIsNotNone(diff_path)
+        self.assertTrue(os.path.exists(diff_path))
+
+    def test_tiled_comparison_with_ignore_region(self):
+        tiled_base = os.path.join(self.temp_dir, 'baseline', 'tiled_base.png')
+        tiled_latest = os.path.join(self.temp_dir, 'visual', 'tiled_latest.png')
+        save_as_tiles(self.base, tiled_base, tile_height=64)
+        save_as_tiles(self.latest, tiled_latest, tile_height=64)
+
+        percent, diff_path = comparators.compare_screenshots_percentage(
+            tiled_base, tiled_latest, ignore_regions=[[0, 170, 40, 50]])
+        self.assertEqual(percent, 0)
+        self.assertIsNone(diff_path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+from unittest.mock import patch
+from PIL import Image, ImageChops, ImageDraw
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src import visual_diff
+from src import comparators
+
+
+class TestVisualDiff(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.base = Image.new('RGB', (120, 90), (240, 240, 240))
+        ImageDraw.Draw(self.base).rectangle([10, 10, 50, 40], fill=(0, 0, 255))
+        self.latest = self.base.copy()
+        ImageDraw.Draw(self.latest).rectangle([60, 50, 100, 70], fill=(200, 30, 30))
+        ImageDraw.Draw(self.latest).point((5, 85), fill=(241, 240, 240))  # Below the report threshold
+        self.base_path = os.path.join(self.temp_dir, 'base.png')
+        self.latest_path = os.path.join(self.temp_dir, 'latest.png')
+        self.base.save(self.base_path)
+        self.latest.save(self.latest_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_matches_pil_percentage_and_bbox(self):
+        diff = ImageChops.difference(self.base, self.latest)
+        diff_np = np.array(diff)
+        expected_percent = np.count_nonzero(diff_np) / diff_np.size * 100
+        expected_bbox = diff.convert('L').point(lambda p: 255 if p > 30 else 0).getbbox()
+
+        result = visual_diff.compare_image_files(self.base_path, self.latest_path)
+        self.assertAlmostEqual(result['percent'], expected_percent)
+        self.assertEqual(result['bbox'], expected_bbox)
+        self.assertEqual(result['mask'].shape, (90, 120))
+        self.assertIsNone(result['diff_image_path'])
+
+    def test_grayscale_matches_pil(self):
+        array = np.random.default_rng(1).integers(0, 256, (17, 23, 3), dtype=np.uint8)
+        expected = np.array(Image.fromarray(array).convert('L'))
+        np.testing.assert_array_equal(visual_diff.to_grayscale(array), expected)
+
+    def test_ignore_regions_match_pil_rectangles(self):
+        region = [[58, 48, 44, 24]]
+        expected = np.array(comparators._apply_ignore_regions(self.latest, region))
+        np.testing.assert_array_equal(visual_diff.apply_ignore_regions(np.asarray(self.latest), region), expected)
+
+        result = visual_diff.compare_image_files(self.base_path, self.latest_path, ignore_regions=region)
+        self.assertIsNone(result['bbox'])
+
+    def test_size_difference_is_padded_with_white(self):
+        taller_path = os.path.join(self.temp_dir, 'taller.png')
+        taller = Image.new('RGB', (120, 100), (255, 255, 255))
+        taller.paste(self.base, (0, 0))
+        taller.save(taller_path)
+
+        result = visual_diff.compare_image_files(self.base_path, taller_path)
+        self.assertEqual(result['size'], (120, 100))
+        self.assertEqual(result['percent'], 0)
+
+    def test_report_and_ssim(self):
+        report_path = os.path.join(self.temp_dir, 'diffs', 'report.png')
+        result = visual_diff.compare_image_files(self.base_path, self.latest_path, compute_ssim=True,
+                                                 report_path=report_path)
+        self.assertEqual(result['diff_image_path'], report_path)
+        with Image.open(report_path) as report:
+            left, top, right, bottom = result['bbox']
+            self.assertEqual(report.size, ((right - left) * 2, bottom - top + 40))
+        if visual_diff.SSIM_AVAILABLE:
+            self.assertLess(result['ssim'], 1.0)
+
+        identical = visual_diff.compare_image_files(self.base_path, self.base_path, compute_ssim=True)
+        self.assertEqual(identical['ssim'], 1.0)
+
+    def test_detailed_comparison_returns_all_results(self):
+        result = comparators.compare_screenshots_detailed(self.base_path, self.latest_path, compute_ssim=True)
+        self.assertGreater(result['percent'], 0)
+        self.assertTrue(os.path.exists(result['diff_image_path']))
+        self.assertEqual(result['bbox'], (60, 50, 101, 71))
+
+    def test_identical_images_create_no_report(self):
+        self.assertEqual(comparators.compare_screenshots_percentage(self.base_path, self.base_path), (0.0, None))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'diffs')))
+
+    def test_pyramid_mode_from_config(self):
+        with patch.object(comparators, 'config', {'visual_comparison': {'mode': 'pyramid'}}):
+            result = comparators.compare_screenshots_detailed(self.base_path, self.latest_path, decision_threshold=0.01)
+        expected = visual_diff.compare_image_files(self.base_path, self.latest_path)
+        self.assertAlmostEqual(result['percent'], expected['percent'])
+        # Pyramid bounding boxes are accurate to one block
+        self.assertEqual(result['bbox'], (56, 48, 104, 72))
+
+
+class TestPyramidComparison(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.base = np.full((403, 390, 3), 235, dtype=np.uint8)
+        self.base[::5, ::3] = rng.integers(0, 256, (81, 130, 3), dtype=np.uint8)
+        self.latest = self.base.copy()
+        self.latest[20:60, 30:90] = rng.integers(0, 256, (40, 60, 3), dtype=np.uint8)  # Ambiguous blocks
+        self.latest[100:260, 16:300] = 0                                               # Saturated blocks
+        self.latest[398:403, 385:390] = 1                                              # Partial edge blocks
+        self.exact = visual_diff.diff_arrays(self.base, self.latest)
+
+    def test_exact_when_refined(self):
+        result = visual_diff.diff_arrays_pyramid(self.base, self.latest, max_error_percent=0)
+        self.assertAlmostEqual(result['percent'], self.exact['percent'])
+        self.assertEqual(result['percent_error'], 0)
+        self.assertEqual(result['bbox'], (16, 16, 390, 403))
+
+    def test_estimate_stays_within_reported_error(self):
+        result = visual_diff.diff_arrays_pyramid(self.base, self.latest, max_error_percent=100)
+        self.assertGreater(result['percent_error'], 0)
+        self.assertGreaterEqual(result['percent'] + 1e-9, self.exact['percent'])
+        self.assertLessEqual(result['percent'] - result['percent_error'], self.exact['percent'] + 1e-9)
+
+    def test_decision_threshold_inside_error_band_is_refined(self):
+        estimate = visual_diff.diff_arrays_pyramid(self.base, self.latest, max_error_percent=100)
+        threshold = estimate['percent'] - estimate['percent_error'] / 2
+        result = visual_diff.diff_arrays_pyramid(self.base, self.latest, max_error_percent=100,
+                                                 decision_threshold=threshold)
+        self.assertAlmostEqual(result['percent'], self.exact['percent'])
+
+    def test_unchanged_images(self):
+        result = visual_diff.diff_arrays_pyramid(self.base, self.base.copy())
+        self.assertEqual(result['percent'], 0)
+        self.assertIsNone(result['bbox'])
+
+
+class TestChangeRegions(unittest.TestCase):
+
+    def setUp(self):
+        self.mask = np.zeros((2000, 300), dtype=bool)
+        self.mask[10:20, 10:40] = True
+        self.mask[25:30, 45:50] = True       # Within the merge distance of the first change
+        self.mask[1900:1950, 200:260] = True
+
+    def test_distant_changes_get_separate_regions(self):
+        regions = visual_diff.find_change_regions(self.mask)
+        self.assertEqual(regions, [(10, 10, 50, 30), (200, 1900, 260, 1950)])
+
+    def test_labelling_without_opencv(self):
+        with patch.object(visual_diff, 'cv2', None):
+            regions = visual_diff.find_change_regions(self.mask)
+        self.assertEqual(regions, [(10, 10, 50, 30), (200, 1900, 260, 1950)])
+
+    def test_region_count_is_capped(self):
+        mask = np.zeros((1000, 1000), dtype=bool)
+        mask[::100, ::100] = True
+        regions = visual_diff.find_change_regions(mask, max_regions=5)
+        self.assertLessEqual(len(regions), 5)
+        covered = np.zeros_like(mask)
+        for left, top, right, bottom in regions:
+            covered[top:bottom, left:right] = True
+        self.assertTrue(covered[mask].all())
+
+    def test_scaled_mask_regions_are_clipped(self):
+        regions = visual_diff.find_change_regions(self.mask[::8, ::8], mask_scale=8, image_size=(300, 1996))
+        self.assertEqual(len(regions), 2)
+        self.assertLessEqual(regions[-1][3], 1996)
+
+    def test_report_is_compact_for_distant_changes(self):
+        base = np.full((2000, 300, 3), 255, dtype=np.uint8)
+        latest = base.copy()
+        latest[self.mask] = 0
+        temp_dir = tempfile.mkdtemp()
+        try:
+            base_path, latest_path = os.path.join(temp_dir, 'base.png'), os.path.join(temp_dir, 'latest.png')
+            Image.fromarray(base).save(base_path)
+            Image.fromarray(latest).save(latest_path)
+            result = visual_diff.compare_image_files(base_path, latest_path,
+                                                     report_path=os.path.join(temp_dir, 'report.png'))
+            self.assertEqual(len(result['regions']), 2)
+            with Image.open(result['diff_image_path']) as report:
+                self.assertLess(report.height, 200)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()